@@ -2,7 +2,11 @@ import getopt
 import logging
 import sys
 
+from hpb.component.matrix_handle import MatrixHandle
+from hpb.component.probe_cache_handle import ProbeCacheHandle
+from hpb.component.settings_handle import SettingsHandle
 from hpb.component.workflow_handle import WorkflowHandle
+from hpb.component.workspace_handle import WorkspaceHandle
 from hpb.data_type.builder_config import BuilderConfig
 from hpb.data_type.constant_var import APP_NAME
 from hpb.utils.utils import Utils
@@ -17,18 +21,37 @@ class Builder:
         self._usage_str = "Usage: {} build [OPTIONS]\n" \
             "\n" \
             "Options: \n" \
-            "  -c, --config string     [REQUIRED] build config file\n" \
+            "  -c, --config string     [REQUIRED] build config file, not required in workspace mode\n" \
             "  -m, --mode string       [OPTIONAL] dev or task, use dev by default \n" \
             "    , --task-name string  [OPTIONAL] build task name, if empty, use config file without suffix as task-name\n" \
             "    , --task-id string    [OPTIONAL] build task id, if empty, set 'yyyymmddHHMMSSxxxx' as task-id\n" \
             "    , --work-dir string   [OPTIONAL] working directory(by default, use current working directory)\n" \
             "  -p, --param list        [OPTIONAL] build parameters, e.g. --params foo=123 -p bar=456\n" \
             "  -s, --settings string   [OPTIONAL] manual set settings.xml\n" \
+            "  -j, --jobs int          [OPTIONAL] max number of workflow jobs run concurrently, 1 by default\n" \
+            "    , --skip-built        [OPTIONAL] skip build when package with the same recipe hash already be pushed\n" \
+            "    , --pull-built        [OPTIONAL] when build be skipped, copy the already built package into pkg directory\n" \
+            "    , --shell-session     [OPTIONAL] run all commands of a job in one persistent shell, environment and working directory persist between commands(posix only)\n" \
+            "    , --raw-log           [OPTIONAL] write command output bytes into log files directly, without per line log records(posix only)\n" \
+            "    , --plan              [OPTIONAL] print predicted wall time from build history, without run the build\n" \
+            "    , --workspace string  [OPTIONAL] directory or manifest of recipes, build them in dependency order, -j set max number of recipes build concurrently\n" \
+            "    , --matrix list       [OPTIONAL] build variants in parallel task directories, override yml matrix, e.g. --matrix build_type=debug,release --matrix compiler=gcc,clang\n" \
+            "    , --matrix-jobs int   [OPTIONAL] max number of matrix variants build concurrently, cpu count divided by --jobs by default\n" \
+            "    , --refresh-probe     [OPTIONAL] drop cached platform/compiler/libc probe results and probe again\n" \
             "".format(APP_NAME)
 
         # workflow
         self._workflow = WorkflowHandle()
 
+        # only print build plan
+        self._plan = False
+
+        # workspace
+        self._workspace = None
+
+        # builder input arguments
+        self._cfg = None
+
     def run(self, args):
         """
         run package builder
@@ -37,6 +60,12 @@ class Builder:
         if self._init(args=args) is False:
             return False
 
+        if self._workspace is not None:
+            self._workspace.init_log()
+            logging.info("{} builder run workspace {}".format(
+                APP_NAME, self._workspace.workspace_path))
+            return self._workspace.run()
+
         # init log
         self._workflow.init_log()
 
@@ -46,6 +75,15 @@ class Builder:
         if self._workflow.load_yaml_file() is False:
             return False
 
+        if self._plan:
+            return self._workflow.print_plan()
+
+        matrix_handle = MatrixHandle()
+        if matrix_handle.load(self._cfg, self._workflow) is False:
+            return False
+        if len(matrix_handle.variants) > 0:
+            return matrix_handle.run()
+
         return self._workflow.run()
 
     def _init(self, args):
@@ -56,6 +94,17 @@ class Builder:
         if cfg is None:
             return False
 
+        # platform/compiler/libc probe results cached in cache directory
+        ProbeCacheHandle().cache_path = SettingsHandle().cache_path
+        if cfg.refresh_probe:
+            ProbeCacheHandle().clear()
+
+        if len(cfg.workspace) > 0:
+            cfg.workspace = Utils.expand_path(cfg.workspace)
+            cfg.working_dir = Utils.expand_path(cfg.working_dir)
+            self._workspace = WorkspaceHandle()
+            return self._workspace.set_input_args(cfg)
+
         if len(cfg.config_path) == 0:
             print("Error! config path not be set")
             print(self._usage_str)
@@ -66,6 +115,8 @@ class Builder:
 
         if self._workflow.set_input_args(cfg) is False:
             return False
+        self._plan = cfg.plan
+        self._cfg = cfg
 
         return True
 
@@ -75,10 +126,12 @@ class Builder:
         """
         cfg = BuilderConfig()
         opts, _ = getopt.getopt(
-            args, "hc:m:p:s:",
+            args, "hc:m:p:s:j:",
             [
                 "help", "config=", "mode=", "task-name=", "task-id=",
-                "work-dir=", "param=", "settings="
+                "work-dir=", "param=", "settings=", "jobs=",
+                "skip-built", "pull-built", "shell-session", "raw-log",
+                "plan", "workspace=", "matrix=", "matrix-jobs=", "refresh-probe",
             ]
         )
 
@@ -100,5 +153,31 @@ class Builder:
                 cfg.params.append(arg)
             elif opt in ("-s", "--settings"):
                 cfg.settings_path = arg
+            elif opt in ("-j", "--jobs"):
+                if not arg.isdigit():
+                    print("Error! invalid jobs: {}".format(arg))
+                    return None
+                cfg.jobs = int(arg)
+            elif opt in ("--skip-built"):
+                cfg.skip_built = True
+            elif opt in ("--pull-built"):
+                cfg.pull_built = True
+            elif opt in ("--shell-session"):
+                cfg.shell_session = True
+            elif opt in ("--raw-log"):
+                cfg.raw_log = True
+            elif opt in ("--plan"):
+                cfg.plan = True
+            elif opt in ("--workspace"):
+                cfg.workspace = arg
+            elif opt in ("--matrix"):
+                cfg.matrix.append(arg)
+            elif opt in ("--matrix-jobs"):
+                if not arg.isdigit() or int(arg) == 0:
+                    print("Error! invalid matrix jobs: {}".format(arg))
+                    return None
+                cfg.matrix_jobs = int(arg)
+            elif opt in ("--refresh-probe"):
+                cfg.refresh_probe = True
 
         return cfg
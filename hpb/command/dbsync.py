@@ -10,6 +10,7 @@ from hpb.data_type.constant_var import APP_NAME
 from hpb.data_type.package_info import PackageInfo
 from hpb.data_type.package_meta import PackageMeta
 from hpb.mapper.mapper_pkg import MapperPkg
+from hpb.mapper.mapper_recipe import MapperRecipe
 from hpb.utils.utils import Utils
 
 
@@ -109,6 +110,8 @@ class DbSync:
                     "remove not exists path from db: {}".format(dirpath))
                 mapper_pkg = MapperPkg()
                 mapper_pkg.remove_by_dirpath(db_handle.conn, dirpath)
+                mapper_recipe = MapperRecipe()
+                mapper_recipe.remove_by_dirpath(db_handle.conn, dirpath)
         logging.info("# completed remove not exists package path in db")
 
         return exists_pkg_infos
@@ -118,19 +121,17 @@ class DbSync:
         init db
         """
         db_path = SettingsHandle().db_path
-        with DBHandle(db_path, isolation_level="EXCLUSIVE") as db_handle:
-            mapper_pkg = MapperPkg()
-            mapper_pkg.create_table(db_handle.conn)
+        DBHandle.create_tables(db_path, [MapperPkg(), MapperRecipe()])
 
     def _scan_db_pkgs(self, db_path) -> typing.List[PackageInfo]:
         """
         scan local db to get package infos
         """
         db_path = SettingsHandle().db_path
-        with DBHandle(db_path, isolation_level="EXCLUSIVE") as db_handle:
+        mapper_pkg = MapperPkg()
+        DBHandle.create_tables(db_path, [mapper_pkg])
+        with DBHandle(db_path, readonly=True) as db_handle:
             qry = PackageInfo()
-
-            mapper_pkg = MapperPkg()
             return mapper_pkg.query(db_handle.conn, qry)
 
     def _scan_local_pkgs(self, local_paths) -> typing.List[PackageInfo]:
@@ -15,6 +15,8 @@ class DownloaderConfig:
         self.path = ""
         self.dest = ""
         self.extract = False
+        # copy package into dest before extract, otherwise extract from repo
+        self.copy = True
 
 
 class Downloader:
@@ -32,6 +34,7 @@ class Downloader:
             "  -p, --path string    [REQUIRED] package dir/path or url\n" \
             "  -d, --dest string    [OPTIONAL] download destination\n" \
             "  -x, --extract string [OPTIONAL] extract files from packags\n" \
+            "    , --no-copy        [OPTIONAL] extract files from package in repo directly, without copy package into destination\n" \
             "e.g.\n" \
             "  {0} pull -p ~/.hpb/packages/google/googletest/v1.13.0-release-linux-arch-x86_64\n" \
             "".format(APP_NAME)
@@ -73,6 +76,9 @@ class Downloader:
         download package
         """
         self.cfg: DownloaderConfig = cfg
+        if self.cfg.extract is True and self.cfg.copy is False:
+            return self._extract_from_repo(self.cfg)
+
         if self.cfg.repo_type == "local":
             ret = self._download_local()
         else:
@@ -95,23 +101,42 @@ class Downloader:
         if dest.endswith("tar.gz"):
             dest = os.path.dirname(dest)
 
-        pkg_filepath = self._get_pkg_filepath(cfg.path)
+        pkg_filepath = self.get_pkg_filepath(cfg.path)
         filename = os.path.basename(pkg_filepath)
 
-        origin_dir = os.path.abspath(os.curdir)
-        os.chdir(dest)
+        filepath = os.path.join(dest, filename)
+        with tarfile.open(filepath) as f:
+            f.extractall(dest)
+        os.remove(filepath)
 
-        with tarfile.open(filename) as f:
-            f.extractall(".")
-        os.remove(filename)
+    def _extract_from_repo(self, cfg):
+        """
+        extract package in repo into destination directly
+        """
+        if cfg.repo_type != "local":
+            logging.error("unregconize repo_type: {}".format(cfg.repo_type))
+            return False
 
-        os.chdir(origin_dir)
+        pkg_filepath = Utils.expand_path(self.get_pkg_filepath(cfg.path))
+        dest = Utils.expand_path(cfg.dest)
+        if dest.endswith("tar.gz"):
+            dest = os.path.dirname(dest)
+        if not os.path.isdir(dest):
+            os.makedirs(dest, exist_ok=True)
+
+        logging.info("extract local package: {} -> {}".format(
+            pkg_filepath, dest))
+
+        # stream mode read package sequentially once
+        with tarfile.open(pkg_filepath, "r|*") as f:
+            f.extractall(dest)
+        return True
 
     def _download_local(self):
         """
         download local packages
         """
-        pkg_filepath = self._get_pkg_filepath(self.cfg.path)
+        pkg_filepath = self.get_pkg_filepath(self.cfg.path)
         pkg_filepath = Utils.expand_path(pkg_filepath)
 
         dest = Utils.expand_path(self.cfg.dest)
@@ -127,9 +152,11 @@ class Downloader:
 
         return True
 
-    def _get_pkg_filepath(self, pkg_path) -> str:
+    @staticmethod
+    def get_pkg_filepath(pkg_path) -> str:
         """
         get real package filepath
+        :param pkg_path: package directory or package file path
         """
         pkg_path = Utils.expand_path(pkg_path)
         if os.path.isdir(pkg_path):
@@ -146,9 +173,9 @@ class Downloader:
                 errmsg = "multiple package in {}".format(pkg_path)
                 logging.error(errmsg)
                 raise Exception(errmsg)
-            pkg_filepath = os.path.join(self.cfg.path, candidates[0])
+            pkg_filepath = os.path.join(pkg_path, candidates[0])
         else:
-            pkg_filepath = self.cfg.path
+            pkg_filepath = pkg_path
         return pkg_filepath
 
     def _parse_args(self, args):
@@ -158,7 +185,7 @@ class Downloader:
         opts, _ = getopt.getopt(
             args, "hp:d:x",
             [
-                "help", "path=", "dest=", "extract"
+                "help", "path=", "dest=", "extract", "no-copy"
             ]
         )
 
@@ -173,4 +200,6 @@ class Downloader:
                 cfg.dest = arg
             elif opt in ("-x", "--extract"):
                 cfg.extract = True
+            elif opt in ("--no-copy"):
+                cfg.copy = False
         return cfg
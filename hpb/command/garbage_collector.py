@@ -0,0 +1,80 @@
+import getopt
+import logging
+import sys
+
+from hpb.component.settings_handle import SettingsHandle
+from hpb.component.source_gc_handle import SourceGcHandle
+from hpb.data_type.constant_var import APP_NAME
+from hpb.utils.utils import Utils
+
+
+class GarbageCollectorConfig:
+    def __init__(self):
+        self.target = ""
+        self.max_size = None
+        self.dry_run = False
+
+
+class GarbageCollector:
+    """
+    garbage collector
+    """
+
+    def __init__(self):
+        self._usage_str = "Usage: {0} gc sources [OPTIONS]\n" \
+            "\n" \
+            "remove least recently used sources until total size not exceed max size\n" \
+            "\n" \
+            "Options: \n" \
+            "  -s, --max-size string [OPTIONAL] max size of sources, e.g. 20G, if not be set, use sources.max_size in settings\n" \
+            "    , --dry-run         [OPTIONAL] only print sources would be removed\n" \
+            "".format(APP_NAME)
+
+    def run(self, args):
+        """
+        run gc
+        """
+        cfg = self._parse_args(args=args)
+        if cfg is None:
+            return False
+
+        max_size = cfg.max_size
+        if max_size is None:
+            max_size = SettingsHandle().source_max_size
+        if max_size <= 0:
+            logging.info("sources max size is not set, skip gc")
+            return True
+
+        source_root = SettingsHandle().source_path
+        gc_handle = SourceGcHandle(source_root, max_size)
+        return gc_handle.collect(dry_run=cfg.dry_run)
+
+    def _parse_args(self, args):
+        """
+        parse arguments
+        """
+        cfg = GarbageCollectorConfig()
+        opts, remains = getopt.gnu_getopt(
+            args, "hs:",
+            [
+                "help", "max-size=", "dry-run"
+            ]
+        )
+
+        for opt, arg in opts:
+            if opt in ("-h", "--help"):
+                print(self._usage_str)
+                sys.exit(0)
+            elif opt in ("-s", "--max-size"):
+                cfg.max_size = Utils.parse_size(arg)
+                if cfg.max_size is None:
+                    print("invalid max size: {}".format(arg))
+                    return None
+            elif opt in ("--dry-run"):
+                cfg.dry_run = True
+
+        if len(remains) != 1 or remains[0] != "sources":
+            print(self._usage_str)
+            return None
+        cfg.target = remains[0]
+        return cfg
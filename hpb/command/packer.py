@@ -119,26 +119,18 @@ class Packer:
         filename = self.pkg_meta.gen_pkg_name()
         filename += ".tar.gz"
 
-        origin_dir = os.path.abspath(os.curdir)
-        os.chdir(self.output_dir)
-        logging.info("change dir to: {}".format(self.output_dir))
+        dst_filepath = os.path.join(self.pkg_dir, filename)
+        logging.info("tar: {}".format(dst_filepath))
 
-        logging.info("tar: {}".format(filename))
+        # files in output directory are added with relative names
         files = os.listdir(self.output_dir)
-        with tarfile.open(filename, "w:gz", format=tarfile.GNU_FORMAT) as tar:
+        with tarfile.open(
+                dst_filepath, "w:gz", format=tarfile.GNU_FORMAT) as tar:
             for f in files:
                 logging.info("add {}".format(f))
-                tar.add(f)
-
-        os.chdir(origin_dir)
-        logging.info("restore dir to: {}".format(origin_dir))
-
-        src_filepath = os.path.join(self.output_dir, filename)
-        dst_filepath = os.path.join(self.pkg_dir, filename)
-
-        shutil.move(src_filepath, dst_filepath)
+                tar.add(os.path.join(self.output_dir, f), arcname=f)
 
-        logging.info("move package to {}".format(dst_filepath))
+        logging.info("package: {}".format(dst_filepath))
 
     def _copy_meta_files(self):
         """
@@ -150,8 +150,7 @@ class Searcher:
         qry.meta.source_info.maintainer = self.cfg.maintainer
         qry.meta.source_info.name = self.cfg.name
         qry.meta.source_info.tag = self.cfg.tag
-        db_path = SettingsHandle().db_path
-        with DBHandle(db_path, isolation_level="EXCLUSIVE") as db_handle:
+        with self._open_db() as db_handle:
             mapper_pkg = MapperPkg()
             curr_tags = mapper_pkg.query_tags(db_handle.conn, qry)
             tags.extend(curr_tags)
@@ -180,8 +179,7 @@ class Searcher:
         # search local
         qry = PackageInfo()
         qry.meta.source_info.maintainer = self.cfg.maintainer
-        db_path = SettingsHandle().db_path
-        with DBHandle(db_path, isolation_level="EXCLUSIVE") as db_handle:
+        with self._open_db() as db_handle:
             mapper_pkg = MapperPkg()
             curr_repos = mapper_pkg.query_maintainer_repos(db_handle.conn, qry)
             repos.extend(curr_repos)
@@ -210,8 +208,7 @@ class Searcher:
         # search local
         qry = PackageInfo()
         qry.meta.source_info.name = self.cfg.name
-        db_path = SettingsHandle().db_path
-        with DBHandle(db_path, isolation_level="EXCLUSIVE") as db_handle:
+        with self._open_db() as db_handle:
             mapper_pkg = MapperPkg()
             curr_maintainers = mapper_pkg.query_repos(db_handle.conn, qry)
             maintainers.extend(curr_maintainers)
@@ -231,6 +228,15 @@ class Searcher:
 
         return maintainers
 
+    def _open_db(self) -> DBHandle:
+        """
+        open read-only db handle, package table is created or migrated once
+        per process before it
+        """
+        db_path = SettingsHandle().db_path
+        DBHandle.create_tables(db_path, [MapperPkg()])
+        return DBHandle(db_path, readonly=True)
+
     def _search_candidate(self) -> typing.List[PackageInfo]:
         """
         search candidate target path
@@ -242,54 +248,24 @@ class Searcher:
         qry.meta.source_info.maintainer = self.cfg.maintainer
         qry.meta.source_info.name = self.cfg.name
         qry.meta.source_info.tag = self.cfg.tag
-        db_path = SettingsHandle().db_path
-        with DBHandle(db_path, isolation_level="EXCLUSIVE") as db_handle:
+        qry.meta.build_info.build_type = self.cfg.build_type
+        qry.meta.platform.system = self.cfg.system_name
+        qry.meta.platform.machine = self.cfg.machine
+        if len(self.cfg.distr) > 0:
+            v = self.cfg.distr.split("-", 1)
+            qry.meta.platform.distr_id = v[0]
+            if len(v) > 1:
+                qry.meta.platform.distr_ver = v[1]
+        with self._open_db() as db_handle:
             mapper_pkg = MapperPkg()
             curr_results = mapper_pkg.query(db_handle.conn, qry)
             results.extend(curr_results)
-        for result in results:
-            pkg_meta_filepath = os.path.join(result.path, "hpb.yml")
-            pkg_meta = PackageMeta()
-            pkg_meta.load_from_file(pkg_meta_filepath)
-            if self._filter_pkg_meta(qry.meta, pkg_meta) is False:
-                continue
-            result.meta = pkg_meta
 
         # search remote
         # TODO:
 
         return results
 
-    def _filter_pkg_meta(self, qry_meta: PackageMeta, pkg_meta: PackageMeta):
-        """
-        filter package meta
-        """
-        if len(qry_meta.build_info.build_type) > 0:
-            qry_build_type = qry_meta.build_info.build_type.lower()
-            pkg_build_type = pkg_meta.build_info.build_type.lower()
-            if qry_build_type != pkg_build_type:
-                return False
-
-        if len(qry_meta.platform.system) > 0:
-            qry_system = qry_meta.platform.system.lower()
-            pkg_system = pkg_meta.platform.system.lower()
-            if qry_system != pkg_system:
-                return False
-
-        if len(qry_meta.platform.distr_id) > 0:
-            qry_distr_id = qry_meta.platform.system.lower()
-            pkg_distr_id = pkg_meta.platform.distr_id.lower()
-            if qry_distr_id != pkg_distr_id:
-                return False
-
-        if len(qry_meta.platform.machine) > 0:
-            qry_machine = qry_meta.platform.system.lower()
-            pkg_machine = pkg_meta.platform.machine.lower()
-            if qry_machine != pkg_machine:
-                return False
-
-        return True
-
     def _search_candidate_local(self, repo: RepoConfig) \
             -> typing.List[PackageInfo]:
         """
@@ -11,6 +11,7 @@ from hpb.data_type.constant_var import APP_NAME
 from hpb.data_type.package_info import PackageInfo
 from hpb.data_type.package_meta import PackageMeta
 from hpb.mapper.mapper_pkg import MapperPkg
+from hpb.mapper.mapper_recipe import MapperRecipe
 from hpb.utils.utils import Utils
 
 
@@ -80,7 +81,15 @@ class Uploader:
                 with DBHandle(db_path, isolation_level="EXCLUSIVE") as \
                         db_handle:
                     mapper_pkg = MapperPkg()
+                    mapper_pkg.create_table(db_handle.conn)
                     mapper_pkg.insert(db_handle.conn, [pkg_info])
+
+                    mapper_recipe = MapperRecipe()
+                    mapper_recipe.create_table(db_handle.conn)
+                    mapper_recipe.remove_by_dirpath(db_handle.conn, dirpath)
+                    if len(self.recipe_hash) > 0:
+                        mapper_recipe.insert(
+                            db_handle.conn, self.recipe_hash, dirpath)
             else:
                 logging.warning(
                     "Artifacts push to remote repo currently not support")
@@ -132,13 +141,15 @@ class Uploader:
 
         self.pkg_dir = ""
         self.pkg_file = Utils.expand_path("./pkg.yml")
+        self.recipe_hash = ""
         if len(self.cfg.pkg_dir) != 0:
             self.pkg_dir = self.cfg.pkg_dir
         if len(self.cfg.pkg_file) != 0:
             self.pkg_file = self.cfg.pkg_file
 
         if len(self.pkg_dir) == 0:
-            self.pkg_dir = self._get_pkg_dir_from_yml(self.pkg_file)
+            self.pkg_dir, self.recipe_hash = \
+                self._get_pkg_dir_from_yml(self.pkg_file)
         if len(self.pkg_dir) == 0:
             return False
 
@@ -150,15 +161,15 @@ class Uploader:
 
     def _get_pkg_dir_from_yml(self, filepath):
         """
-        get pkg dir from yml file
+        get pkg dir and recipe hash from yml file
         """
         yaml_handle = YamlHandle()
         pkg_info = yaml_handle.load(filepath)
         if pkg_info is None:
             logging.error(
                 "failed load package config file: {}".format(filepath))
-            return ""
-        return pkg_info["pkg_dir"]
+            return "", ""
+        return pkg_info["pkg_dir"], pkg_info.get("recipe_hash", "")
 
     def _parse_args(self, args):
         """
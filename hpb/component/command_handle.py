@@ -1,6 +1,7 @@
 import logging
 import os
 import selectors
+import signal
 import subprocess
 
 from threading import Thread
@@ -8,15 +9,87 @@ import typing
 
 
 class CommandHandle:
-    def __init__(self, cb_stdout=None, cb_stderr=None):
+    def __init__(
+            self, cb_stdout=None, cb_stderr=None,
+            cwd=None, logger_name="command", kill_group=False,
+            raw_output=False, env=None):
         """
         init command handle
         :param cb_stdout: stdout callback function
         :param cb_stderr: stderr callback function
+        :param cwd: working directory of commands, None for current directory
+        :param logger_name: logger which command output write into
+        :param kill_group: run command in new process group, and kill the
+            whole group when terminate
+        :param raw_output: write command output bytes into logger's streams
+            directly instead of log records, only available in posix
+        :param env: environment variables of commands, None for inherit
         """
-        self._command_logger = logging.getLogger("command")
+        self._command_logger = logging.getLogger(logger_name)
         self._cb_stdout = cb_stdout
         self._cb_stderr = cb_stderr
+        self._cwd = cwd
+        self._kill_group = kill_group and os.name == "posix"
+        self._proc = None
+        self._terminated = False
+        self._raw_output = raw_output
+        self._env = env
+        self._returncode = None
+        self._usage = None
+        self._chunk_size = 64 * 1024
+
+    @property
+    def cwd(self):
+        """
+        get working directory of commands
+        """
+        if self._cwd is None:
+            return os.path.abspath(os.getcwd())
+        return self._cwd
+
+    @property
+    def returncode(self):
+        """
+        get return code of last command
+        """
+        return self._returncode
+
+    @property
+    def usage(self):
+        """
+        get resource usage of last command, dict with cpu time in seconds
+        and max rss in KB, None if not available
+        """
+        return self._usage
+
+    @property
+    def command_logger(self):
+        """
+        get logger which command output write into
+        """
+        return self._command_logger
+
+    def terminate(self):
+        """
+        terminate running command and refuse to run new commands
+        """
+        self._terminated = True
+        p = self._proc
+        if p is None or p.poll() is not None:
+            return
+        try:
+            if self._kill_group:
+                os.killpg(p.pid, signal.SIGTERM)
+            else:
+                p.terminate()
+        except Exception as e:
+            logging.warning("failed terminate subprocess: {}".format(e))
+
+    def close(self):
+        """
+        close command handle
+        """
+        pass
 
     def exec(self, command):
         """
@@ -25,14 +98,26 @@ class CommandHandle:
         command = command.strip()
         logging.debug("exec command: {}".format(command))
         self._command_logger.info("REAL_COMMAND|{}".format(command))
+        self._returncode = None
+        self._usage = None
+
+        if self._terminated:
+            logging.warning("command handle terminated, skip: {}".format(
+                command))
+            return False
 
         pos = command.find("cd ")
         if pos == 0:
             chpath = command[pos+2:].strip()
             chpath = chpath.strip("\"")
             if not os.path.isabs(chpath):
-                chpath = os.path.join(os.getcwd(), chpath)
-            os.chdir(chpath)
+                chpath = os.path.join(self.cwd, chpath)
+            chpath = os.path.normpath(chpath)
+            if not os.path.isdir(chpath):
+                logging.error("failed change dir: {}".format(chpath))
+                return False
+            self._cwd = chpath
+            self._returncode = 0
             return True
 
         # join multiple line and remove '\$' for windows
@@ -42,12 +127,20 @@ class CommandHandle:
 
         p = subprocess.Popen(
             command, shell=True,
+            cwd=self._cwd,
+            env=self._env,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE)
+            stderr=subprocess.PIPE,
+            start_new_session=self._kill_group)
+        self._proc = p
+        if self._terminated:
+            self.terminate()
         try:
             self._exec_subporcess(p)
+            self._wait_subprocess(p)
             p.communicate()
+            self._returncode = p.returncode
             if p.returncode is not None and p.returncode != 0:
                 logging.error("failed exec: {}, ret code: {}".format(
                     command, p.returncode))
@@ -56,6 +149,8 @@ class CommandHandle:
             logging.warning("wait subprocess finish except: {}".format(e))
             p.terminate()
             return False
+        finally:
+            self._proc = None
         return True
 
     def exec_and_get_ret(
@@ -91,8 +186,32 @@ class CommandHandle:
         :param p: subprocess
         """
         # NOTE: windows not support select fileno
-        # self._exec_subprocess_with_select(p)
-        self._exec_subprocess_with_wait_threads(p)
+        if os.name == "posix":
+            self._exec_subprocess_with_select(p)
+        else:
+            self._exec_subprocess_with_wait_threads(p)
+
+    def _wait_subprocess(self, p):
+        """
+        wait subprocess exit and collect its resource usage, usage contains
+        all descendants waited by it, but not the other running commands
+        :param p: subprocess
+        """
+        if not hasattr(os, "wait4"):
+            return
+        try:
+            _, status, ru = os.wait4(p.pid, 0)
+        except ChildProcessError:
+            # already reaped, e.g. polled by terminate
+            return
+        if os.WIFSIGNALED(status):
+            p.returncode = -os.WTERMSIG(status)
+        else:
+            p.returncode = os.WEXITSTATUS(status)
+        self._usage = {
+            "cpu": round(ru.ru_utime + ru.ru_stime, 6),
+            "max_rss_kb": ru.ru_maxrss,
+        }
 
     def _exec_subprocess_with_wait_threads(self, p):
         """
@@ -110,19 +229,7 @@ class CommandHandle:
         """
         def fanout(infile, filetype):
             for line in iter(infile.readline, b""):
-                decode_failed = False
-                try:
-                    data = line.decode("utf-8")
-                except Exception:
-                    decode_failed = True
-
-                if decode_failed is True:
-                    try:
-                        data = line.decode("gb18030")
-                    except Exception:
-                        data = "*** failed decode ***"
-
-                data = data.strip()
+                data = self._decode_line(line)
                 if filetype == "INFO":
                     self._command_logger.info("{}".format(data))
                     if self._cb_stdout is not None:
@@ -137,21 +244,112 @@ class CommandHandle:
         t.start()
         return t
 
+    def _decode_line(self, line):
+        """
+        decode output line
+        """
+        decode_failed = False
+        try:
+            data = line.decode("utf-8")
+        except Exception:
+            decode_failed = True
+
+        if decode_failed is True:
+            try:
+                data = line.decode("gb18030")
+            except Exception:
+                data = "*** failed decode ***"
+
+        return data.strip()
+
     def _exec_subprocess_with_select(self, p):
         """
-        exec subprocess in *nix
+        exec subprocess in *nix, pump stdout and stderr in current thread
+        with chunked reads, output of each chunk is written in batch
         :param p: subprocess
         """
         sel = selectors.DefaultSelector()
-        sel.register(p.stdout, selectors.EVENT_READ)
-        sel.register(p.stderr, selectors.EVENT_READ)
-        while True:
-            for key, _ in sel.select():
-                data = key.fileobj.read1().decode()
-                if not data:
-                    return
-                data = data.strip()
-                if key.fileobj is p.stdout:
-                    self._command_logger.info("{}".format(data))
-                elif key.fileobj is p.stderr:
-                    self._command_logger.error("{}".format(data))
+        sel.register(p.stdout, selectors.EVENT_READ, "INFO")
+        sel.register(p.stderr, selectors.EVENT_READ, "ERROR")
+        remains = {"INFO": b"", "ERROR": b""}
+        try:
+            while len(sel.get_map()) > 0:
+                for key, _ in sel.select():
+                    filetype = key.data
+                    data = os.read(key.fd, self._chunk_size)
+                    if not data:
+                        sel.unregister(key.fileobj)
+                        data = remains[filetype]
+                        if len(data) > 0 and not data.endswith(b"\n"):
+                            data += b"\n"
+                        self._output(filetype, data)
+                        remains[filetype] = b""
+                        continue
+
+                    data = remains[filetype] + data
+                    pos = data.rfind(b"\n")
+                    if pos < 0 and len(data) < self._chunk_size:
+                        # wait for whole line
+                        remains[filetype] = data
+                        continue
+                    remains[filetype] = data[pos+1:] if pos >= 0 else b""
+                    self._output(filetype, data[:pos+1] if pos >= 0 else data)
+        finally:
+            sel.close()
+
+    def _output(self, filetype, data):
+        """
+        output chunk of command output, only decode it when output into log
+        records or callbacks
+        :param filetype: INFO or ERROR
+        :param data: bytes which contain whole lines
+        """
+        if len(data) == 0:
+            return
+
+        if filetype == "INFO":
+            log_func = self._command_logger.info
+            cb = self._cb_stdout
+        else:
+            log_func = self._command_logger.error
+            cb = self._cb_stderr
+
+        if self._raw_output:
+            self._write_raw(data)
+            if cb is None:
+                return
+
+        lines = [self._decode_line(line) for line in data.splitlines()]
+        if not self._raw_output:
+            log_func("\n".join(lines))
+        if cb is not None:
+            for line in lines:
+                cb(line)
+
+    def _write_raw(self, data):
+        """
+        write bytes into streams of command logger's handlers
+        :param data: output bytes
+        """
+        logger = self._command_logger
+        while logger is not None:
+            for handler in logger.handlers:
+                if not isinstance(handler, logging.StreamHandler):
+                    continue
+                handler.acquire()
+                try:
+                    handler.flush()
+                    stream = handler.stream
+                    if stream is None:
+                        continue
+                    buffer = getattr(stream, "buffer", None)
+                    if buffer is not None:
+                        buffer.write(data)
+                        buffer.flush()
+                    else:
+                        stream.write(data.decode("utf-8", errors="replace"))
+                finally:
+                    handler.release()
+            if not logger.propagate:
+                break
+            logger = logger.parent
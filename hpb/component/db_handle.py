@@ -1,28 +1,120 @@
+import logging
+import os
 import sqlite3
+import threading
+import urllib.request
 
 
 class DBHandle:
     """
-    local package db handle
+    local package db handle, db is opened in WAL mode so readers are not
+    blocked by writer, connections are reused in the same thread
     """
 
-    def __init__(self, database, isolation_level=""):
+    # wait for lock of other writer instead of failed immediately
+    BUSY_TIMEOUT = 30.0
+
+    _local = threading.local()
+
+    # (db file path, mapper class name) of tables already created
+    _inited_tables = set()
+    _inited_lock = threading.Lock()
+
+    def __init__(self, database, isolation_level="", readonly=False):
+        """
+        init db handle
+        :param database: db file path
+        :param isolation_level: isolation level of writable connection
+        :param readonly: open read-only connection, used for searches
+        """
         self.pkg_table_name = "package"
 
         self.isolation_level = isolation_level
-        self.conn = sqlite3.connect(database, isolation_level=isolation_level)
-
-        self.select_pkg_sqlstr = \
-            "SELECT " \
-            "dirpath, maintainer, name, tag, " \
-            "sys, sys_release, sys_ver, machine_arch, " \
-            "distr_id, distr_ver, build_type, fat_pkg, " \
-            "cc, cc_ver, cxx, cxx_ver, " \
-            "libc, libc_ver " \
-            "from {} ".format(self.pkg_table_name)
+        self.readonly = readonly
+        self.conn = self._get_conn(database)
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
-        self.conn.close()
+        # connection is kept for reuse, discard uncommitted changes as if
+        # it was closed
+        if self.conn.in_transaction:
+            self.conn.rollback()
+
+    def _get_conn(self, database):
+        """
+        get connection of current thread, create it if not exists
+        :param database: db file path
+        """
+        conns = getattr(self._local, "conns", None)
+        if conns is None or self._local.pid != os.getpid():
+            conns = {}
+            self._local.conns = conns
+            self._local.pid = os.getpid()
+
+        key = (
+            os.path.realpath(database), self.readonly, self.isolation_level)
+        conn = conns.get(key, None)
+        if conn is None:
+            conn = self._connect(database)
+            conns[key] = conn
+        return conn
+
+    def _connect(self, database):
+        """
+        open connection
+        :param database: db file path
+        """
+        if self.readonly:
+            uri = "file:{}?mode=ro".format(
+                urllib.request.pathname2url(os.path.abspath(database)))
+            return sqlite3.connect(
+                uri, uri=True, timeout=self.BUSY_TIMEOUT,
+                isolation_level=self.isolation_level)
+
+        conn = sqlite3.connect(
+            database, timeout=self.BUSY_TIMEOUT,
+            isolation_level=self.isolation_level)
+        try:
+            # journal mode is persistent in db file
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.OperationalError as e:
+            logging.warning("failed set db WAL mode: {}".format(e))
+        return conn
+
+    @classmethod
+    def create_tables(cls, database, mappers):
+        """
+        create or migrate tables of mappers once per process, so pure reads
+        can use read-only connections without running DDL every time
+        :param database: db file path
+        :param mappers: mappers which have create_table(conn)
+        """
+        realpath = os.path.realpath(database)
+        with cls._inited_lock:
+            if not os.path.exists(realpath):
+                cls._inited_tables = {
+                    x for x in cls._inited_tables if x[0] != realpath}
+            mappers = [
+                x for x in mappers
+                if (realpath, type(x).__name__) not in cls._inited_tables]
+            if len(mappers) == 0:
+                return
+            with DBHandle(database, isolation_level="EXCLUSIVE") as db_handle:
+                for mapper in mappers:
+                    mapper.create_table(db_handle.conn)
+                    cls._inited_tables.add((realpath, type(mapper).__name__))
+
+    @classmethod
+    def close_all(cls):
+        """
+        close connections of current thread
+        """
+        conns = getattr(cls._local, "conns", None)
+        if conns is None:
+            return
+        for conn in conns.values():
+            conn.close()
+        conns.clear()
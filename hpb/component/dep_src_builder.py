@@ -0,0 +1,141 @@
+import copy
+import logging
+import os
+import re
+import typing
+
+from hpb.component.settings_handle import SettingsHandle
+from hpb.component.workspace_handle import WorkspaceHandle, WorkspaceRecipe
+from hpb.data_type.builder_config import BuilderConfig
+
+
+class DepSrcBuilder:
+    """
+    build missing dependencies from source, recipe of dependency be searched
+    in recipe directories of settings
+    """
+
+    # dependencies being built by ancestor builds, avoid endless recursion
+    ENV_CHAIN = "HPB_BUILD_SRC_CHAIN"
+
+    def __init__(self, working_dir, task_id, max_jobs=1, wait_ready=None):
+        """
+        init dependency source builder
+        :param working_dir: working directory of dependency builds
+        :param task_id: task id of dependency builds
+        :param max_jobs: max number of dependencies build concurrently
+        :param wait_ready: called before build, return False to cancel it,
+            e.g. source of current build failed to download
+        """
+        self.working_dir = working_dir
+        self.task_id = task_id
+        self.max_jobs = max_jobs
+        self.wait_ready = wait_ready
+        self._recipes: typing.Optional[typing.List[WorkspaceRecipe]] = None
+
+    def build(self, deps, is_missing) -> bool:
+        """
+        build dependencies, missing dependencies of their recipes be built
+        in the same batch, independent dependencies build concurrently
+        :param deps: list of DepItem
+        :param is_missing: check whether DepItem not exists in repo
+        """
+        if self.wait_ready is not None and self.wait_ready() is False:
+            logging.error("cancel building dependencies from source")
+            return False
+
+        chain = os.environ.get(self.ENV_CHAIN, "")
+        chain_keys = set(chain.split(";")) if len(chain) > 0 else set()
+
+        workspace = WorkspaceHandle()
+        cfg = BuilderConfig()
+        cfg.working_dir = self.working_dir
+        cfg.workspace = self.working_dir
+        cfg.task_id = self.task_id
+        cfg.skip_built = True
+        if workspace.set_input_args(cfg) is False:
+            return False
+
+        batch_keys = set()
+        deps = list(deps)
+        while len(deps) > 0:
+            dep = deps.pop(0)
+            dep_key = "{}/{}@{}".format(dep.maintainer, dep.name, dep.tag)
+            if dep_key in batch_keys:
+                continue
+            if dep_key in chain_keys:
+                logging.error("recursive build dependency: {}".format(
+                    dep_key))
+                return False
+            batch_keys.add(dep_key)
+
+            recipe = self.find_recipe(dep)
+            if recipe is None:
+                logging.error("failed find recipe of dep: {}".format(dep_key))
+                return False
+            logging.info("build dep {} from recipe: {}".format(
+                dep_key, recipe.filepath))
+            recipe.name = "{}-{}".format(recipe.name, dep.tag)
+            workspace.recipes[recipe.name] = recipe
+
+            for maintainer, name, tag in recipe.deps:
+                if len(tag) == 0:
+                    continue
+                sub_dep = copy.copy(dep)
+                sub_dep.maintainer = maintainer
+                sub_dep.name = name
+                sub_dep.tag = tag
+                sub_dep.deps = []
+                if is_missing(sub_dep):
+                    deps.append(sub_dep)
+
+        workspace.max_jobs = max(1, min(self.max_jobs, len(batch_keys)))
+        env = dict(os.environ)
+        env[self.ENV_CHAIN] = ";".join(sorted(chain_keys | batch_keys))
+        workspace.env = env
+        return workspace.build_recipes()
+
+    def find_recipe(self, dep) -> typing.Optional[WorkspaceRecipe]:
+        """
+        find recipe which produce dependency, recipe's source tag must be
+        the same as dependency's tag or a variable can be set by parameter
+        :param dep: DepItem
+        """
+        for recipe in self.load_recipes():
+            if recipe.pkg_name != dep.name:
+                continue
+            if recipe.maintainer != dep.maintainer:
+                continue
+
+            found = copy.copy(recipe)
+            found.params = []
+            m = re.fullmatch(r'\$\{(\w+)\}', recipe.tag)
+            if m is not None:
+                found.params.append("{}={}".format(m.group(1), dep.tag))
+            elif recipe.tag != dep.tag:
+                logging.debug("recipe {} tag {} mismatch: {}".format(
+                    recipe.filepath, recipe.tag, dep.tag))
+                continue
+            return found
+        return None
+
+    def load_recipes(self) -> typing.List[WorkspaceRecipe]:
+        """
+        load recipes in recipe directories
+        """
+        if self._recipes is not None:
+            return self._recipes
+
+        self._recipes = []
+        workspace = WorkspaceHandle()
+        for recipe_dir in SettingsHandle().recipe_paths:
+            if not os.path.isdir(recipe_dir):
+                logging.warning("recipe directory not exists: {}".format(
+                    recipe_dir))
+                continue
+            workspace.workspace_path = recipe_dir
+            for filepath in workspace.get_recipe_paths():
+                recipe = workspace.load_recipe(filepath)
+                if recipe is not None:
+                    self._recipes.append(recipe)
+        return self._recipes
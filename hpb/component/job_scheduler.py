@@ -0,0 +1,168 @@
+import concurrent.futures
+import heapq
+import logging
+import typing
+
+
+class JobScheduler:
+    """
+    workflow job scheduler, run a job as soon as all of its needs completed
+    """
+
+    def __init__(self, max_workers=1, job_priority=None):
+        """
+        init job scheduler
+        :param max_workers: max number of jobs run concurrently
+        :param job_priority: job name -> priority, when several jobs ready at
+            once, job with higher priority run first
+        """
+        self.max_workers = max(1, max_workers)
+        self.job_priority = job_priority if job_priority is not None else {}
+
+    def run(
+            self,
+            job_needs: typing.Dict[str, typing.List[str]],
+            run_job: typing.Callable[[str], bool],
+            cancel_job: typing.Callable[[str], None]):
+        """
+        run jobs
+        :param job_needs: job name -> names of the jobs it needs
+        :param run_job: run single job, return False when job failed
+        :param cancel_job: cancel in-flight job when sibling job failed
+        :return: True if all jobs success
+        """
+        remain_needs = {}
+        for job_name, needs in job_needs.items():
+            remain_needs[job_name] = set(needs)
+
+        ret = True
+        running = {}
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers) as executor:
+            while len(remain_needs) > 0 or len(running) > 0:
+                if ret is True:
+                    for job_name in self.ready_jobs(remain_needs):
+                        if len(running) >= self.max_workers:
+                            break
+                        del remain_needs[job_name]
+                        logging.info("run job: {}".format(job_name))
+                        future = executor.submit(run_job, job_name)
+                        running[future] = job_name
+
+                if len(running) == 0:
+                    break
+
+                done, _ = concurrent.futures.wait(
+                    running.keys(),
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    job_name = running.pop(future)
+                    if self._is_job_success(future, job_name) is False:
+                        if ret is True:
+                            self._cancel_jobs(running.values(), cancel_job)
+                        ret = False
+                        continue
+                    for needs in remain_needs.values():
+                        needs.discard(job_name)
+
+        return ret
+
+    def ready_jobs(self, remain_needs: typing.Dict[str, typing.Set[str]]):
+        """
+        get jobs which all of needs completed
+        :param remain_needs: job name -> names of the jobs not completed yet
+        """
+        ready = [
+            job_name for job_name, needs in remain_needs.items()
+            if len(needs) == 0
+        ]
+        # sort is stable, jobs with the same priority keep declaration order
+        ready.sort(key=lambda job_name: -self.job_priority.get(job_name, 0))
+        return ready
+
+    @staticmethod
+    def critical_paths(
+            job_needs: typing.Dict[str, typing.List[str]],
+            durations: typing.Dict[str, float]) -> typing.Dict[str, float]:
+        """
+        get the longest path from each job to the end of workflow, include
+        job itself
+        :param job_needs: job name -> names of the jobs it needs
+        :param durations: job name -> duration, unknown job treat as 0
+        """
+        children = {job_name: [] for job_name in job_needs.keys()}
+        for job_name, needs in job_needs.items():
+            for dep_name in needs:
+                children[dep_name].append(job_name)
+
+        result = {}
+
+        def get_path(job_name):
+            if job_name not in result:
+                longest = 0
+                for child in children[job_name]:
+                    longest = max(longest, get_path(child))
+                result[job_name] = durations.get(job_name, 0) + longest
+            return result[job_name]
+
+        for job_name in job_needs.keys():
+            get_path(job_name)
+        return result
+
+    def predict(
+            self,
+            job_needs: typing.Dict[str, typing.List[str]],
+            durations: typing.Dict[str, float]) -> float:
+        """
+        predict wall time by simulating scheduling with known durations
+        :param job_needs: job name -> names of the jobs it needs
+        :param durations: job name -> duration, unknown job treat as 0
+        """
+        remain_needs = {}
+        for job_name, needs in job_needs.items():
+            remain_needs[job_name] = set(needs)
+
+        now = 0.0
+        running = []  # heap of (finish time, seq, job name)
+        seq = 0
+        while len(remain_needs) > 0 or len(running) > 0:
+            for job_name in self.ready_jobs(remain_needs):
+                if len(running) >= self.max_workers:
+                    break
+                del remain_needs[job_name]
+                finish = now + durations.get(job_name, 0)
+                heapq.heappush(running, (finish, seq, job_name))
+                seq += 1
+
+            if len(running) == 0:
+                break
+
+            now, _, job_name = heapq.heappop(running)
+            for needs in remain_needs.values():
+                needs.discard(job_name)
+        return now
+
+    def _is_job_success(self, future, job_name):
+        """
+        check job result
+        """
+        try:
+            if future.result() is False:
+                logging.error("failed run job: {}".format(job_name))
+                return False
+        except Exception as e:
+            logging.error("failed run job: {}, {}".format(job_name, e))
+            return False
+        return True
+
+    def _cancel_jobs(self, job_names, cancel_job):
+        """
+        cancel in-flight jobs
+        """
+        for job_name in job_names:
+            logging.warning("cancel job: {}".format(job_name))
+            try:
+                cancel_job(job_name)
+            except Exception as e:
+                logging.warning(
+                    "failed cancel job: {}, {}".format(job_name, e))
@@ -0,0 +1,127 @@
+import concurrent.futures
+import copy
+import itertools
+import logging
+import os
+import re
+import typing
+
+from hpb.component.workflow_handle import WorkflowHandle
+from hpb.data_type.builder_config import BuilderConfig
+
+
+class MatrixHandle:
+    """
+    build matrix variants of workflow in parallel task directories, variants
+    share source, platform probe and dependency search results
+    """
+
+    def __init__(self):
+        self.matrix: typing.Dict[str, typing.List[str]] = {}
+        self.variants: typing.List[typing.Dict[str, str]] = []
+
+        self._cfg = BuilderConfig()
+        self._workflow = WorkflowHandle()
+
+    def load(self, cfg: BuilderConfig, workflow: WorkflowHandle):
+        """
+        load matrix from yml and input arguments, input arguments override
+        the same variable in yml
+        :param cfg: builder input arguments
+        :param workflow: workflow handle with yml loaded
+        """
+        self._cfg = cfg
+        self._workflow = workflow
+
+        self.matrix = workflow.yml_obj.matrix
+        for item in cfg.matrix:
+            kv = item.split("=", 1)
+            if len(kv) != 2 or len(kv[0]) == 0:
+                logging.error("invalid matrix: {}".format(item))
+                return False
+            self.matrix[kv[0]] = [v for v in kv[1].split(",") if len(v) > 0]
+
+        self.variants = []
+        if len(self.matrix) == 0:
+            return True
+        keys = list(self.matrix.keys())
+        for values in itertools.product(*[self.matrix[k] for k in keys]):
+            self.variants.append(dict(zip(keys, values)))
+        return True
+
+    def run(self):
+        """
+        run all variants
+        """
+        workflows = []
+        for variant in self.variants:
+            workflow = self.new_variant_workflow(variant)
+            if workflow is None:
+                return False
+            workflows.append(workflow)
+
+        ret = True
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.get_max_workers(len(workflows))) as executor:
+            futures = {}
+            for workflow in workflows:
+                logging.info("run variant: {}".format(workflow.task_name))
+                futures[executor.submit(workflow.run)] = workflow
+            for future in concurrent.futures.as_completed(futures):
+                workflow = futures[future]
+                try:
+                    success = future.result() is not False
+                except Exception as e:
+                    logging.exception("variant {} exception: {}".format(
+                        workflow.task_name, e))
+                    success = False
+                if success:
+                    logging.info("variant {} success: {}".format(
+                        workflow.task_name, workflow.task_dir))
+                else:
+                    logging.error("variant {} failed: {}".format(
+                        workflow.task_name, workflow.task_dir))
+                    ret = False
+        return ret
+
+    def get_max_workers(self, num_variants):
+        """
+        get max number of variants run concurrently, every variant runs up
+        to cfg.jobs jobs, so host is not oversubscribed by default
+        :param num_variants: number of variants
+        """
+        max_workers = self._cfg.matrix_jobs
+        if max_workers <= 0:
+            max_workers = (os.cpu_count() or 1) // max(1, self._cfg.jobs)
+        return max(1, min(max_workers, num_variants))
+
+    def new_variant_workflow(self, variant) -> typing.Optional[WorkflowHandle]:
+        """
+        create workflow of variant, variant always run in task mode
+        :param variant: variable name -> value
+        """
+        suffix = "-".join([
+            re.sub(r'[^\w.]', "_", v) for v in variant.values()])
+
+        cfg = copy.copy(self._cfg)
+        cfg.mode = "task"
+        cfg.task_name = "{}-{}".format(self._workflow.task_name, suffix)
+        cfg.task_id = self._workflow.task_id
+        cfg.params = list(self._cfg.params)
+        for k, v in variant.items():
+            cfg.params.append("{}={}".format(k, v))
+
+        workflow = WorkflowHandle()
+        if workflow.set_input_args(cfg) is False:
+            return None
+        if workflow.load_yaml_file() is False:
+            return None
+        workflow.memo = self._workflow.memo
+        workflow.command_logger_name = "command.{}".format(cfg.task_name)
+
+        # don't propagate into parent's workflow.log, only print in console
+        command_logger = logging.getLogger(workflow.command_logger_name)
+        command_logger.propagate = False
+        command_logger.addHandler(logging.StreamHandler())
+        workflow.init_command_log()
+        return workflow
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tarfile
+import uuid
+
+from hpb.command.downloader import Downloader
+from hpb.data_type.package_info import PackageInfo
+from hpb.utils.memo_handle import MemoHandle
+
+
+class PkgCacheHandle:
+    """
+    cache of extracted package trees, keyed by package hash and checksum of
+    package file, dependencies are materialized from cache by hardlinks and
+    fallback to copy when hardlink not supported, so files in dependencies
+    directory must be replaced instead of modified in place
+    """
+
+    def __init__(self, cache_dir):
+        """
+        init package cache handle
+        :param cache_dir: cache directory
+        """
+        self.cache_dir = cache_dir
+        self._can_link = True
+
+        # trees already prepared in this process, so package shared by
+        # concurrent downloads be checked and extracted only once
+        self._trees = MemoHandle()
+
+    def materialize(self, pkg_info: PackageInfo, dst_dir):
+        """
+        materialize package files into dst_dir, extract package into cache
+        if it's not cached
+        :param pkg_info: package info
+        :param dst_dir: destination directory
+        """
+        tree_dir = self.get_tree(pkg_info)
+        logging.info("materialize dep: {} -> {}".format(tree_dir, dst_dir))
+        self.link_tree(tree_dir, dst_dir)
+        return True
+
+    def get_tree(self, pkg_info: PackageInfo):
+        """
+        get extracted package tree in cache, extract if not exists
+        :param pkg_info: package info
+        """
+        pkg_filepath = os.path.abspath(
+            Downloader.get_pkg_filepath(pkg_info.path))
+        st = os.stat(pkg_filepath)
+        return self._trees.get(
+            (pkg_filepath, st.st_size, st.st_mtime_ns, pkg_info.hash_val()),
+            lambda: self._get_tree(pkg_info, pkg_filepath))
+
+    def _get_tree(self, pkg_info: PackageInfo, pkg_filepath):
+        """
+        get extracted package tree in cache, extract if not exists
+        :param pkg_info: package info
+        :param pkg_filepath: package file path
+        """
+        checksum = self.file_checksum(pkg_filepath)
+        key = hashlib.sha256("{}:{}".format(
+            pkg_info.hash_val(), checksum).encode("utf-8")).hexdigest()
+        entry_dir = os.path.join(self.cache_dir, "trees", key[:32])
+        tree_dir = os.path.join(entry_dir, "tree")
+        if os.path.isdir(tree_dir):
+            logging.debug("package cache hit: {}".format(pkg_filepath))
+            os.utime(entry_dir, None)
+            return tree_dir
+
+        # extract into temporary directory, then rename it atomically, so
+        # concurrent builds never see partial tree
+        tmp_dir = "{}.{}.tmp".format(entry_dir, uuid.uuid4().hex)
+        try:
+            logging.info("extract package into cache: {} -> {}".format(
+                pkg_filepath, entry_dir))
+            with tarfile.open(pkg_filepath, "r|*") as f:
+                f.extractall(os.path.join(tmp_dir, "tree"))
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({
+                    "path": pkg_filepath,
+                    "hash_val": pkg_info.hash_val(),
+                    "sha256": checksum,
+                }, f, indent=2)
+            try:
+                os.rename(tmp_dir, entry_dir)
+            except OSError:
+                if not os.path.isdir(tree_dir):
+                    raise
+                logging.debug("package already cached by others: {}".format(
+                    entry_dir))
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+        return tree_dir
+
+    def file_checksum(self, filepath):
+        """
+        get sha256 of file, checksum is recorded with file's stat, so
+        unchanged file only be hashed once
+        :param filepath: file path
+        """
+        st = os.stat(filepath)
+        stat_key = [st.st_size, st.st_mtime_ns, st.st_ino]
+        record_path = os.path.join(
+            self.cache_dir, "checksums", "{}.json".format(
+                hashlib.sha1(filepath.encode("utf-8")).hexdigest()))
+        try:
+            with open(record_path, "r") as f:
+                record = json.load(f)
+            if record.get("stat", None) == stat_key:
+                return record["sha256"]
+        except Exception:
+            pass
+
+        sha256 = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        checksum = sha256.hexdigest()
+
+        tmp_path = "{}.{}.tmp".format(record_path, uuid.uuid4().hex)
+        try:
+            os.makedirs(os.path.dirname(record_path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "path": filepath, "stat": stat_key, "sha256": checksum,
+                }, f)
+            os.replace(tmp_path, record_path)
+        except OSError as e:
+            logging.warning("failed record checksum: {}".format(e))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return checksum
+
+    def link_tree(self, src_dir, dst_dir):
+        """
+        create hardlinks of files in src_dir into dst_dir, copy files when
+        hardlink is not supported, e.g. across file systems
+        :param src_dir: source directory
+        :param dst_dir: destination directory
+        """
+        def link(src, dst):
+            if self._can_link:
+                try:
+                    os.link(src, dst)
+                    return dst
+                except OSError as e:
+                    logging.debug("hardlink not supported, copy: {}".format(e))
+                    self._can_link = False
+            return shutil.copy2(src, dst)
+
+        shutil.copytree(
+            src_dir, dst_dir,
+            symlinks=True, copy_function=link, dirs_exist_ok=True)
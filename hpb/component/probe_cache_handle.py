@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from hpb.utils.singleton import singleton
+
+
+@singleton
+class ProbeCacheHandle:
+    """
+    cache results of platform/compiler/libc probing on disk, each result is
+    keyed by the files it derived from, e.g. compiler binary path, mtime and
+    size, so cached result be invalidated when these files changed
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = None
+        self._max_entries = 128
+        self.cache_path = ""
+
+    @staticmethod
+    def file_key(filepath):
+        """
+        get key of file, empty if file not exists
+        :param filepath: file path
+        """
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return {"path": filepath}
+        return {
+            "path": os.path.realpath(filepath),
+            "mtime": st.st_mtime_ns,
+            "size": st.st_size,
+        }
+
+    @staticmethod
+    def content_key(filepath):
+        """
+        get key of small file by its content, empty if file not exists
+        :param filepath: file path
+        """
+        try:
+            with open(filepath, "rb") as f:
+                content = f.read()
+        except OSError:
+            return {"path": filepath}
+        return {
+            "path": filepath,
+            "sha256": hashlib.sha256(content).hexdigest(),
+        }
+
+    @staticmethod
+    def command_key(command):
+        """
+        get key of executable found in PATH
+        :param command: command name
+        """
+        filepath = shutil.which(command)
+        if filepath is None:
+            return {"command": command}
+        key = ProbeCacheHandle().file_key(filepath)
+        key["command"] = command
+        return key
+
+    def get(self, kind, key, func):
+        """
+        get cached probe result, if not exists, probe by func and cache it
+        :param kind: probe kind, e.g. platform, compiler, libc
+        :param key: json serializable object which probe result derived from
+        :param func: probe function, return json serializable object
+        """
+        content = json.dumps({"kind": kind, "key": key}, sort_keys=True)
+        fp = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+        with self._lock:
+            entries = self._load()
+            if fp in entries:
+                logging.debug("probe cache hit: {}".format(kind))
+                return entries[fp]["value"]
+
+        value = func()
+
+        with self._lock:
+            self._entries[fp] = {
+                "kind": kind,
+                "ts": int(time.time()),
+                "value": value,
+            }
+            self._save(fp)
+        return value
+
+    def clear(self):
+        """
+        remove all cached probe results
+        """
+        with self._lock:
+            self._entries = {}
+            filepath = self._get_filepath()
+            if len(filepath) > 0 and os.path.exists(filepath):
+                os.remove(filepath)
+
+    def _get_filepath(self):
+        """
+        get cache file path, empty for not persist
+        """
+        if len(self.cache_path) == 0:
+            return ""
+        return os.path.join(self.cache_path, "probe.json")
+
+    def _read(self):
+        """
+        read cache file
+        """
+        filepath = self._get_filepath()
+        if len(filepath) == 0 or not os.path.exists(filepath):
+            return {}
+        try:
+            with open(filepath, "r") as f:
+                obj = json.load(f)
+            if type(obj) is dict:
+                return obj
+        except Exception as e:
+            logging.debug("failed read probe cache: {}".format(e))
+        return {}
+
+    def _load(self):
+        """
+        load cache file once
+        """
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def _save(self, fp):
+        """
+        merge new entry into cache file, cache file maybe updated by other
+        processes
+        :param fp: fingerprint of new entry
+        """
+        filepath = self._get_filepath()
+        if len(filepath) == 0:
+            return
+
+        entries = self._read()
+        entries[fp] = self._entries[fp]
+        if len(entries) > self._max_entries:
+            fps = sorted(entries.keys(), key=lambda k: entries[k]["ts"])
+            for k in fps[:len(entries) - self._max_entries]:
+                del entries[k]
+
+        tmp_filepath = "{}.{}.tmp".format(filepath, uuid.uuid4().hex)
+        try:
+            os.makedirs(self.cache_path, exist_ok=True)
+            with open(tmp_filepath, "w") as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_filepath, filepath)
+        except Exception as e:
+            logging.warning("failed write probe cache: {}".format(e))
+            if os.path.exists(tmp_filepath):
+                os.remove(tmp_filepath)
@@ -1,12 +1,18 @@
+import concurrent.futures
 import json
 import logging
+import os
+import shutil
+import time
 import typing
 
 from hpb.command.downloader import Downloader, DownloaderConfig
 from hpb.command.searcher import Searcher, SearcherConfig, PackageInfo
 from hpb.data_type.build_info import BuildInfo
+from hpb.data_type.constant_var import APP_NAME
 from hpb.data_type.semver_item import SemverItem
 from hpb.data_type.platform_info import PlatformInfo
+from hpb.utils.memo_handle import MemoHandle
 
 
 class DepItem:
@@ -77,34 +83,361 @@ class RepoDepsHandle:
     def __init__(
             self,
             platform_info: PlatformInfo,
-            build_info: BuildInfo):
+            build_info: BuildInfo,
+            dep_builder=None,
+            memo: typing.Optional[MemoHandle] = None,
+            max_workers=None,
+            pkg_cache=None):
+        """
+        init repo dependencies handle
+        :param dep_builder: build missing dependencies from source, None for
+            fail when dependency not found
+        :param memo: share search results between handles
+        :param max_workers: max number of dependencies download
+            concurrently, None for decided by cpu count
+        :param pkg_cache: PkgCacheHandle, materialize dependencies from
+            extracted package cache by hardlinks, so files in download
+            directory must not be modified in place, None for extract
+            packages every time
+        """
         self.platform = platform_info
         self.build_info = build_info
+        self.dep_builder = dep_builder
+        self.memo = memo if memo is not None else MemoHandle()
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        self.max_workers = max_workers
+        self.pkg_cache = pkg_cache
 
         self.deps: typing.List[DepItem] = []
         self.search_result_dict = {}
 
-    def search_all_deps(self, deps):
+    def search_all_deps(self, deps, others=None):
         """
         search all dependencies
+        :param deps: dependencies
+        :param others: list of (RepoDepsHandle, dependencies) which be
+            searched in the same pass, e.g. test dependencies, missing
+            dependencies of all handles be built together by dep_builder of
+            this handle
         """
-        for dep in deps:
-            dep_item = DepItem()
-            if dep_item.load(dep) is False:
-                return False
-            self.deps.append(dep_item)
+        groups = [(self, deps)] + list(others or [])
+        for handle, group_deps in groups:
+            handle.deps = []
+            for dep in group_deps:
+                dep_item = DepItem()
+                if dep_item.load(dep) is False:
+                    return False
+                handle.deps.append(dep_item)
+            handle.search_result_dict.clear()
+
+        missing_dict = {}
+        all_missing = []
+        for handle, _ in groups:
+            missing = []
+            for dep in handle.deps:
+                if handle.search_dep_item(dep, missing) is False:
+                    return False
+            missing_dict[handle] = missing
+            for dep in missing:
+                if dep.gen_key() not in \
+                        [item.gen_key() for item in all_missing]:
+                    all_missing.append(dep)
+        if len(all_missing) == 0:
+            return True
+
+        if self.dep_builder is None or \
+                self.dep_builder.build(
+                    all_missing,
+                    lambda dep: self._search(dep) is None) is False:
+            for dep in all_missing:
+                logging.error("failed find dep: \n{}".format(dep))
+            return False
+
+        # search again after missing deps be built and uploaded
+        for handle, missing in missing_dict.items():
+            for dep in missing:
+                if handle.search_dep_item(dep) is False:
+                    return False
+        return True
+
+    def download_all_deps(self, download_dir, incremental=False):
+        """
+        download all deps, packages are downloaded and extracted into their
+        own staging directories concurrently, then merged into download
+        directory in chosen order, so when multiple packages contain the same
+        file, the latter wins as if they were extracted one by one
+        :param download_dir: download directory
+        :param incremental: record chosen packages in manifest of download
+            directory, next time skip download when packages unchanged,
+            otherwise only remove and add changed packages
+        """
+        results = self.get_chosen_deps()
+        if not incremental:
+            if len(results) == 0:
+                return True
+            return self._install_deps(results, download_dir, {}) is not None
+
+        os.makedirs(download_dir, exist_ok=True)
+        manifest_path = os.path.join(
+            download_dir, ".{}-deps.json".format(APP_NAME))
+        pkg_ids = [self._get_pkg_id(result) for result in results]
+        manifest = self._load_manifest(manifest_path)
+        if manifest is not None and \
+                [pkg["id"] for pkg in manifest["packages"]] == pkg_ids:
+            logging.info("dependencies unchanged, reuse: {}".format(
+                download_dir))
+            return True
 
-        self.search_result_dict.clear()
-        for dep in self.deps:
-            if self.search_dep_item(dep) is False:
+        # manifest is written back only after download directory be updated,
+        # so interrupted download leads to reinstall all next time
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        conflicts = None
+        claims = {}
+        if manifest is not None and not manifest["overlapped"]:
+            conflicts, claims = self._update_deps(
+                manifest, results, pkg_ids, download_dir)
+            if conflicts is None:
                 return False
+            if conflicts > 0:
+                logging.info(
+                    "dependencies overlap, reinstall all: {}".format(
+                        download_dir))
+        if conflicts is None or conflicts > 0:
+            self._clear_dir(download_dir)
+            claims = {}
+            conflicts = self._install_deps(results, download_dir, claims)
+            if conflicts is None:
+                return False
+
+        pkg_files = {}
+        for rel_path, pkg_path in claims.items():
+            pkg_files.setdefault(pkg_path, []).append(rel_path)
+        manifest = {
+            "overlapped": conflicts > 0,
+            "packages": [
+                {
+                    "id": pkg_id,
+                    "files": sorted(pkg_files.get(result.path, [])),
+                }
+                for result, pkg_id in zip(results, pkg_ids)
+            ],
+        }
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
         return True
 
-    def download_all_deps(self, download_dir):
+    def _update_deps(self, manifest, results, pkg_ids, download_dir):
         """
-        download all deps
+        remove packages which not chosen any more and install new chosen
+        packages, return number of conflict files and claims
+        :param manifest: manifest of last download
+        :param results: chosen packages
+        :param pkg_ids: id of chosen packages
         :param download_dir: download directory
         """
+        claims = {}
+        removed_files = []
+        for pkg in manifest["packages"]:
+            if pkg["id"] in pkg_ids:
+                for rel_path in pkg["files"]:
+                    claims[rel_path] = pkg["id"]["path"]
+            else:
+                removed_files.extend(pkg["files"])
+        added = [
+            result for result, pkg_id in zip(results, pkg_ids)
+            if pkg_id not in [pkg["id"] for pkg in manifest["packages"]]
+        ]
+        logging.info("update dependencies: remove {}, add {}".format(
+            len(manifest["packages"]) - (len(results) - len(added)),
+            len(added)))
+
+        for rel_path in removed_files:
+            filepath = os.path.join(download_dir, rel_path)
+            if os.path.lexists(filepath):
+                os.remove(filepath)
+            # remove empty parent directories
+            parent = os.path.dirname(rel_path)
+            while len(parent) > 0:
+                dirpath = os.path.join(download_dir, parent)
+                if not os.path.isdir(dirpath) or len(os.listdir(dirpath)) > 0:
+                    break
+                os.rmdir(dirpath)
+                parent = os.path.dirname(parent)
+
+        if len(added) == 0:
+            return 0, claims
+        return self._install_deps(added, download_dir, claims), claims
+
+    def _install_deps(self, results, download_dir, claims):
+        """
+        download packages and merge them into download directory, return
+        number of conflict files, None when failed
+        :param results: packages
+        :param download_dir: download directory
+        :param claims: file path relative to download directory -> package
+        """
+        os.makedirs(download_dir, exist_ok=True)
+        staging_dirs = [
+            os.path.join(download_dir, ".{}-extract-{}".format(APP_NAME, i))
+            for i in range(len(results))
+        ]
+        conflicts = 0
+        try:
+            if self._download_deps_concurrently(
+                    results, staging_dirs) is False:
+                return None
+
+            for result, staging_dir in zip(results, staging_dirs):
+                conflicts += self._merge_dir(
+                    staging_dir, download_dir, "", claims, result.path)
+        finally:
+            for staging_dir in staging_dirs:
+                if os.path.exists(staging_dir):
+                    shutil.rmtree(staging_dir)
+
+        return conflicts
+
+    def _get_pkg_id(self, result: PackageInfo):
+        """
+        get package identity which recorded in manifest
+        :param result: package
+        """
+        pkg_id = {"path": result.path, "hash_val": result.hash_val()}
+        if result.repo_type == "local":
+            st = os.stat(Downloader.get_pkg_filepath(result.path))
+            pkg_id["size"] = st.st_size
+            pkg_id["mtime_ns"] = st.st_mtime_ns
+        return pkg_id
+
+    def _load_manifest(self, manifest_path):
+        """
+        load manifest of download directory, None when not exists or invalid
+        :param manifest_path: manifest file path
+        """
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            for pkg in manifest["packages"]:
+                if not isinstance(pkg["id"], dict) or \
+                        not isinstance(pkg["files"], list):
+                    return None
+            manifest["overlapped"] = bool(manifest["overlapped"])
+        except Exception as e:
+            logging.warning("invalid deps manifest {}: {}".format(
+                manifest_path, e))
+            return None
+        return manifest
+
+    def _clear_dir(self, dst_dir):
+        """
+        remove all files in directory
+        :param dst_dir: directory
+        """
+        logging.info("clear dir: {}".format(dst_dir))
+        for entry in os.scandir(dst_dir):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+
+    def _download_deps_concurrently(self, results, dst_dirs):
+        """
+        download packages concurrently, report progress when each finished
+        :param results: packages
+        :param dst_dirs: download directory of each package
+        """
+        def download(result, dst_dir):
+            start = time.time()
+            ret = self._download_dep(result, dst_dir)
+            return ret, time.time() - start
+
+        ret = True
+        done = 0
+        max_workers = max(1, min(self.max_workers, len(results)))
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers) as executor:
+            futures = {}
+            for result, dst_dir in zip(results, dst_dirs):
+                futures[executor.submit(download, result, dst_dir)] = result
+            for future in concurrent.futures.as_completed(futures):
+                result = futures[future]
+                done += 1
+                try:
+                    success, elapsed = future.result()
+                    success = success is not False
+                except Exception as e:
+                    logging.exception("download dep exception: {}".format(e))
+                    success = False
+                if success:
+                    logging.info("[{}/{}] dep ready in {:.2f}s: {}".format(
+                        done, len(results), elapsed, result.path))
+                    continue
+                logging.error("failed download: \n{}".format(result.path))
+                ret = False
+                for f in futures:
+                    f.cancel()
+        return ret
+
+    def _merge_dir(self, src_dir, dst_dir, rel_dir, claims, pkg_path):
+        """
+        move files in staging directory into download directory, warn when
+        file already be written by other package, return number of conflict
+        files
+        :param src_dir: staging directory
+        :param dst_dir: destination directory
+        :param rel_dir: path relative to download directory
+        :param claims: file path relative to download directory -> package
+        :param pkg_path: package which staging directory belongs to
+        """
+        conflicts = 0
+        if not os.path.isdir(src_dir):
+            return conflicts
+        for entry in os.scandir(src_dir):
+            dst_path = os.path.join(dst_dir, entry.name)
+            rel_path = os.path.join(rel_dir, entry.name)
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir and os.path.isdir(dst_path) and \
+                    not os.path.islink(dst_path):
+                conflicts += self._merge_dir(
+                    entry.path, dst_path, rel_path, claims, pkg_path)
+                continue
+
+            if os.path.lexists(dst_path):
+                logging.warning(
+                    "dep file conflict: {}, {} overwrite {}".format(
+                        rel_path, pkg_path, claims.get(rel_path, "")))
+                conflicts += 1
+                if os.path.isdir(dst_path) and not os.path.islink(dst_path):
+                    shutil.rmtree(dst_path)
+                else:
+                    os.remove(dst_path)
+            os.rename(entry.path, dst_path)
+
+            if is_dir:
+                for root, dirs, files in os.walk(dst_path):
+                    links = [
+                        name for name in dirs
+                        if os.path.islink(os.path.join(root, name))
+                    ]
+                    for name in files + links:
+                        file_rel_path = os.path.join(
+                            rel_path, os.path.relpath(
+                                os.path.join(root, name), dst_path))
+                        claims[file_rel_path] = pkg_path
+            else:
+                claims[rel_path] = pkg_path
+        return conflicts
+
+    def get_chosen_deps(self) -> typing.List[PackageInfo]:
+        """
+        get packages which need to be downloaded, when search results
+        contain the same repo multiple times, choose the newest tag
+        """
         repo_dict = {}
 
         # comb same repo
@@ -114,7 +447,9 @@ class RepoDepsHandle:
             if semver.load(tag) is True:
                 repo_id = "{}${}${}".format(maintainer, repo, semver.major)
                 if repo_id in repo_dict:
-                    if semver.compare(repo_dict[repo_id]) > 0:
+                    curr_semver = SemverItem()
+                    curr_semver.load(repo_dict[repo_id])
+                    if semver.compare(curr_semver) > 0:
                         repo_dict[repo_id] = tag
                 else:
                     repo_dict[repo_id] = tag
@@ -126,26 +461,40 @@ class RepoDepsHandle:
                 else:
                     repo_dict[repo_id] = tag
 
+        results = []
         for repo_id, tag in repo_dict.items():
             maintainer, repo, _ = repo_id.split("$")
             key = self._gen_key(maintainer, repo, tag)
-            result: PackageInfo = self.search_result_dict[key]
-            if self._download_dep(result, download_dir) is False:
-                logging.error("failed download: \n{}".format(result.path))
-                return False
+            results.append(self.search_result_dict[key])
+        return results
 
-        return True
-
-    def search_dep_item(self, dep: DepItem):
+    def search_dep_item(self, dep: DepItem, missing=None):
         """
         search dep's deps
+        :param dep: dependency
+        :param missing: if not None, collect not found deps into it instead
+            of failed
         """
         k = dep.gen_key()
         if k in self.search_result_dict:
             return True
 
-        result = self._search(dep)
+        # chosen result depends on platform and build type, so handles with
+        # the same of them share results, e.g. dependencies and test
+        # dependencies
+        resolve_key = (
+            "resolve", dep.name, dep.maintainer, dep.tag,
+            self.platform.system, self.platform.machine, self.platform.distr,
+            self.build_info.build_type.lower())
+        result = self.memo.get(resolve_key, lambda: self._search(dep))
         if result is None:
+            # not cache missing, it may be built later
+            self.memo.pop(resolve_key)
+            if missing is not None:
+                if k not in [item.gen_key() for item in missing]:
+                    logging.warning("dep not found: {}".format(k))
+                    missing.append(dep)
+                return True
             logging.error("failed find dep: \n{}".format(dep))
             return False
 
@@ -157,7 +506,7 @@ class RepoDepsHandle:
             dep_item = DepItem()
             if dep_item.load(sub_dep) is False:
                 return False
-            if self.search_dep_item(dep_item) is False:
+            if self.search_dep_item(dep_item, missing) is False:
                 return False
 
         return True
@@ -175,11 +524,15 @@ class RepoDepsHandle:
         logging.info("download dep: {}".format(
             search_result.path
         ))
+        if self.pkg_cache is not None and search_result.repo_type == "local":
+            return self.pkg_cache.materialize(search_result, download_dir)
+
         download_cfg = DownloaderConfig()
         download_cfg.repo_type = search_result.repo_type
         download_cfg.path = search_result.path
         download_cfg.dest = download_dir
         download_cfg.extract = True
+        download_cfg.copy = False
         downloader = Downloader()
         return downloader.download(download_cfg)
 
@@ -206,9 +559,15 @@ class RepoDepsHandle:
         search_cfg.system_name = self.platform.system
         search_cfg.machine = self.platform.machine
 
-        searcher = Searcher()
-        search_results = searcher.search(search_cfg)
+        # ranking depends on build info, so only raw results be shared
+        search_key = (
+            "search", dep.name, dep.maintainer, dep.tag,
+            search_cfg.system_name, search_cfg.machine)
+        search_results = self.memo.get(
+            search_key, lambda: Searcher().search(search_cfg))
         if len(search_results) == 0:
+            # not cache missing, it may be built later
+            self.memo.pop(search_key)
             return None
         elif len(search_results) == 1:
             return search_results[0]
@@ -64,9 +64,12 @@ class SettingsHandle:
         self.log_file_level = ""
         self.db_path = ""
         self.source_path = ""
+        self.source_max_size = 0  # max bytes of sources, 0 for unlimited
+        self.cache_path = ""
         self.pkg_search_repos: typing.List[RepoConfig] = []
         self.pkg_upload_repos: typing.List[RepoConfig] = []
         self.build_if_not_exists = False
+        self.recipe_paths: typing.List[str] = []
 
     def init(self, user_settings=""):
         """
@@ -126,6 +129,15 @@ class SettingsHandle:
         nodes = root.getElementsByTagName("packages")
         self._load_packages(nodes)
 
+        nodes = root.getElementsByTagName("cache")
+        self._load_cache(nodes)
+
+        nodes = root.getElementsByTagName("build_src_if_not_exists")
+        self._load_build_src(nodes)
+
+        nodes = root.getElementsByTagName("recipes")
+        self._load_recipes(nodes)
+
     def _load_log(self, nodes):
         """
         load log config
@@ -180,6 +192,14 @@ class SettingsHandle:
             print("WARNING! Multiple 'sources' in settings, use first node")
 
         node_sources = nodes[0]
+        if node_sources.hasAttribute("max_size"):
+            val = node_sources.getAttribute("max_size")
+            max_size = Utils.parse_size(val)
+            if max_size is None:
+                print("WARNING! Invalid 'sources.max_size': {}".format(val))
+            else:
+                self.source_max_size = max_size
+
         node_path_list = node_sources.getElementsByTagName("path")
         if len(node_path_list) == 0:
             print("WARNING! Can't find 'sources/path' in settings, use default")
@@ -194,6 +214,55 @@ class SettingsHandle:
         val = node_source.firstChild.nodeValue
         self.source_path = Utils.expand_path(val)
 
+    def _load_cache(self, nodes):
+        """
+        load cache path
+        """
+        default_cache_path = "~/.{}/cache".format(APP_NAME)
+
+        if len(nodes) == 0:
+            self.cache_path = Utils.expand_path(default_cache_path)
+            return
+
+        if len(nodes) > 1:
+            print("WARNING! Multiple 'cache' in settings, use first node")
+
+        node_path_list = nodes[0].getElementsByTagName("path")
+        if len(node_path_list) == 0:
+            self.cache_path = Utils.expand_path(default_cache_path)
+            return
+
+        if len(node_path_list) > 1:
+            print("WARNING! Multiple 'cache.path' in settings, use first node")
+
+        val = node_path_list[0].firstChild.nodeValue
+        self.cache_path = Utils.expand_path(val)
+
+    def _load_build_src(self, nodes):
+        """
+        load build source if package not exists
+        """
+        if len(nodes) == 0:
+            self.build_if_not_exists = False
+            return
+
+        if len(nodes) > 1:
+            print("WARNING! Multiple 'build_src_if_not_exists' in settings, "
+                  "use first node")
+
+        val = nodes[0].firstChild.nodeValue
+        self.build_if_not_exists = Utils.get_boolean(val.strip())
+
+    def _load_recipes(self, nodes):
+        """
+        load recipe directories
+        """
+        self.recipe_paths = []
+        for node in nodes:
+            for node_path in node.getElementsByTagName("path"):
+                val = node_path.firstChild.nodeValue
+                self.recipe_paths.append(Utils.expand_path(val))
+
     def _load_packages(self, nodes):
         """
         load packages search path
@@ -0,0 +1,183 @@
+import logging
+import os
+import queue
+import subprocess
+import uuid
+
+from threading import Thread
+
+from hpb.component.command_handle import CommandHandle
+
+
+class ShellSession(CommandHandle):
+    """
+    run commands in one long-lived shell, so environment variables and
+    working directory persist between commands, and only one shell process
+    and two output threads are created for the whole session
+    """
+
+    def __init__(
+            self, cb_stdout=None, cb_stderr=None,
+            cwd=None, logger_name="command", kill_group=False,
+            raw_output=False, shell="/bin/sh"):
+        """
+        init shell session
+        :param shell: shell executable
+        """
+        super().__init__(
+            cb_stdout=cb_stdout, cb_stderr=cb_stderr,
+            cwd=cwd, logger_name=logger_name, kill_group=kill_group,
+            raw_output=raw_output)
+        self._shell = shell
+        self._token = "__HPB_{}__".format(uuid.uuid4().hex)
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def close(self):
+        """
+        exit shell and wait output threads
+        """
+        p = self._proc
+        if p is None:
+            return
+        self._proc = None
+        try:
+            if p.poll() is None:
+                p.stdin.write(b"exit\n")
+                p.stdin.flush()
+            p.stdin.close()
+        except Exception as e:
+            logging.debug("failed close shell stdin: {}".format(e))
+        p.wait()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        self._queue = queue.Queue()
+
+    def exec(self, command):
+        """
+        exec command in shell session
+        """
+        command = command.strip()
+        logging.debug("exec command: {}".format(command))
+        self._command_logger.info("REAL_COMMAND|{}".format(command))
+        self._returncode = None
+
+        if self._terminated:
+            logging.warning("shell session terminated, skip: {}".format(
+                command))
+            return False
+
+        # join multiple line
+        command = command.replace("\\\r\n", "")
+        command = command.replace("\\\n", "")
+        command = command.replace("\\\r", "")
+
+        if self._proc is None and self._start() is False:
+            return False
+
+        # run command in current shell with stdin detached, then write exit
+        # status and working directory as frame end of stdout, and a frame
+        # end of stderr
+        script = \
+            "{{\n{0}\n}} < /dev/null\n" \
+            "printf '%s %d %s\\n' '{1}' \"$?\" \"$PWD\"\n" \
+            "printf '%s\\n' '{1}' >&2\n" \
+            "".format(command, self._token)
+        try:
+            self._proc.stdin.write(os.fsencode(script))
+            self._proc.stdin.flush()
+        except Exception as e:
+            logging.error("failed write command into shell: {}".format(e))
+            return False
+
+        ret_code = None
+        exited = False
+        wait_streams = {"INFO", "ERROR"}
+        while len(wait_streams) > 0:
+            filetype, frame_end = self._queue.get()
+            wait_streams.discard(filetype)
+            if frame_end is None:
+                exited = True
+                wait_streams.clear()
+            elif filetype == "INFO":
+                v = frame_end.split(" ", 1)
+                ret_code = int(v[0])
+                if len(v) > 1:
+                    self._cwd = v[1]
+
+        if exited:
+            # command exit the shell, e.g. 'exit 0' or failed under 'set -e',
+            # environment is lost, so report failure whatever the exit code
+            # is, and next command runs in new shell
+            if self._proc.poll() is None:
+                # output reader failed while shell still alive
+                self._proc.kill()
+            ret_code = self._proc.wait()
+            self.close()
+            self._returncode = ret_code
+            logging.error(
+                "shell session exited: {}, ret code: {}".format(
+                    command, ret_code))
+            return False
+
+        self._returncode = ret_code
+        if ret_code != 0:
+            logging.error("failed exec: {}, ret code: {}".format(
+                command, ret_code))
+            return False
+        return True
+
+    def _start(self):
+        """
+        start shell
+        """
+        try:
+            self._proc = subprocess.Popen(
+                [self._shell],
+                cwd=self._cwd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=self._kill_group)
+        except Exception as e:
+            logging.error("failed start shell {}: {}".format(self._shell, e))
+            return False
+
+        self._threads = [
+            self._tee_frame(self._proc.stdout, "INFO"),
+            self._tee_frame(self._proc.stderr, "ERROR"),
+        ]
+        return True
+
+    def _tee_frame(self, infile, filetype):
+        """
+        tee shell output, and put frame end into queue
+        """
+        token = self._token.encode("utf-8")
+
+        def fanout(infile, filetype, frame_queue):
+            try:
+                for line in iter(infile.readline, b""):
+                    pos = line.find(token)
+                    if pos >= 0:
+                        # working directory may not be valid utf-8, keep
+                        # its bytes as file system path
+                        frame_end = os.fsdecode(
+                            line[pos+len(token):]).strip()
+                        line = line[:pos]
+                        if len(line) > 0:
+                            line += b"\n"
+                    self._output(filetype, line)
+                    if pos >= 0:
+                        frame_queue.put((filetype, frame_end))
+            except Exception as e:
+                logging.error("failed read shell output: {}".format(e))
+            finally:
+                # always end the frame, so exec never waits forever
+                frame_queue.put((filetype, None))
+
+        t = Thread(target=fanout, args=(infile, filetype, self._queue))
+        t.daemon = True
+        t.start()
+        return t
@@ -1,13 +1,25 @@
+import hashlib
 import logging
 import os
+import re
+import shlex
+import subprocess
 
 from hpb.component.command_handle import CommandHandle
 from hpb.data_type.source_info import SourceInfo
+from hpb.utils.file_lock import FileLock
 
 
 class SourceDownloader:
+    """
+    download source, git repository is cached as bare mirror in source root,
+    each tag is checked out as a worktree of the mirror, so a new tag only
+    cost an incremental fetch
+    """
+
     def __init__(self):
         self.source_path = ""
+        self.mirror_path = ""
 
     def download(self, src_info: SourceInfo, source_root: str):
         """
@@ -24,6 +36,62 @@ class SourceDownloader:
                 src_info.repo_kind))
             return False
 
+    @staticmethod
+    def get_mirror_path(source_root, repo_url):
+        """
+        get bare mirror path of repo url
+        :param source_root: source root path
+        :param repo_url: git repository url
+        """
+        name = os.path.basename(repo_url.rstrip("/\\"))
+        if name.endswith(".git"):
+            name = name[:-4]
+        name = re.sub(r'[^\w.-]', "_", name)
+        url_hash = hashlib.sha1(repo_url.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(
+            source_root, "_mirrors", "{}-{}.git".format(name, url_hash))
+
+    @staticmethod
+    def get_source_path(src_info: SourceInfo, source_root):
+        """
+        get checkout path of source
+        :param src_info: source info
+        :param source_root: source root path
+        """
+        if src_info.tag == "":
+            return os.path.join(
+                source_root, src_info.maintainer, src_info.name)
+        return os.path.join(
+            source_root,
+            src_info.maintainer,
+            "{}-{}".format(src_info.name, src_info.tag)
+        )
+
+    @staticmethod
+    def get_usage_path(source_root, source_path):
+        """
+        get usage file of checkout, its mtime is the last used time, and
+        builds hold shared lock on it while using the checkout
+        :param source_root: source root path
+        :param source_path: checkout path
+        """
+        return os.path.join(
+            source_root, "_usage", os.path.relpath(source_path, source_root))
+
+    @staticmethod
+    def touch(filepath):
+        """
+        update mtime of file, create it if not exists
+        :param filepath: file path
+        """
+        try:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, "a"):
+                pass
+            os.utime(filepath, None)
+        except OSError as e:
+            logging.warning("failed touch {}: {}".format(filepath, e))
+
     def download_src_git(self, src_info: SourceInfo, source_root: str):
         """
         download source through git
@@ -43,57 +111,164 @@ class SourceDownloader:
                 "failed download source, field 'source.repo_url' is empty")
             return False
 
-        if src_info.git_depth == 1:
-            if src_info.tag == "":
-                logging.error(
-                    "failed download source, "
-                    "use git depth=1 with field 'source.tag' is empty")
-                return False
-            self.source_path = os.path.join(
-                source_root,
-                src_info.maintainer,
-                "{}-{}".format(src_info.name, src_info.tag)
-            )
+        if src_info.git_depth == 1 and src_info.tag == "":
+            logging.error(
+                "failed download source, "
+                "use git depth=1 with field 'source.tag' is empty")
+            return False
+
+        self.source_path = self.get_source_path(src_info, source_root)
+        self.mirror_path = self.get_mirror_path(
+            source_root, src_info.repo_url)
+        mirror_lock_path = "{}.lock".format(self.mirror_path)
+        self.touch(self.get_usage_path(source_root, self.source_path))
+
+        # builds of the same repository wait for each other here
+        with FileLock(mirror_lock_path):
+            self.touch(mirror_lock_path)
             if os.path.exists(self.source_path):
                 logging.info("{} already exists, skip download".format(
                     self.source_path))
                 return True
-            command = "git clone --branch={} --depth={} {} {}".format(
-                src_info.tag,
-                src_info.git_depth,
-                src_info.repo_url,
-                self.source_path
-            )
-            logging.info("run command: {}".format(command))
-            return CommandHandle().exec(command=command)
+            if self._update_mirror(src_info) is False:
+                return False
+            return self._add_worktree(src_info)
+
+    def _update_mirror(self, src_info: SourceInfo):
+        """
+        create bare mirror if not exists, and fetch the tag if it's missing
+        """
+        if not os.path.exists(self.mirror_path):
+            if self._git(["init", "-q", "--bare", self.mirror_path],
+                         cwd=None) is False:
+                return False
+            if self._git(["remote", "add", "origin",
+                          src_info.repo_url]) is False:
+                return False
+            if self._git(["config", "--add", "remote.origin.fetch",
+                          "+refs/tags/*:refs/tags/*"]) is False:
+                return False
+
+        tag = src_info.tag
+        if len(tag) > 0 and self._verify("refs/tags/{}".format(tag)):
+            logging.info("tag {} already in mirror {}".format(
+                tag, self.mirror_path))
+            return True
+
+        is_shallow = os.path.exists(os.path.join(self.mirror_path, "shallow"))
+        is_empty = not self._verify("--all")
+        if src_info.git_depth == 1 and (is_shallow or is_empty):
+            # keep mirror shallow, only fetch the tag or branch
+            kind = self._ls_remote(tag)
+            if kind is None:
+                logging.error("failed found {} in {}".format(
+                    tag, src_info.repo_url))
+                return False
+            if kind == "tag":
+                refspec = "+refs/tags/{0}:refs/tags/{0}".format(tag)
+            else:
+                refspec = "+refs/heads/{0}:refs/remotes/origin/{0}".format(
+                    tag)
+            return self._git(
+                ["fetch", "-q", "--depth=1", "origin", refspec])
+
+        args = ["fetch", "-q", "origin"]
+        if is_shallow:
+            args.append("--unshallow")
+        if self._git(args) is False:
+            return False
+        if len(tag) == 0:
+            return self._git(["remote", "set-head", "origin", "--auto"])
+        return True
+
+    def _add_worktree(self, src_info: SourceInfo):
+        """
+        checkout tag as worktree of mirror
+        """
+        # worktrees be removed manually leave stale records in mirror
+        self._git(["worktree", "prune"])
+
+        tag = src_info.tag
+        if len(tag) == 0:
+            branch = self._output(
+                ["symbolic-ref", "--short", "refs/remotes/origin/HEAD"])
+            branch = branch[len("origin/"):]
+            args = ["worktree", "add", "-q", "-f", "-B", branch,
+                    self.source_path, "refs/remotes/origin/{}".format(branch)]
+        elif self._verify("refs/tags/{}".format(tag)):
+            args = ["worktree", "add", "-q", "--detach",
+                    self.source_path, "refs/tags/{}".format(tag)]
+        elif self._verify("refs/remotes/origin/{}".format(tag)):
+            # branch is checked out as local branch, keep branch name in git
+            # informations of source
+            args = ["worktree", "add", "-q", "-f", "-B", tag,
+                    self.source_path, "refs/remotes/origin/{}".format(tag)]
+        elif self._verify("{}^{{commit}}".format(tag)):
+            args = ["worktree", "add", "-q", "--detach",
+                    self.source_path, tag]
         else:
-            self.source_path = os.path.join(
-                source_root,
-                src_info.maintainer,
-                src_info.name
-            )
-            if os.path.exists(self.source_path):
-                return self._checkout_src_tag(self.source_path, src_info.tag)
-            command = "git clone {} {}".format(
-                src_info.repo_url,
-                self.source_path
-            )
-            logging.info("run command: {}".format(command))
-            ret = CommandHandle().exec(command=command)
-            if ret is False:
-                return ret
-            return self._checkout_src_tag(self.source_path, src_info.tag)
-
-    def _checkout_src_tag(self, src_path, tag):
-        """
-        checkout git source tag
-        """
-        origin_dir = os.path.abspath(os.curdir)
-        os.chdir(src_path)
-        logging.info("change dir to: {}".format(os.path.abspath(os.curdir)))
-        command = "git checkout {}".format(tag)
+            logging.error("failed found {} in {}".format(
+                tag, src_info.repo_url))
+            return False
+
+        os.makedirs(os.path.dirname(self.source_path), exist_ok=True)
+        return self._git(args)
+
+    def _git(self, args, cwd=""):
+        """
+        run git command in mirror
+        :param args: git arguments
+        :param cwd: working directory, default is mirror path
+        """
+        args = ["git"] + args
+        if os.name == "posix":
+            command = " ".join([shlex.quote(arg) for arg in args])
+        else:
+            command = subprocess.list2cmdline(args)
+        if cwd == "":
+            cwd = self.mirror_path
         logging.info("run command: {}".format(command))
-        ret = CommandHandle().exec(command=command)
-        os.chdir(origin_dir)
-        logging.info("restore dir to: {}".format(os.path.abspath(os.curdir)))
-        return ret
+        return CommandHandle(cwd=cwd).exec(command=command)
+
+    def _output(self, args):
+        """
+        get output of git command in mirror, empty if failed
+        :param args: git arguments
+        """
+        try:
+            result = subprocess.run(
+                ["git"] + args,
+                cwd=self.mirror_path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL)
+        except Exception as e:
+            logging.debug("failed run git {}: {}".format(args, e))
+            return ""
+        if result.returncode != 0:
+            return ""
+        return result.stdout.decode("utf-8").strip()
+
+    def _verify(self, rev):
+        """
+        check revision exists in mirror
+        :param rev: revision, or --all for any ref
+        """
+        if rev == "--all":
+            return len(self._output(
+                ["for-each-ref", "--count=1", "--format=%(refname)"])) > 0
+        return len(self._output(["rev-parse", "-q", "--verify", rev])) > 0
+
+    def _ls_remote(self, tag):
+        """
+        get kind of tag in remote repository, "tag", "branch" or None
+        :param tag: tag or branch name
+        """
+        output = self._output([
+            "ls-remote", "origin",
+            "refs/tags/{}".format(tag), "refs/heads/{}".format(tag)])
+        refs = [line.split()[-1] for line in output.splitlines()]
+        if "refs/tags/{}".format(tag) in refs:
+            return "tag"
+        if "refs/heads/{}".format(tag) in refs:
+            return "branch"
+        return None
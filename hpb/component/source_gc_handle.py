@@ -0,0 +1,186 @@
+import datetime
+import logging
+import os
+import shutil
+import typing
+
+from hpb.component.source_downloader import SourceDownloader
+from hpb.utils.file_lock import FileLock
+
+
+class SourceEntry:
+    """
+    source checkout or git mirror in source root
+    """
+
+    def __init__(self):
+        self.kind = ""  # checkout or mirror
+        self.path = ""  # directory path
+        self.lock_path = ""  # lock file, its mtime is the last used time
+        self.last_used = 0.0
+        self.size = 0
+
+
+class SourceGcHandle:
+    """
+    remove least recently used source checkouts until total size of source
+    root not exceed max size, checkouts locked by running builds are kept,
+    git mirrors are removed only when none of their worktrees remain
+    """
+
+    def __init__(self, source_root, max_size):
+        """
+        init source gc handle
+        :param source_root: source root path
+        :param max_size: max bytes of source root
+        """
+        self.source_root = source_root
+        self.max_size = max_size
+        self._removed = set()
+
+    def scan(self) -> typing.List[SourceEntry]:
+        """
+        scan checkouts and mirrors in source root
+        """
+        entries = []
+        if not os.path.isdir(self.source_root):
+            return entries
+
+        for maintainer in sorted(os.listdir(self.source_root)):
+            maintainer_dir = os.path.join(self.source_root, maintainer)
+            if maintainer.startswith("_") or not os.path.isdir(maintainer_dir):
+                continue
+            for name in sorted(os.listdir(maintainer_dir)):
+                path = os.path.join(maintainer_dir, name)
+                if not os.path.isdir(path) or os.path.islink(path):
+                    continue
+                entries.append(self._new_entry(
+                    "checkout", path, SourceDownloader.get_usage_path(
+                        self.source_root, path)))
+
+        mirror_root = os.path.join(self.source_root, "_mirrors")
+        if os.path.isdir(mirror_root):
+            for name in sorted(os.listdir(mirror_root)):
+                path = os.path.join(mirror_root, name)
+                if not name.endswith(".git") or not os.path.isdir(path):
+                    continue
+                entries.append(self._new_entry(
+                    "mirror", path, "{}.lock".format(path)))
+        return entries
+
+    def collect(self, dry_run=False):
+        """
+        remove least recently used sources until total size not exceed max
+        size
+        :param dry_run: only print sources would be removed
+        """
+        entries = self.scan()
+        total = sum([entry.size for entry in entries])
+        logging.info("sources total size: {}, max size: {}".format(
+            self.format_size(total), self.format_size(self.max_size)))
+
+        for kind in ("checkout", "mirror"):
+            candidates = sorted(
+                [entry for entry in entries if entry.kind == kind],
+                key=lambda entry: entry.last_used)
+            for entry in candidates:
+                if total <= self.max_size:
+                    break
+                if self.remove(entry, dry_run):
+                    total -= entry.size
+
+        if total > self.max_size:
+            logging.warning(
+                "sources size {} still exceed max size {}, remaining "
+                "sources are in use".format(
+                    self.format_size(total), self.format_size(self.max_size)))
+        else:
+            logging.info("sources size after gc: {}".format(
+                self.format_size(total)))
+        return True
+
+    def remove(self, entry: SourceEntry, dry_run=False):
+        """
+        remove source entry if it's not locked
+        :param entry: source entry
+        :param dry_run: only print source would be removed
+        """
+        lock = FileLock(entry.lock_path)
+        if not lock.acquire(blocking=False):
+            logging.info("skip {} in use: {}".format(entry.kind, entry.path))
+            return False
+        try:
+            if entry.kind == "mirror":
+                worktrees = self.get_worktrees(entry.path)
+                if len(worktrees) > 0:
+                    logging.debug("skip mirror has worktrees: {}".format(
+                        entry.path))
+                    return False
+
+            logging.info("{}remove {}: {}, size: {}, last used: {}".format(
+                "[dry run] " if dry_run else "", entry.kind, entry.path,
+                self.format_size(entry.size),
+                datetime.datetime.fromtimestamp(entry.last_used).strftime(
+                    "%Y-%m-%d %H:%M:%S")))
+            if not dry_run:
+                shutil.rmtree(entry.path)
+            self._removed.add(entry.path)
+        except Exception as e:
+            logging.error("failed remove {}: {}".format(entry.path, e))
+            return False
+        finally:
+            lock.release()
+        return True
+
+    def get_worktrees(self, mirror_path):
+        """
+        get remaining worktree paths of mirror
+        :param mirror_path: git mirror path
+        """
+        worktrees = []
+        worktrees_dir = os.path.join(mirror_path, "worktrees")
+        if not os.path.isdir(worktrees_dir):
+            return worktrees
+        for name in os.listdir(worktrees_dir):
+            gitdir_path = os.path.join(worktrees_dir, name, "gitdir")
+            try:
+                with open(gitdir_path, "r", encoding="utf-8") as f:
+                    path = os.path.dirname(f.read().strip())
+            except OSError:
+                continue
+            if path in self._removed or not os.path.exists(path):
+                continue
+            worktrees.append(path)
+        return worktrees
+
+    @staticmethod
+    def format_size(size):
+        """
+        get human readable size
+        :param size: bytes
+        """
+        for unit in ("B", "K", "M", "G"):
+            if size < 1024:
+                return "{:.1f}{}".format(size, unit)
+            size /= 1024
+        return "{:.1f}T".format(size)
+
+    def _new_entry(self, kind, path, lock_path) -> SourceEntry:
+        """
+        create source entry
+        """
+        entry = SourceEntry()
+        entry.kind = kind
+        entry.path = path
+        entry.lock_path = lock_path
+        if os.path.exists(lock_path):
+            entry.last_used = os.path.getmtime(lock_path)
+        else:
+            entry.last_used = os.path.getmtime(path)
+        for root, dirs, files in os.walk(path):
+            for name in dirs + files:
+                try:
+                    entry.size += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return entry
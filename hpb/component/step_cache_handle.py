@@ -0,0 +1,181 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import typing
+
+
+class StepCacheHandle:
+    """
+    workflow step cache, restore declared step outputs instead of running
+    step when commands and declared inputs are not changed
+    """
+
+    def __init__(self, cache_dir):
+        """
+        init step cache handle
+        :param cache_dir: directory which store step outputs
+        """
+        self.cache_dir = cache_dir
+        self.manifest_name = "outputs.json"
+
+    def fingerprint(
+            self,
+            commands: typing.List[str],
+            inputs: typing.List[str],
+            outputs: typing.List[str],
+            cwd: str,
+            values: typing.Optional[typing.List[str]] = None):
+        """
+        generate step fingerprint, return None when input glob matches no
+        files, so step with mistaken input never be restored from cache
+        :param commands: step commands with variables replaced
+        :param inputs: input globs, for compatibility, the one without
+            matched files and path separator or glob characters is treated
+            as plain value
+        :param outputs: output paths
+        :param cwd: working directory when step begin
+        :param values: plain values, e.g. variables
+        """
+        hash_obj = hashlib.sha256()
+        content = json.dumps({
+            "commands": commands,
+            "outputs": [self._abs_path(x, cwd) for x in outputs],
+            "cwd": cwd,
+            "values": values or [],
+        }, sort_keys=True)
+        hash_obj.update(content.encode("utf-8"))
+
+        for pattern in inputs:
+            filepaths = self._glob_files(pattern, cwd)
+            if len(filepaths) == 0:
+                if self._is_path_pattern(pattern):
+                    logging.warning(
+                        "step input matches no files, disable step cache: "
+                        "{}".format(pattern))
+                    return None
+                logging.warning(
+                    "step input matches no files, treat it as value, "
+                    "declare values in 'vars' instead: {}".format(pattern))
+                hash_obj.update("value:{}\n".format(pattern).encode("utf-8"))
+                continue
+            hash_obj.update("glob:{}\n".format(pattern).encode("utf-8"))
+            for filepath in filepaths:
+                hash_obj.update("file:{}\n".format(filepath).encode("utf-8"))
+                self._update_file_hash(hash_obj, filepath)
+
+        return hash_obj.hexdigest()
+
+    def _is_path_pattern(self, pattern: str):
+        """
+        whether pattern looks like a path or glob
+        :param pattern: input pattern
+        """
+        for c in "*?[/" + os.sep:
+            if c in pattern:
+                return True
+        return False
+
+    def restore(self, fp: str):
+        """
+        restore step outputs
+        :param fp: step fingerprint
+        :return: True if cache hit and outputs be restored
+        """
+        entry_dir = os.path.join(self.cache_dir, fp)
+        manifest_path = os.path.join(entry_dir, self.manifest_name)
+        if not os.path.exists(manifest_path):
+            return False
+
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+
+        for item in manifest:
+            src = os.path.join(entry_dir, item["idx"])
+            dst = item["path"]
+            logging.info("restore step output: {}".format(dst))
+            if item["kind"] == "dir":
+                shutil.copytree(src, dst, symlinks=True, dirs_exist_ok=True)
+            else:
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst, follow_symlinks=False)
+        return True
+
+    def save(self, fp: str, outputs: typing.List[str], cwd: str):
+        """
+        save step outputs
+        :param fp: step fingerprint
+        :param outputs: output paths
+        :param cwd: working directory when step begin
+        :return: True if all outputs be saved
+        """
+        entry_dir = os.path.join(self.cache_dir, fp)
+        if os.path.exists(entry_dir):
+            return True
+
+        tmp_dir = "{}.tmp-{}".format(entry_dir, os.getpid())
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        manifest = []
+        for i in range(len(outputs)):
+            src = self._abs_path(outputs[i], cwd)
+            dst = os.path.join(tmp_dir, str(i))
+            if os.path.isdir(src):
+                shutil.copytree(src, dst, symlinks=True)
+                kind = "dir"
+            elif os.path.lexists(src):
+                shutil.copy2(src, dst, follow_symlinks=False)
+                kind = "file"
+            else:
+                logging.warning(
+                    "step output not exists, skip cache: {}".format(src))
+                shutil.rmtree(tmp_dir)
+                return False
+            manifest.append({"idx": str(i), "path": src, "kind": kind})
+
+        with open(os.path.join(tmp_dir, self.manifest_name), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # another build already saved the same step
+            shutil.rmtree(tmp_dir)
+        return True
+
+    def _abs_path(self, path, cwd):
+        """
+        get absolute path
+        """
+        if not os.path.isabs(path):
+            path = os.path.join(cwd, path)
+        return os.path.normpath(path)
+
+    def _glob_files(self, pattern, cwd) -> typing.List[str]:
+        """
+        get sorted files matched pattern, directories are expanded
+        """
+        filepaths = set()
+        for path in glob.glob(self._abs_path(pattern, cwd), recursive=True):
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    for f in files:
+                        filepaths.add(os.path.join(root, f))
+            else:
+                filepaths.add(path)
+        return sorted(filepaths)
+
+    def _update_file_hash(self, hash_obj, filepath):
+        """
+        update hash with file content
+        """
+        if os.path.islink(filepath):
+            hash_obj.update(os.readlink(filepath).encode("utf-8"))
+            return
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hash_obj.update(chunk)
@@ -1,14 +1,25 @@
+import concurrent.futures
+import copy
 import datetime
+import hashlib
+import json
 import logging
 import os
 import re
 import shutil
+import threading
 import typing
 
 from hpb.component.command_handle import CommandHandle
+from hpb.component.db_handle import DBHandle
+from hpb.component.dep_src_builder import DepSrcBuilder
+from hpb.component.job_scheduler import JobScheduler
+from hpb.component.pkg_cache_handle import PkgCacheHandle
 from hpb.component.repo_deps_handle import RepoDepsHandle
 from hpb.component.settings_handle import SettingsHandle
+from hpb.component.shell_session import ShellSession
 from hpb.component.source_downloader import SourceDownloader
+from hpb.component.step_cache_handle import StepCacheHandle
 from hpb.component.var_replace_handle import VarReplaceHandle
 from hpb.component.yaml_handle import YamlHandle
 from hpb.data_type.build_info import BuildInfo
@@ -19,8 +30,13 @@ from hpb.data_type.package_meta import PackageMeta
 from hpb.data_type.platform_info import PlatformInfo
 from hpb.data_type.source_info import SourceInfo
 from hpb.data_type.workflow_yml import WorkflowYaml
+from hpb.mapper.mapper_build_history import MapperBuildHistory
+from hpb.mapper.mapper_recipe import MapperRecipe
+from hpb.utils.file_lock import FileLock
 from hpb.utils.kahn_algo import KahnAlgo
 from hpb.utils.log_handle import LogHandle
+from hpb.utils.memo_handle import MemoHandle
+from hpb.utils.trace_handle import TraceHandle
 from hpb.utils.utils import Utils
 
 
@@ -36,6 +52,12 @@ class WorkflowHandle:
         self.task_name = ""  # task name
         self.task_id = ""  # task id
         self.input_param_dict = {}  # user input param dict
+        self.max_jobs = 1  # max number of jobs run concurrently
+        self.skip_built = False  # skip build when recipe already built
+        self.pull_built = False  # pull already built package into pkg_dir
+        self.shell_session = False  # run job commands in persistent shell
+        self.raw_log = False  # write command output bytes into log directly
+        self.reuse_deps = False  # reuse deps dirs when deps unchanged
 
         # directories
         self.task_dir = ""  # task directory
@@ -59,6 +81,12 @@ class WorkflowHandle:
 
         # source
         self.src = SourceInfo()
+        self.source_lock: typing.Optional[FileLock] = None
+
+        # concurrent prepare phases, set when any of them failed
+        self.prepare_failed = threading.Event()
+        self.prepare_src_future: typing.Optional[concurrent.futures.Future] \
+            = None
 
         # build info
         self.build_info = BuildInfo()
@@ -66,6 +94,25 @@ class WorkflowHandle:
         # deps
         self.deps = []
         self.test_deps = []
+        self.deps_handle: typing.Optional[RepoDepsHandle] = None
+        self.test_deps_handle: typing.Optional[RepoDepsHandle] = None
+        # extracted packages cache shared by dependencies handles
+        self.pkg_cache: typing.Optional[PkgCacheHandle] = None
+        # kind of lazy dependencies -> whether download succeeded
+        self.lazy_deps_ret = {}
+        self.lazy_deps_lock = threading.Lock()
+
+        # hash of everything which affects build result
+        self.recipe_hash = ""
+
+        # build trace
+        self.trace = TraceHandle()
+
+        # probe and search results, shared between matrix variants
+        self.memo = MemoHandle()
+
+        # logger which command output write into
+        self.command_logger_name = "command"
 
     def set_input_args(self, cfg: BuilderConfig):
         """
@@ -103,6 +150,22 @@ class WorkflowHandle:
         else:
             self.task_id = cfg.task_id
 
+        # set max concurrent jobs
+        if cfg.jobs < 1:
+            print("invalid jobs: {}".format(cfg.jobs))
+            return False
+        self.max_jobs = cfg.jobs
+
+        self.skip_built = cfg.skip_built
+        self.pull_built = cfg.pull_built
+
+        self.shell_session = cfg.shell_session
+        if self.shell_session and os.name != "posix":
+            print("WARNING! shell session only support posix, ignore it")
+            self.shell_session = False
+
+        self.raw_log = cfg.raw_log
+
         # set params
         if len(cfg.params) > 0:
             for param in cfg.params:
@@ -113,6 +176,7 @@ class WorkflowHandle:
 
         # set directories
         if cfg.mode == "dev":
+            self.reuse_deps = True
             self.build_dir = os.path.join(self.working_dir, "build")
             self.hpb_dir = os.path.join(self.build_dir, "_{}".format(APP_NAME))
             self.task_dir = self.hpb_dir
@@ -166,6 +230,16 @@ class WorkflowHandle:
         command_logger.setLevel(logging.INFO)
         command_logger.addHandler(logging.StreamHandler())
 
+        self.init_command_log()
+
+    def init_command_log(self):
+        """
+        write command output of this workflow into workflow.log
+        """
+        command_logger = logging.getLogger(self.command_logger_name)
+        command_logger.setLevel(logging.INFO)
+
+        os.makedirs(self.hpb_dir, exist_ok=True)
         workflow_log_path = os.path.join(self.hpb_dir, "workflow.log")
         command_logger.addHandler(logging.FileHandler(workflow_log_path, "w"))
 
@@ -173,20 +247,46 @@ class WorkflowHandle:
         """
         run workflow
         """
+        try:
+            with self.trace.span("run", "workflow") as args:
+                ret = self._run()
+                args["ok"] = ret
+            return ret
+        finally:
+            if self.source_lock is not None:
+                self.source_lock.release()
+            self.dump_trace()
+
+    def _run(self):
+        """
+        create directories, prepare and run workflow jobs
+        """
         # create directories
         self.mk_dirs()
 
-        # chdir to working directory
-        os.chdir(self.working_dir)
-
         if self.prepare() is False:
             return False
 
+        self.recipe_hash = self.gen_recipe_hash()
+        logging.info("recipe hash: {}".format(self.recipe_hash))
+        if self.skip_built:
+            built_dirpath = self.search_built_pkg(self.recipe_hash)
+            if built_dirpath is not None:
+                logging.info("already built: {}".format(built_dirpath))
+                if self.pull_built:
+                    self.pull_built_pkg(built_dirpath)
+                self.generate_meta_file()
+                return True
+
+        if self.run_phase("download_deps", self.download_deps) is False:
+            return False
+
         self.generate_meta_file()
 
-        self.run_workflow()
+        ret = self.run_workflow()
+        self.save_build_history()
 
-        return True
+        return ret
 
     def mk_dirs(self):
         """
@@ -196,8 +296,13 @@ class WorkflowHandle:
         os.makedirs(self.build_dir, exist_ok=True)
         self._mk_empty_dir(self.pkg_dir)
         self._mk_empty_dir(self.output_dir)
-        self._mk_empty_dir(self.deps_dir)
-        self._mk_empty_dir(self.test_deps_dir)
+        if self.reuse_deps:
+            # dependencies directories are updated in download_deps
+            os.makedirs(self.deps_dir, exist_ok=True)
+            os.makedirs(self.test_deps_dir, exist_ok=True)
+        else:
+            self._mk_empty_dir(self.deps_dir)
+            self._mk_empty_dir(self.test_deps_dir)
 
     def _mk_empty_dir(self, dst_dir):
         """
@@ -217,28 +322,131 @@ class WorkflowHandle:
 
     def prepare(self):
         """
-        run prepare steps
+        run prepare steps, source, build info and dependencies are prepared
+        concurrently, build info and dependencies only wait for source when
+        they reference variables derived from source, and phases not started
+        are skipped once any phase failed
         """
         # load yaml file
         if self.load_yaml_file() is False:
             return False
 
-        if self.prepare_vars_and_src() is False:
+        if self.run_phase("prepare_vars", self.prepare_vars) is False:
             return False
 
-        self.output_vars()
+        self.prepare_failed.clear()
+
+        def run_phase(name, func):
+            if self.prepare_failed.is_set():
+                logging.info("skip {}, other prepare failed".format(name))
+                return False
+            try:
+                ret = self.run_phase(name, func)
+            except Exception:
+                self.prepare_failed.set()
+                raise
+            if ret is False:
+                self.prepare_failed.set()
+            return ret
+
+        futures = {}
+
+        def wait_src_if_needed(var_list):
+            if self.can_replace_all(var_list):
+                return True
+            return self.wait_prepare_src()
+
+        def prepare_build_info():
+            if not wait_src_if_needed([self.yml_obj.build]):
+                return False
+            return run_phase("prepare_build_info", self.prepare_build_info)
 
-        if self.prepare_build_info() is False:
+        def prepare_deps():
+            if not self.succeeded(futures["prepare_build_info"]):
+                return False
+            if not wait_src_if_needed(
+                    self.yml_obj.deps + self.yml_obj.test_deps):
+                return False
+            return run_phase("prepare_deps", self.prepare_deps)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            futures["prepare_src"] = executor.submit(
+                run_phase, "prepare_src", self.prepare_src)
+            self.prepare_src_future = futures["prepare_src"]
+            futures["prepare_build_info"] = executor.submit(
+                prepare_build_info)
+            futures["prepare_deps"] = executor.submit(prepare_deps)
+        self.prepare_src_future = None
+
+        failed = []
+        for name, future in futures.items():
+            try:
+                if future.result() is False:
+                    failed.append(name)
+            except Exception as e:
+                logging.exception("{} exception: {}".format(name, e))
+                failed.append(name)
+        if len(failed) > 0:
+            logging.error("failed prepare: {}".format(", ".join(failed)))
             return False
 
-        if self.prepare_deps() is False:
+        self.output_vars()
+        return True
+
+    def succeeded(self, future):
+        """
+        wait future and check whether it succeeded
+        :param future: future of phase
+        """
+        try:
+            return future.result() is not False
+        except Exception:
             return False
 
-        if self.prepare_test_deps() is False:
+    def wait_prepare_src(self):
+        """
+        wait for source prepared, return False when any prepare phase failed,
+        so expensive work, e.g. building dependencies from source, is not
+        started for a build which already failed
+        """
+        future = self.prepare_src_future
+        if future is not None and not self.succeeded(future):
             return False
+        return not self.prepare_failed.is_set()
 
+    def can_replace_all(self, var_list):
+        """
+        check all variables in fields can be replaced by current variables
+        :param var_list: list of field dict
+        """
+        for var in var_list or []:
+            for v in var.values():
+                if VarReplaceHandle.replace(v, self.all_var_dict) is None:
+                    return False
         return True
 
+    def run_phase(self, name, func):
+        """
+        run phase and record it in build trace
+        :param name: phase name
+        :param func: phase function
+        """
+        with self.trace.span(name, "phase") as args:
+            ret = func()
+            args["ok"] = ret is not False
+        return ret
+
+    def dump_trace(self):
+        """
+        write build trace next to build.log
+        """
+        filepath = os.path.join(self.hpb_dir, "log", "trace.json")
+        try:
+            self.trace.dump(filepath)
+            logging.info("build trace: {}".format(filepath))
+        except Exception as e:
+            logging.warning("failed write build trace: {}".format(e))
+
     def generate_meta_file(self):
         """
         generate pacakge meta files
@@ -250,33 +458,214 @@ class WorkflowHandle:
         """
         run workflow
         """
-        # set current working dir
-        os.chdir(self.working_dir)
-
         # run jobs
         jobs = self.yml_obj.jobs
         ordered_jobs = self.sort_jobs(jobs)
         logging.debug("workflow job order: {}".format(", ".join(ordered_jobs)))
 
-        ret = True
+        if self.max_jobs > 1:
+            ret = self.run_workflow_parallel(jobs, ordered_jobs)
+        else:
+            ret = True
+            cwd = self.working_dir
+            for job_name in ordered_jobs:
+                logging.info("run job: {}".format(job_name))
+                command_handle = self.new_job_command_handle(job_name, cwd)
+                ret = self.run_workflow_job(
+                    job_name=job_name, job=jobs[job_name],
+                    command_handle=command_handle)
+                self.close_job_command_handle(job_name, command_handle)
+                if ret is False:
+                    break
+                cwd = command_handle.cwd
+
+        return ret
+
+    def run_workflow_parallel(self, jobs, ordered_jobs):
+        """
+        run workflow jobs concurrently, job run as soon as all of its needs
+        completed, the working directory of job inherit from the last job it
+        needs, when several jobs ready at once, the one with historically
+        longest critical path run first
+        :param jobs: workflow jobs
+        :param ordered_jobs: job names in topological order
+        """
+        job_needs = self.get_job_needs(jobs, ordered_jobs)
+        job_priority = JobScheduler.critical_paths(
+            job_needs, self.load_history_durations("job"))
+
+        lock = threading.Lock()
+        job_cwd_dict = {}
+        handle_dict = {}
+
+        def run_job(job_name):
+            cwd = self.working_dir
+            with lock:
+                for dep_name in job_needs[job_name]:
+                    cwd = job_cwd_dict[dep_name]
+                command_handle = self.new_job_command_handle(
+                    job_name, cwd, kill_group=True)
+                handle_dict[job_name] = command_handle
+            try:
+                ret = self.run_workflow_job(
+                    job_name=job_name, job=jobs[job_name],
+                    command_handle=command_handle)
+            finally:
+                self.close_job_command_handle(job_name, command_handle)
+            with lock:
+                job_cwd_dict[job_name] = command_handle.cwd
+            return ret
+
+        def cancel_job(job_name):
+            with lock:
+                command_handle = handle_dict.get(job_name, None)
+            if command_handle is not None:
+                command_handle.terminate()
+
+        scheduler = JobScheduler(
+            max_workers=self.max_jobs, job_priority=job_priority)
+        return scheduler.run(job_needs, run_job, cancel_job)
+
+    def get_job_needs(self, jobs, ordered_jobs):
+        """
+        get job name -> names of the jobs it needs
+        :param jobs: workflow jobs
+        :param ordered_jobs: job names in topological order
+        """
+        job_needs = {}
         for job_name in ordered_jobs:
-            logging.info("run job: {}".format(job_name))
-            job = jobs[job_name]
-            if self.run_workflow_job(job=job) is False:
-                ret = False
-                break
+            job_needs[job_name] = jobs[job_name].get("needs", [])
+        return job_needs
 
-        # reset working dir
-        os.chdir(self.working_dir)
+    def load_history_durations(self, kind):
+        """
+        load average durations of this task from build history
+        :param kind: job or step
+        :return: name -> duration in seconds
+        """
+        db_path = SettingsHandle().db_path
+        try:
+            with DBHandle(db_path) as db_handle:
+                mapper_history = MapperBuildHistory()
+                mapper_history.create_table(db_handle.conn)
+                return mapper_history.query_durations(
+                    db_handle.conn, self.task_name, self.cfg_file_path, kind)
+        except Exception as e:
+            logging.warning("failed load build history: {}".format(e))
+            return {}
+
+    def save_build_history(self):
+        """
+        append durations of jobs and steps in build trace into build history
+        """
+        records = []
+        for event in self.trace.events:
+            if event["cat"] not in ("job", "step"):
+                continue
+            records.append((
+                event["cat"], event["name"], event["dur"] / 1000000.0,
+                event["args"].get("ok", False) is True))
+        if len(records) == 0:
+            return
+
+        db_path = SettingsHandle().db_path
+        try:
+            with DBHandle(db_path) as db_handle:
+                mapper_history = MapperBuildHistory()
+                mapper_history.create_table(db_handle.conn)
+                mapper_history.insert(
+                    db_handle.conn, self.task_name, self.cfg_file_path,
+                    self.task_id, records)
+        except Exception as e:
+            logging.warning("failed save build history: {}".format(e))
+
+    def print_plan(self):
+        """
+        print predicted wall time of workflow from build history
+        """
+        jobs = self.yml_obj.jobs
+        ordered_jobs = self.sort_jobs(jobs)
+        job_needs = self.get_job_needs(jobs, ordered_jobs)
+        durations = self.load_history_durations("job")
+        critical_paths = JobScheduler.critical_paths(job_needs, durations)
+        scheduler = JobScheduler(
+            max_workers=self.max_jobs, job_priority=critical_paths)
 
-        return ret
+        print("task: {}, jobs: {}".format(self.task_name, self.max_jobs))
+        for job_name in ordered_jobs:
+            if job_name in durations:
+                duration_str = "{:.1f}s".format(durations[job_name])
+            else:
+                duration_str = "unknown"
+            print("  {}: {}, critical path {:.1f}s".format(
+                job_name, duration_str, critical_paths[job_name]))
+
+        unknown_jobs = [j for j in ordered_jobs if j not in durations]
+        if len(unknown_jobs) > 0:
+            print("no history of jobs: {}".format(", ".join(unknown_jobs)))
+        print("predicted wall time: {:.1f}s".format(
+            scheduler.predict(job_needs, durations)))
+        return True
+
+    def new_job_command_handle(self, job_name, cwd, kill_group=False):
+        """
+        create command handle for job, job's command output also write into
+        its own log file
+        :param job_name: job name
+        :param cwd: initial working directory of job
+        :param kill_group: kill whole process group when terminate
+        """
+        logger_name = "{}.{}".format(self.command_logger_name, job_name)
+        job_logger = logging.getLogger(logger_name)
+        job_logger.setLevel(logging.INFO)
+        log_path = os.path.join(
+            self.hpb_dir, "log", "job_{}.log".format(job_name))
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        job_logger.addHandler(logging.FileHandler(log_path, "w"))
+
+        if self.shell_session:
+            return ShellSession(
+                cwd=cwd, logger_name=logger_name, kill_group=kill_group,
+                raw_output=self.raw_log)
+        return CommandHandle(
+            cwd=cwd, logger_name=logger_name, kill_group=kill_group,
+            raw_output=self.raw_log)
+
+    def close_job_command_handle(
+            self, job_name, command_handle: CommandHandle):
+        """
+        close job's command handle and log file
+        :param job_name: job name
+        :param command_handle: command handle of job
+        """
+        command_handle.close()
+
+        job_logger = logging.getLogger(
+            "{}.{}".format(self.command_logger_name, job_name))
+        for handler in list(job_logger.handlers):
+            job_logger.removeHandler(handler)
+            handler.close()
 
-    def run_workflow_job(self, job):
+    def run_workflow_job(
+            self, job_name, job, command_handle: CommandHandle):
         """
         run workflow job
+        :param job_name: job name
         :param job: single job
+        :param command_handle: command handle of job
+        """
+        with self.trace.span(job_name, "job") as args:
+            args["ok"] = self._run_workflow_job_steps(
+                job_name, job, command_handle)
+        return args["ok"]
+
+    def _run_workflow_job_steps(
+            self, job_name, job, command_handle: CommandHandle):
+        """
+        run steps of workflow job
         """
         steps = job.get("steps", [])
+        deps_ready = False
         for i in range(len(steps)):
             step = steps[i]
             step_name = step.get("name", "")
@@ -285,33 +674,113 @@ class WorkflowHandle:
                 logging.debug("ignore step[{}]: {}".format(i, step_name))
                 continue
             else:
+                # job with all steps ignored never download its dependencies
+                if not deps_ready:
+                    if self.download_job_deps(job_name, job) is False:
+                        return False
+                    deps_ready = True
                 logging.debug("run step[{}]: {}".format(i, step_name))
-                if self.run_workflow_step(step=step) is False:
+                trace_name = "{}.{}".format(
+                    job_name, step_name if len(step_name) > 0 else i)
+                with self.trace.span(trace_name, "step") as args:
+                    args["ok"] = self.run_workflow_step(
+                        step=step, command_handle=command_handle)
+                if args["ok"] is False:
                     return False
         return True
 
-    def run_workflow_step(self, step):
+    def run_workflow_step(self, step, command_handle: CommandHandle):
         """
         run workflow step
+        :param step: single step
+        :param command_handle: command handle of job
         """
         command_str = step.get("run", "")
         if len(command_str) == 0:
             return True
         pattern = re.compile(r'''((?:[^;"']|"[^"]*"|'[^']*')+)''')
-        commands = pattern.split(command_str)
-        for command in commands:
+        commands = []
+        real_commands = []
+        for command in pattern.split(command_str):
             command = command.strip()
             if len(command) == 0:
                 continue
             if command == ";":
                 continue
-            logging.info("run command: {}".format(command))
-            logging.getLogger("command").info("COMMAND|{}".format(command))
             real_command = VarReplaceHandle.replace(command, self.all_var_dict)
             if real_command is None:
                 logging.error("failed replace variable in: {}".format(command))
                 return False
-            if CommandHandle().exec(command=real_command) is False:
+            commands.append(command)
+            real_commands.append(real_command)
+
+        # step cache, only available when step declare outputs
+        inputs = self.get_step_paths(step, "inputs")
+        outputs = self.get_step_paths(step, "outputs")
+        values = self.get_step_paths(step, "vars")
+        if inputs is None or outputs is None or values is None:
+            return False
+        step_cache = None
+        step_fp = ""
+        step_cwd = command_handle.cwd
+        if len(outputs) > 0:
+            step_cache = StepCacheHandle(
+                os.path.join(SettingsHandle().cache_path, "steps"))
+            step_fp = step_cache.fingerprint(
+                real_commands, inputs, outputs, step_cwd, values)
+            if step_fp is None:
+                step_cache = None
+            elif step_cache.restore(step_fp) is True:
+                logging.info("step cache hit: {}".format(step_fp))
+                return self.replay_step_cd(real_commands, command_handle)
+
+        for i in range(len(commands)):
+            logging.info("run command: {}".format(commands[i]))
+            command_handle.command_logger.info(
+                "COMMAND|{}".format(commands[i]))
+            with self.trace.span(commands[i], "command") as args:
+                ret = command_handle.exec(command=real_commands[i])
+                args["exit_code"] = command_handle.returncode
+                if command_handle.usage is not None:
+                    args.update(command_handle.usage)
+            if ret is False:
+                return False
+
+        if step_cache is not None:
+            step_cache.save(step_fp, outputs, step_cwd)
+
+        return True
+
+    def get_step_paths(self, step, field):
+        """
+        get step list field with variables replaced
+        :param step: single step
+        :param field: field name, inputs, outputs or vars
+        """
+        paths = step.get(field, [])
+        if type(paths) is str:
+            paths = [paths]
+        results = []
+        for path in paths:
+            real_path = VarReplaceHandle.replace(path, self.all_var_dict)
+            if real_path is None:
+                logging.error("failed replace variable in step {}: {}".format(
+                    field, path))
+                return None
+            results.append(real_path)
+        return results
+
+    def replay_step_cd(self, real_commands, command_handle: CommandHandle):
+        """
+        when step be restored from cache, only replay change directory
+        commands, let following steps run in the right directory
+        :param real_commands: step commands with variables replaced
+        :param command_handle: command handle of job
+        """
+        for command in real_commands:
+            if command.find("cd ") != 0:
+                continue
+            if command_handle.exec(command=command) is False:
                 return False
         return True
 
@@ -371,20 +840,21 @@ class WorkflowHandle:
             "output_dir": self.inner_var_dict["OUTPUT_DIR"],
             "pkg_dir": self.inner_var_dict["PKG_DIR"],
             "deps_dir": self.inner_var_dict["DEPS_DIR"],
+            "recipe_hash": self.recipe_hash,
         }
         filepath = os.path.join(self.hpb_dir, "pkg.yml")
         yaml_handle = YamlHandle()
         yaml_handle.write(filepath=filepath, obj=d)
 
-    def prepare_vars_and_src(self):
+    def prepare_vars(self):
         """
-        prepare all variables and sources
+        prepare variables which not derived from source
         """
         # init inner variables
         self.init_inner_var_dict()
 
         # load platform informations
-        self.platform_info.load_local()
+        self.platform_info = self.memo.get("platform", self.load_platform)
         self.inner_var_dict_add_platform(self.platform_info)
 
         # init all_var_dict, now only have input params, input param derived
@@ -400,21 +870,31 @@ class WorkflowHandle:
         self.yml_vars = self.yml_obj.variables
         VarReplaceHandle.replace_list(self.yml_vars, self.all_var_dict)
 
+        return True
+
+    def prepare_src(self):
+        """
+        download source and prepare variables derived from source, variables
+        already resolved never change here, so it's safe to run concurrently
+        with steps which only use them
+        """
         # try download source
         source_path = self.working_dir
 
         self.src = self.get_yml_source(self.yml_obj.source, self.all_var_dict)
         if self.need_download_source(self.src):
-            src_downloader = SourceDownloader()
-            if src_downloader.download(
-                    self.src, SettingsHandle().source_path) is False:
+            self.lock_source(self.src)
+            source_key = ("source", json.dumps(self.src.get_ordered_dict()))
+            source_path = self.memo.get(
+                source_key, lambda: self.download_source(self.src))
+            if source_path is None:
                 return False
-            source_path = src_downloader.source_path
 
         self.inner_var_dict["SOURCE_PATH"] = source_path
 
         # set git info
-        self.git_info.get_git_info(source_path)
+        self.git_info = self.memo.get(
+            ("git", source_path), lambda: self.load_git_info(source_path))
         self.inner_var_dict_add_git(self.git_info)
 
         if not self.need_download_source(self.src):
@@ -434,51 +914,269 @@ class WorkflowHandle:
 
         return True
 
+    def load_platform(self):
+        """
+        load local platform informations
+        """
+        platform_info = PlatformInfo()
+        platform_info.load_local()
+        return platform_info
+
+    def download_source(self, src_info: SourceInfo):
+        """
+        download source
+        :param src_info: source info
+        :return: source path, None if failed
+        """
+        src_downloader = SourceDownloader()
+        if src_downloader.download(
+                src_info, SettingsHandle().source_path) is False:
+            return None
+        return src_downloader.source_path
+
+    def lock_source(self, src_info: SourceInfo):
+        """
+        hold shared lock of source checkout until workflow finished, so
+        `gc sources` never remove it during build
+        :param src_info: source info
+        """
+        source_root = SettingsHandle().source_path
+        if len(source_root) == 0:
+            return
+        source_path = SourceDownloader.get_source_path(src_info, source_root)
+        self.source_lock = FileLock(
+            SourceDownloader.get_usage_path(source_root, source_path),
+            shared=True)
+        self.source_lock.acquire()
+
+    def load_git_info(self, source_path):
+        """
+        load git informations of source
+        :param source_path: source path
+        """
+        git_info = GitInfo()
+        git_info.get_git_info(source_path)
+        return git_info
+
     def prepare_deps(self):
         """
-        prepare dependencies
+        search dependencies and test dependencies in one pass, packages
+        shared by them be searched once
         """
         self.deps = self.yml_obj.deps
-        for dep in self.deps:
+        self.test_deps = self.yml_obj.test_deps
+        for dep in self.deps + self.test_deps:
             for k in dep.keys():
                 dep[k] = VarReplaceHandle.replace(dep[k], self.all_var_dict)
 
-        repo_deps_handle = RepoDepsHandle(
-            self.platform_info,
-            self.build_info,
-        )
+        self.deps_handle = self.new_deps_handle()
+        self.test_deps_handle = self.new_deps_handle(dep_builder=False)
 
-        if repo_deps_handle.search_all_deps(self.deps) is False:
+        if self.deps_handle.search_all_deps(
+                self.deps,
+                [(self.test_deps_handle, self.test_deps)]) is False:
             logging.error("failed search dependencies")
             return False
 
-        if repo_deps_handle.download_all_deps(self.deps_dir) is False:
-            logging.error("failed download dependencies")
-            return False
-
         return True
 
-    def prepare_test_deps(self):
+    def new_deps_handle(self, dep_builder=True):
         """
-        prepare test dependencies
+        create dependencies handle, when build_src_if_not_exists in settings
+        is true, missing dependencies be built from recipes
+        :param dep_builder: False for handle which missing dependencies be
+            built by other handle
         """
-        self.test_deps = self.yml_obj.test_deps
-        for dep in self.test_deps:
-            for k in dep.keys():
-                dep[k] = VarReplaceHandle.replace(dep[k], self.all_var_dict)
-
-        repo_deps_handle = RepoDepsHandle(
+        builder = None
+        if dep_builder and SettingsHandle().build_if_not_exists:
+            builder = DepSrcBuilder(
+                os.path.join(self.hpb_dir, "deps_src"),
+                self.task_id,
+                max_jobs=os.cpu_count() or 1,
+                wait_ready=self.wait_prepare_src)
+        if self.pkg_cache is None and len(SettingsHandle().cache_path) > 0:
+            self.pkg_cache = PkgCacheHandle(
+                os.path.join(SettingsHandle().cache_path, "pkgs"))
+        return RepoDepsHandle(
             self.platform_info,
             self.build_info,
+            dep_builder=builder,
+            memo=self.memo,
+            pkg_cache=self.pkg_cache,
         )
 
-        if repo_deps_handle.search_all_deps(self.test_deps) is False:
-            logging.error("failed search dependencies")
-            return False
+    def download_deps(self):
+        """
+        download dependencies and test dependencies concurrently, when
+        reuse_deps is true, only changed dependencies be updated, kinds of
+        dependencies which declared by jobs are downloaded lazily
+        """
+        lazy_kinds = self.get_lazy_deps_kinds()
+        tasks = []
+        for kind, (name, handle, dst_dir) in self.get_deps_tasks().items():
+            if handle is None:
+                if self.reuse_deps:
+                    self._mk_empty_dir(dst_dir)
+                continue
+            if kind in lazy_kinds:
+                logging.info("{} be downloaded when job needs".format(name))
+                continue
+            tasks.append((name, handle, dst_dir))
+        if len(tasks) == 0:
+            return True
 
-        if repo_deps_handle.download_all_deps(self.test_deps_dir) is False:
-            logging.error("failed download dependencies")
-            return False
+        ret = True
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(tasks)) as executor:
+            futures = {}
+            for name, handle, dst_dir in tasks:
+                futures[executor.submit(
+                    handle.download_all_deps, dst_dir,
+                    self.reuse_deps)] = name
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                try:
+                    success = future.result() is not False
+                except Exception as e:
+                    logging.exception("download {} exception: {}".format(
+                        name, e))
+                    success = False
+                if not success:
+                    logging.error("failed download {}".format(name))
+                    ret = False
+        return ret
+
+    def get_deps_tasks(self):
+        """
+        get kind of dependencies -> (name, handle, download directory)
+        """
+        return {
+            "deps": ("dependencies", self.deps_handle, self.deps_dir),
+            "test_deps": (
+                "test dependencies", self.test_deps_handle,
+                self.test_deps_dir),
+        }
+
+    def get_lazy_deps_kinds(self):
+        """
+        get kinds of dependencies which any job declares whether it needs
+        them, e.g. 'test_deps: true', these kinds are downloaded when the
+        first job needs them run, others are downloaded before jobs
+        """
+        kinds = set()
+        for job in self.yml_obj.jobs.values():
+            for kind in self.get_deps_tasks().keys():
+                if kind in job:
+                    kinds.add(kind)
+        return kinds
+
+    def download_job_deps(self, job_name, job):
+        """
+        download lazy dependencies which job needs, each kind of
+        dependencies only be downloaded once
+        :param job_name: job name
+        :param job: single job
+        """
+        lazy_kinds = self.get_lazy_deps_kinds()
+        for kind, (name, handle, dst_dir) in self.get_deps_tasks().items():
+            if kind not in lazy_kinds or handle is None:
+                continue
+            if not Utils.get_boolean(job.get(kind, False), self.all_var_dict):
+                continue
+            with self.lazy_deps_lock:
+                if kind not in self.lazy_deps_ret:
+                    logging.info("job {} needs {}, download: {}".format(
+                        job_name, name, dst_dir))
+                    try:
+                        ret = self.run_phase(
+                            "download_{}".format(kind),
+                            lambda: handle.download_all_deps(
+                                dst_dir, self.reuse_deps))
+                    except Exception as e:
+                        logging.exception("download {} exception: {}".format(
+                            name, e))
+                        ret = False
+                    self.lazy_deps_ret[kind] = ret is not False
+                if not self.lazy_deps_ret[kind]:
+                    logging.error("failed download {}".format(name))
+                    return False
+        return True
+
+    def gen_recipe_hash(self):
+        """
+        generate recipe hash, it's determined by workflow yaml, resolved
+        variables, build info, platform info, source commit id and resolved
+        dependency packages
+        """
+        with open(self.cfg_file_path, "rb") as f:
+            yml_content = f.read()
+
+        # directories and id of current task are not part of recipe
+        task_var_dict = {
+            "TASK_DIR": self.task_dir,
+            "BUILD_DIR": self.build_dir,
+            "TASK_ID": self.task_id,
+        }
+        var_dict = {}
+        for k, v in self.all_var_dict.items():
+            v = str(v)
+            for task_k, task_v in task_var_dict.items():
+                if len(task_v) == 0:
+                    continue
+                v = v.replace(task_v, "${{{}_{}}}".format(
+                    APP_NAME.upper(), task_k))
+            var_dict[k] = v
+
+        dep_list = []
+        for handle in [self.deps_handle, self.test_deps_handle]:
+            if handle is None:
+                dep_list.append([])
+                continue
+            pkg_hashes = []
+            for pkg_info in handle.get_chosen_deps():
+                pkg_hashes.append([
+                    pkg_info.path, pkg_info.hash_val(), pkg_info.ts])
+            pkg_hashes.sort()
+            dep_list.append(pkg_hashes)
+
+        recipe = {
+            "workflow": hashlib.sha256(yml_content).hexdigest(),
+            "variables": var_dict,
+            "build": self.build_info.get_ordered_dict(),
+            "platform": self.platform_info.get_ordered_dict(),
+            "commit_id": self.git_info.commit_id,
+            "deps": dep_list,
+        }
+        content = json.dumps(recipe, sort_keys=True)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def search_built_pkg(self, recipe_hash) -> typing.Optional[str]:
+        """
+        search package directory which built from the same recipe
+        :param recipe_hash: recipe hash
+        """
+        db_path = SettingsHandle().db_path
+        mapper_recipe = MapperRecipe()
+        DBHandle.create_tables(db_path, [mapper_recipe])
+        with DBHandle(db_path, readonly=True) as db_handle:
+            dirpaths = mapper_recipe.query(db_handle.conn, recipe_hash)
+
+        for dirpath in dirpaths:
+            if os.path.exists(dirpath):
+                return dirpath
+        return None
+
+    def pull_built_pkg(self, dirpath):
+        """
+        copy already built package into package directory
+        :param dirpath: already built package directory
+        """
+        for f in os.listdir(dirpath):
+            filepath = os.path.join(dirpath, f)
+            if not os.path.isfile(filepath):
+                continue
+            logging.info("pull {} -> {}".format(filepath, self.pkg_dir))
+            shutil.copy(filepath, self.pkg_dir)
 
     def prepare_build_info(self):
         """
@@ -502,10 +1200,30 @@ class WorkflowHandle:
 
         self.build_info = BuildInfo()
         self.build_info.load(build_info_dict)
-        self.build_info.complement()
+
+        # only compiler and link informations need to be probed
+        probe_dict = {
+            "compiler": build_info_dict.get("compiler", {}),
+            "link": build_info_dict.get("link", {}),
+        }
+        probe_key = ("build_info", json.dumps(probe_dict, sort_keys=True))
+        probed = self.memo.get(
+            probe_key, lambda: self.probe_build_info(probe_dict))
+        self.build_info.compiler_info = copy.deepcopy(probed.compiler_info)
+        self.build_info.link_info = copy.deepcopy(probed.link_info)
 
         return True
 
+    def probe_build_info(self, probe_dict):
+        """
+        probe local compiler and link informations
+        :param probe_dict: compiler and link fields in yml build
+        """
+        build_info = BuildInfo()
+        build_info.load(probe_dict)
+        build_info.complement()
+        return build_info
+
     def need_download_source(self, src_info: SourceInfo):
         """
         check is need to download source
@@ -0,0 +1,371 @@
+import datetime
+import glob
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import typing
+
+from hpb.component.command_handle import CommandHandle
+from hpb.component.job_scheduler import JobScheduler
+from hpb.component.settings_handle import SettingsHandle
+from hpb.component.var_replace_handle import VarReplaceHandle
+from hpb.component.yaml_handle import YamlHandle
+from hpb.data_type.builder_config import BuilderConfig
+from hpb.data_type.constant_var import APP_NAME
+from hpb.data_type.workflow_yml import WorkflowYaml
+from hpb.utils.log_handle import LogHandle
+
+
+class WorkspaceRecipe:
+    """
+    recipe in workspace
+    """
+
+    def __init__(self):
+        self.name = ""  # unique name in workspace
+        self.filepath = ""  # recipe file path
+        self.maintainer = ""  # source maintainer
+        self.pkg_name = ""  # source name
+        self.tag = ""  # source tag, may reference variable
+        self.deps = []  # (maintainer, name, tag) of deps and test_deps
+        self.params = []  # extra build parameters of this recipe
+
+
+class WorkspaceHandle:
+    """
+    build many recipes in dependency order, recipe build as soon as all
+    recipes which produce its dependencies be built and uploaded
+    """
+
+    def __init__(self):
+        self.working_dir = ""  # working directory
+        self.workspace_path = ""  # workspace directory or manifest file
+        self.task_id = ""  # task id
+        self.max_jobs = 1  # max number of recipes build concurrently
+        self.cfg = BuilderConfig()  # builder config pass to each recipe
+        self.env = None  # environment variables of recipe builds
+
+        self.ws_dir = ""  # workspace log directory
+        self.recipes: typing.Dict[str, WorkspaceRecipe] = {}
+
+    def set_input_args(self, cfg: BuilderConfig):
+        """
+        set input arguments
+        :param cfg: builder input arguments
+        """
+        if len(cfg.working_dir) == 0:
+            self.working_dir = os.path.abspath(os.getcwd())
+        else:
+            self.working_dir = cfg.working_dir
+
+        self.workspace_path = cfg.workspace
+        if not os.path.isabs(self.workspace_path):
+            self.workspace_path = os.path.join(
+                self.working_dir, self.workspace_path)
+
+        if len(cfg.task_id) == 0:
+            now = datetime.datetime.now()
+            micro_sec = "{:06}".format(int(now.strftime("%f")))
+            self.task_id = "{}-{}".format(
+                now.strftime("%Y%m%d-%H%M%S"), micro_sec)
+        else:
+            self.task_id = cfg.task_id
+
+        if cfg.jobs < 1:
+            print("invalid jobs: {}".format(cfg.jobs))
+            return False
+        self.max_jobs = cfg.jobs
+        self.cfg = cfg
+
+        self.ws_dir = os.path.join(
+            self.working_dir,
+            "_{}".format(APP_NAME),
+            "workspace.{}".format(self.task_id))
+        return True
+
+    def init_log(self):
+        """
+        init log
+        """
+        console_log_level = LogHandle.log_level(
+            SettingsHandle().log_console_level
+        )
+        file_log_level = LogHandle.log_level(
+            SettingsHandle().log_file_level
+        )
+        LogHandle.init_log(
+            os.path.join(self.ws_dir, "workspace.log"),
+            console_level=console_log_level,
+            file_level=file_log_level,
+            use_rotate=False)
+
+        # output of recipes only write into their own log files
+        command_logger = logging.getLogger("command")
+        command_logger.propagate = False
+        command_logger.setLevel(logging.INFO)
+
+    def run(self):
+        """
+        build all recipes in workspace
+        """
+        recipe_paths = self.get_recipe_paths()
+        if recipe_paths is None:
+            return False
+        if len(recipe_paths) == 0:
+            logging.error("no recipe in workspace: {}".format(
+                self.workspace_path))
+            return False
+
+        for filepath in recipe_paths:
+            recipe = self.load_recipe(filepath)
+            if recipe is None:
+                return False
+            self.recipes[recipe.name] = recipe
+
+        return self.build_recipes()
+
+    def build_recipes(self):
+        """
+        build loaded recipes in dependency order
+        """
+        recipe_needs = self.get_recipe_needs()
+        if recipe_needs is None:
+            return False
+        for name, needs in recipe_needs.items():
+            logging.info("recipe {}: {}, needs: [{}]".format(
+                name, self.recipes[name].filepath, ", ".join(needs)))
+
+        lock = threading.Lock()
+        handle_dict = {}
+
+        def run_recipe(name):
+            command_handle = self.new_recipe_command_handle(name)
+            with lock:
+                handle_dict[name] = command_handle
+            ret = self.build_recipe(self.recipes[name], command_handle)
+            self.close_recipe_command_handle(name, command_handle)
+            if ret is True:
+                logging.info("recipe {} success".format(name))
+            return ret
+
+        def cancel_recipe(name):
+            with lock:
+                command_handle = handle_dict.get(name, None)
+            if command_handle is not None:
+                command_handle.terminate()
+
+        scheduler = JobScheduler(max_workers=self.max_jobs)
+        ret = scheduler.run(recipe_needs, run_recipe, cancel_recipe)
+        if ret is False:
+            logging.error("workspace build failed, logs in {}".format(
+                self.ws_dir))
+        return ret
+
+    def get_recipe_paths(self) -> typing.Optional[typing.List[str]]:
+        """
+        get recipe file paths, workspace is directory which recipes be
+        searched recursively, or manifest file with recipe list, e.g.
+            recipes:
+              - zlib/zlib.yml
+              - openssl/openssl.unix.yml
+        """
+        if os.path.isdir(self.workspace_path):
+            # skip build outputs, they contain generated yml files
+            output_dir = "_{}".format(APP_NAME)
+            paths = []
+            for suffix in ("*.yml", "*.yaml"):
+                for path in glob.glob(
+                        os.path.join(self.workspace_path, "**", suffix),
+                        recursive=True):
+                    rel_path = os.path.relpath(path, self.workspace_path)
+                    if output_dir in rel_path.split(os.sep):
+                        continue
+                    paths.append(path)
+            return sorted(paths)
+
+        obj = YamlHandle().load(self.workspace_path)
+        if obj is None or type(obj.get("recipes", None)) is not list:
+            logging.error("invalid workspace manifest: {}".format(
+                self.workspace_path))
+            return None
+
+        manifest_dir = os.path.dirname(self.workspace_path)
+        paths = []
+        for path in obj["recipes"]:
+            if not os.path.isabs(path):
+                path = os.path.join(manifest_dir, path)
+            if not os.path.isfile(path):
+                logging.error("recipe not exists: {}".format(path))
+                return None
+            paths.append(path)
+        return paths
+
+    def load_recipe(self, filepath) -> typing.Optional[WorkspaceRecipe]:
+        """
+        load recipe's source and dependencies
+        :param filepath: recipe file path
+        """
+        yml_obj = WorkflowYaml()
+        if yml_obj.load(YamlHandle().load(filepath)) is False:
+            logging.error("failed load recipe: {}".format(filepath))
+            return None
+
+        # only user input params and yml variables can be replaced here
+        replace_dict = {}
+        for param in self.cfg.params:
+            kv = param.split("=")
+            if len(kv) == 2:
+                replace_dict[kv[0]] = kv[1]
+        VarReplaceHandle.replace_list(
+            yml_obj.variables, replace_dict, result_add_to_var=False)
+
+        def get_field(d, k):
+            v = VarReplaceHandle.replace(d.get(k, ""), replace_dict)
+            if v is None:
+                logging.warning("failed replace {} in recipe {}: {}".format(
+                    k, filepath, d.get(k, "")))
+                return ""
+            return v
+
+        recipe = WorkspaceRecipe()
+        recipe.filepath = filepath
+        recipe.name = os.path.basename(filepath).split(".")[0]
+        idx = 1
+        while recipe.name in self.recipes:
+            recipe.name = "{}_{}".format(
+                os.path.basename(filepath).split(".")[0], idx)
+            idx += 1
+
+        recipe.maintainer = get_field(yml_obj.source, "maintainer")
+        recipe.pkg_name = get_field(yml_obj.source, "name")
+        recipe.tag = str(yml_obj.source.get("tag", ""))
+        deps = []
+        for field_deps in (yml_obj.deps, yml_obj.test_deps):
+            if field_deps is not None:
+                deps.extend(field_deps)
+        for dep in deps:
+            recipe.deps.append((
+                get_field(dep, "maintainer"),
+                get_field(dep, "name"),
+                get_field(dep, "tag")))
+        return recipe
+
+    def get_recipe_needs(self) -> typing.Optional[
+            typing.Dict[str, typing.List[str]]]:
+        """
+        get recipe name -> names of recipes which produce its dependencies
+        """
+        producer_dict = {}
+        for name, recipe in self.recipes.items():
+            if len(recipe.pkg_name) == 0:
+                continue
+            key = (recipe.maintainer, recipe.pkg_name)
+            if key in producer_dict:
+                logging.error("both recipe {} and {} produce {}/{}".format(
+                    producer_dict[key], name, key[0], key[1]))
+                return None
+            producer_dict[key] = name
+
+        recipe_needs = {}
+        for name, recipe in self.recipes.items():
+            needs = []
+            for maintainer, pkg_name, _ in recipe.deps:
+                for key, producer in producer_dict.items():
+                    if key[1] != pkg_name:
+                        continue
+                    if len(maintainer) > 0 and key[0] != maintainer:
+                        continue
+                    if producer != name and producer not in needs:
+                        needs.append(producer)
+            recipe_needs[name] = needs
+
+        # check cycle
+        remain = dict(recipe_needs)
+        while len(remain) > 0:
+            ready = [k for k, v in remain.items()
+                     if all(n not in remain for n in v)]
+            if len(ready) == 0:
+                logging.error("cycle dependence in recipes: {}".format(
+                    ", ".join(remain.keys())))
+                return None
+            for k in ready:
+                del remain[k]
+
+        return recipe_needs
+
+    @staticmethod
+    def get_hpb_command() -> typing.List[str]:
+        """
+        get command which runs the same hpb as current process, in single
+        file binary packed by pyinstaller, sys.executable is hpb itself
+        """
+        if getattr(sys, "frozen", False):
+            return [sys.executable]
+        return [sys.executable, "-m", "hpb.main"]
+
+    def build_recipe(self, recipe: WorkspaceRecipe, command_handle):
+        """
+        build recipe in subprocess
+        :param recipe: workspace recipe
+        :param command_handle: command handle of recipe
+        """
+        # always run in task mode, so recipes build concurrently in the same
+        # working directory without sharing build directory
+        args = self.get_hpb_command() + [
+            "build",
+            "-c", recipe.filepath,
+            "-m", "task",
+            "--work-dir", self.working_dir,
+            "--task-name", recipe.name,
+            "--task-id", self.task_id,
+        ]
+        for param in self.cfg.params + recipe.params:
+            args.extend(["-p", param])
+        if self.cfg.skip_built:
+            args.append("--skip-built")
+        if self.cfg.pull_built:
+            args.append("--pull-built")
+        if self.cfg.shell_session:
+            args.append("--shell-session")
+        if self.cfg.raw_log:
+            args.append("--raw-log")
+
+        if os.name == "posix":
+            command = " ".join([shlex.quote(arg) for arg in args])
+        else:
+            command = subprocess.list2cmdline(args)
+
+        logging.info("build recipe {}: {}".format(recipe.name, command))
+        return command_handle.exec(command)
+
+    def new_recipe_command_handle(self, name):
+        """
+        create command handle for recipe, output write into recipe log
+        :param name: recipe name
+        """
+        logger_name = "command.{}".format(name)
+        recipe_logger = logging.getLogger(logger_name)
+        recipe_logger.propagate = False
+        recipe_logger.setLevel(logging.INFO)
+        log_path = os.path.join(self.ws_dir, "{}.log".format(name))
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        recipe_logger.addHandler(logging.FileHandler(log_path, "w"))
+        return CommandHandle(
+            cwd=self.working_dir, logger_name=logger_name, kill_group=True,
+            env=self.env)
+
+    def close_recipe_command_handle(self, name, command_handle):
+        """
+        close recipe's command handle and log file
+        :param name: recipe name
+        :param command_handle: command handle of recipe
+        """
+        command_handle.close()
+
+        recipe_logger = logging.getLogger("command.{}".format(name))
+        for handler in list(recipe_logger.handlers):
+            recipe_logger.removeHandler(handler)
+            handler.close()
@@ -7,3 +7,13 @@ class BuilderConfig:
         self.task_id = ""
         self.task_name = ""
         self.settings_path = ""
+        self.jobs = 1
+        self.skip_built = False
+        self.pull_built = False
+        self.shell_session = False
+        self.raw_log = False
+        self.plan = False
+        self.workspace = ""
+        self.matrix = []
+        self.matrix_jobs = 0
+        self.refresh_probe = False
@@ -1,6 +1,7 @@
 import json
 from typing import OrderedDict
 from hpb.component.command_handle import CommandHandle
+from hpb.component.probe_cache_handle import ProbeCacheHandle
 
 
 class CompilerInfo:
@@ -65,18 +66,41 @@ class CompilerInfo:
         return self._load_local_gcc_like(cc="musl-gcc", cxx="musl-g++")
 
     def _load_local_gcc_like(self, cc, cxx):
+        """
+        load gcc like compiler information, result is cached by compiler
+        binary path, mtime and size
+        """
+        key = {
+            "cc": ProbeCacheHandle().command_key(cc),
+            "cxx": ProbeCacheHandle().command_key(cxx),
+        }
+        obj = ProbeCacheHandle().get(
+            "compiler", key, lambda: self._probe_gcc_like(cc, cxx))
+        if obj is None:
+            return False
+        self.load(obj)
+        return True
+
+    def _probe_gcc_like(self, cc, cxx):
+        """
+        probe gcc like compiler versions
+        :return: compiler info object, None if failed
+        """
         # c compiler
         outs, errs = CommandHandle().call("{} -dumpversion".format(cc))
-        if len(errs) > 0:
-            return False
-        self.compiler_c = cc
-        self.compiler_c_ver = outs[0]
+        if len(errs) > 0 or len(outs) == 0:
+            return None
+        cc_ver = outs[0]
 
         # cpp compiler
         outs, errs = CommandHandle().call("{} -dumpversion".format(cxx))
-        if len(errs) > 0:
-            return False
-        self.compiler_cpp = cxx
-        self.compiler_cpp_ver = outs[0]
+        if len(errs) > 0 or len(outs) == 0:
+            return None
+        cxx_ver = outs[0]
 
-        return True
+        return {
+            "cc": cc,
+            "cc_ver": cc_ver,
+            "cxx": cxx,
+            "cxx_ver": cxx_ver,
+        }
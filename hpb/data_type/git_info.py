@@ -1,7 +1,8 @@
 import logging
-import os
 import subprocess
 
+from hpb.utils.git_dir_reader import GitDirReader, GitDirUnsupported
+
 
 class GitInfo:
     """
@@ -19,14 +20,19 @@ class GitInfo:
 
     def get_git_info(self, dirpath):
         """
-        get git informations of dirpath
+        get git informations of dirpath, read .git directory directly and
+        fallback to git command if the repository layout is not supported
         """
-        origin_dir = os.path.abspath(os.curdir)
-        os.chdir(dirpath)
+        try:
+            self.tag, self.commit_id, self.branch = \
+                GitDirReader(dirpath).read()
+        except GitDirUnsupported as e:
+            logging.debug("fallback to git command, {}".format(e))
+            self._get_git_info_by_command(dirpath)
+        except Exception as e:
+            logging.debug("failed read git directory, {}".format(e))
+            self._get_git_info_by_command(dirpath)
 
-        self.tag = self._get_git_tag()
-        self.commit_id = self._get_git_commit_id()
-        self.branch = self._get_git_branch()
         if len(self.tag) > 0:
             self.ref = self.tag
         elif len(self.commit_id) > 0:
@@ -34,9 +40,15 @@ class GitInfo:
         else:
             self.ref = ""
 
-        os.chdir(origin_dir)
+    def _get_git_info_by_command(self, dirpath):
+        """
+        get tag, commit id and branch by git command
+        """
+        self.tag = self._get_git_tag(dirpath)
+        self.commit_id = self._get_git_commit_id(dirpath)
+        self.branch = self._get_git_branch(dirpath)
 
-    def _get_git_tag(self):
+    def _get_git_tag(self, dirpath):
         """
         get git tag
         """
@@ -45,13 +57,14 @@ class GitInfo:
             result = subprocess.run(
                 "git describe --tags --exact-match 2> /dev/null",
                 shell=True,
+                cwd=dirpath,
                 stdout=subprocess.PIPE)
             v = result.stdout.decode("utf-8").strip()
         except Exception as e:
             logging.debug("failed get git tag: {}".format(str(e)))
         return v
 
-    def _get_git_commit_id(self):
+    def _get_git_commit_id(self, dirpath):
         """
         get git commit id
         """
@@ -60,13 +73,14 @@ class GitInfo:
             result = subprocess.run(
                 "git rev-parse --short HEAD",
                 shell=True,
+                cwd=dirpath,
                 stdout=subprocess.PIPE)
             v = result.stdout.decode("utf-8").strip()
         except Exception as e:
             logging.debug("failed get git commit id: {}".format(str(e)))
         return v
 
-    def _get_git_branch(self):
+    def _get_git_branch(self, dirpath):
         """
         get git branch
         """
@@ -75,6 +89,7 @@ class GitInfo:
             result = subprocess.run(
                 "git symbolic-ref -q --short HEAD",
                 shell=True,
+                cwd=dirpath,
                 stdout=subprocess.PIPE)
             v = result.stdout.decode("utf-8").strip()
         except Exception as e:
@@ -1,8 +1,10 @@
 import json
 import platform
+import sys
 from typing import OrderedDict
 
 from hpb.component.command_handle import CommandHandle
+from hpb.component.probe_cache_handle import ProbeCacheHandle
 
 
 class LinkInfo:
@@ -34,19 +36,31 @@ class LinkInfo:
 
     def load_local_libc(self):
         """
-        get libc info
+        get libc info, result is cached by python executable and ldd
         """
-        # libc info
-        libc_ver_pair = platform.libc_ver()
-        if len(libc_ver_pair) > 0 and len(libc_ver_pair[0]) == 0:
-            # maybe musl libc
-            libc_ver_pair = self._get_musl_info()
+        key = {
+            "python": ProbeCacheHandle().file_key(sys.executable),
+            "ldd": ProbeCacheHandle().command_key("ldd"),
+        }
+        libc_ver_pair = ProbeCacheHandle().get(
+            "libc", key, self._probe_libc)
 
         if len(libc_ver_pair) > 0:
             self.libc = libc_ver_pair[0]
         if len(libc_ver_pair) > 1:
             self.libc_ver = libc_ver_pair[1]
 
+    def _probe_libc(self):
+        """
+        probe libc name and version
+        """
+        # libc info
+        libc_ver_pair = platform.libc_ver()
+        if len(libc_ver_pair) > 0 and len(libc_ver_pair[0]) == 0:
+            # maybe musl libc
+            libc_ver_pair = self._get_musl_info()
+        return list(libc_ver_pair)
+
     def _get_musl_info(self):
         """
         get musl libc information
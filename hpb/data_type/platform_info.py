@@ -1,9 +1,12 @@
 import distro
 import json
 import platform
+import sys
 
 from typing import OrderedDict
 
+from hpb.component.probe_cache_handle import ProbeCacheHandle
+
 
 class PlatformInfo:
     """
@@ -71,8 +74,16 @@ class PlatformInfo:
         self.machine = platform.machine()
 
         if self.system == "linux":
-            self.distr_id = distro.id()
-            self.distr_ver = distro.version()
+            # distro lookups are cached by os-release files
+            key = {
+                "os_release": ProbeCacheHandle().content_key(
+                    "/etc/os-release"),
+                "usr_os_release": ProbeCacheHandle().content_key(
+                    "/usr/lib/os-release"),
+                "python": ProbeCacheHandle().file_key(sys.executable),
+            }
+            self.distr_id, self.distr_ver = ProbeCacheHandle().get(
+                "distro", key, lambda: [distro.id(), distro.version()])
         else:
             self.distr_id = ""
             self.distr_ver = ""
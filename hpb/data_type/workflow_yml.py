@@ -14,6 +14,7 @@ class WorkflowYaml:
         self._deps = []
         self._test_deps = []
         self._jobs = {}
+        self._matrix = {}
 
     def load(self, obj: typing.Optional[typing.Dict]):
         """
@@ -30,6 +31,7 @@ class WorkflowYaml:
         self._deps = self._obj.get("deps", [])
         self._test_deps = self._obj.get("test_deps", [])
         self._jobs = self._obj.get("jobs", {})
+        self._matrix = self._obj.get("matrix", {})
 
         return True
 
@@ -96,3 +98,18 @@ class WorkflowYaml:
         get jobs
         """
         return self._jobs
+
+    @property
+    def matrix(self):
+        """
+        get matrix, variable name -> value list
+        """
+        matrix = {}
+        if self._matrix is None:
+            return matrix
+        for k, v in self._matrix.items():
+            if type(v) is list:
+                matrix[k] = [str(item) for item in v]
+            else:
+                matrix[k] = [str(v)]
+        return matrix
@@ -5,6 +5,7 @@ from hpb.__version__ import __version__
 from hpb.command.builder import Builder
 from hpb.command.dbsync import DbSync
 from hpb.command.downloader import Downloader
+from hpb.command.garbage_collector import GarbageCollector
 from hpb.command.packer import Packer
 from hpb.command.searcher import Searcher
 from hpb.command.uploader import Uploader
@@ -66,6 +67,15 @@ def run_dbsync():
         sys.exit(1)
 
 
+def run_gc():
+    """
+    remove least recently used sources
+    """
+    gc = GarbageCollector()
+    if gc.run(sys.argv[2:]) is False:
+        sys.exit(1)
+
+
 def init_log():
     """
     init log
@@ -84,6 +94,7 @@ def main():
         "  pull     pull package\n" \
         "  pack     pack package\n" \
         "  dbsync   sync local db and local package dirctory\n" \
+        "  gc       remove least recently used sources\n" \
         "".format(sys.argv[0])
 
     if len(sys.argv) < 2:
@@ -112,6 +123,7 @@ def main():
         "pull": run_pull,
         "pack": run_pack,
         "dbsync": run_dbsync,
+        "gc": run_gc,
     }
 
     command = sys.argv[1]
@@ -0,0 +1,86 @@
+import logging
+import time
+import typing
+
+
+class MapperBuildHistory:
+    """
+    build history mapper, record durations of workflow jobs and steps
+    """
+
+    def __init__(self):
+        self.table_name = "build_history"
+
+    def create_table(self, conn):
+        """
+        create table
+        """
+        cursor = conn.cursor()
+        sqlstr = "CREATE TABLE IF NOT EXISTS {} (" \
+            "task_name TEXT NOT NULL," \
+            "recipe TEXT NOT NULL," \
+            "task_id TEXT NOT NULL," \
+            "kind TEXT NOT NULL," \
+            "name TEXT NOT NULL," \
+            "duration REAL NOT NULL," \
+            "success INT NOT NULL," \
+            "update_ts INT NOT NULL " \
+            ")".format(self.table_name)
+        cursor.execute(sqlstr)
+
+        sqlstr = "CREATE INDEX IF NOT EXISTS idx_build_history_task " \
+            "ON {} (task_name, recipe, kind)".format(self.table_name)
+        cursor.execute(sqlstr)
+        conn.commit()
+
+    def insert(self, conn, task_name, recipe, task_id, records):
+        """
+        insert durations of one build
+        :param records: list of (kind, name, duration in seconds, success)
+        """
+        sqlstr = \
+            "INSERT INTO {} (" \
+            "task_name, recipe, task_id, kind, name, " \
+            "duration, success, update_ts" \
+            ") " \
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)".format(self.table_name)
+
+        ts = int(time.time())
+        rows = []
+        for kind, name, duration, success in records:
+            rows.append((
+                task_name, recipe, task_id, kind, name,
+                duration, 1 if success else 0, ts))
+
+        cursor = conn.cursor()
+        cursor.executemany(sqlstr, rows)
+        logging.debug("insert build history: {}.{}, {} records".format(
+            task_name, task_id, len(rows)))
+        conn.commit()
+
+    def query_durations(
+            self, conn, task_name, recipe, kind,
+            max_runs=5) -> typing.Dict[str, float]:
+        """
+        query average duration of the latest successful runs
+        :param kind: job or step
+        :param max_runs: max number of latest runs be averaged
+        :return: name -> duration in seconds
+        """
+        sqlstr = \
+            "SELECT name, duration from {} " \
+            "WHERE task_name=? AND recipe=? AND kind=? AND success=1 " \
+            "ORDER BY update_ts DESC, rowid DESC".format(self.table_name)
+
+        duration_dict = {}
+        cursor = conn.cursor()
+        cursor.execute(sqlstr, (task_name, recipe, kind))
+        for row in cursor:
+            durations = duration_dict.setdefault(row[0], [])
+            if len(durations) < max_runs:
+                durations.append(row[1])
+
+        result = {}
+        for name, durations in duration_dict.items():
+            result[name] = sum(durations) / len(durations)
+        return result
@@ -1,13 +1,14 @@
 import functools
 import json
 import logging
+import os
 import sqlite3
 import time
 import typing
 
+from hpb.data_type.constant_var import APP_NAME
 from hpb.data_type.package_info import PackageInfo
 from hpb.data_type.semver_item import SemverItem
-from hpb.utils.utils import Utils
 
 
 class MapperPkg:
@@ -17,12 +18,62 @@ class MapperPkg:
 
     def __init__(self):
         self.table_name = "package"
+
+        # package meta columns, used for filter packages in sql and build
+        # package info without loading meta file
+        self.meta_columns = [
+            ("sys", "TEXT NOT NULL DEFAULT ''"),
+            ("sys_release", "TEXT NOT NULL DEFAULT ''"),
+            ("sys_ver", "TEXT NOT NULL DEFAULT ''"),
+            ("machine_arch", "TEXT NOT NULL DEFAULT ''"),
+            ("distr_id", "TEXT NOT NULL DEFAULT ''"),
+            ("distr_ver", "TEXT NOT NULL DEFAULT ''"),
+            ("build_type", "TEXT NOT NULL DEFAULT ''"),
+            ("fat_pkg", "INT NOT NULL DEFAULT 0"),
+            ("cc", "TEXT NOT NULL DEFAULT ''"),
+            ("cc_ver", "TEXT NOT NULL DEFAULT ''"),
+            ("cxx", "TEXT NOT NULL DEFAULT ''"),
+            ("cxx_ver", "TEXT NOT NULL DEFAULT ''"),
+            ("libc", "TEXT NOT NULL DEFAULT ''"),
+            ("libc_ver", "TEXT NOT NULL DEFAULT ''"),
+            ("meta", "TEXT NOT NULL DEFAULT ''"),
+        ]
         self.qry_sqlstr = \
             "SELECT " \
             "dirpath, maintainer, name, tag, " \
-            "hash_val, update_ts " \
+            "hash_val, update_ts, meta " \
             "from {} ".format(self.table_name)
 
+        # statements are constant strings with parameters, so they are
+        # prepared once and reused from sqlite3 statement cache
+        self.qry_tags_sqlstr = \
+            "SELECT tag from {} " \
+            "WHERE maintainer=? AND name=? " \
+            "GROUP BY tag".format(self.table_name)
+        self.qry_maintainer_repos_sqlstr = \
+            "SELECT name from {} " \
+            "WHERE maintainer=? " \
+            "GROUP BY name".format(self.table_name)
+        self.qry_repos_sqlstr = \
+            "SELECT maintainer from {} " \
+            "WHERE name=? " \
+            "GROUP BY maintainer".format(self.table_name)
+        self.remove_by_dirpath_sqlstr = \
+            "DELETE FROM {} WHERE dirpath=?".format(self.table_name)
+        self.insert_sqlstr = \
+            "INSERT INTO {} (" \
+            "dirpath, maintainer, name, tag, " \
+            "hash_val, update_ts, {}" \
+            ") " \
+            "VALUES (" \
+            "?, ?, ?, ?, " \
+            "?, ?, {}" \
+            ")" \
+            "".format(
+                self.table_name,
+                ", ".join([name for name, _ in self.meta_columns]),
+                ", ".join(["?"] * len(self.meta_columns)))
+
     def create_table(self, conn):
         """
         create table
@@ -35,47 +86,81 @@ class MapperPkg:
             "tag TEXT NOT NULL," \
             "hash_val TEXT NOT NULL, " \
             "update_ts INT NOT NULL, " \
+            "{}, " \
             "PRIMARY KEY(maintainer, name, tag, hash_val) " \
-            ")".format(self.table_name)
+            ")".format(
+                self.table_name,
+                ", ".join([
+                    "{} {}".format(name, decl)
+                    for name, decl in self.meta_columns
+                ]))
         cursor.execute(sqlstr)
 
         sqlstr = "CREATE INDEX IF NOT EXISTS idx_path ON {} (dirpath)".format(
             self.table_name)
         cursor.execute(sqlstr)
+
+        # lookups by maintainer, name and tag are served by primary key,
+        # lookup by name alone need its own index
+        sqlstr = "CREATE INDEX IF NOT EXISTS idx_name " \
+            "ON {} (name, maintainer)".format(self.table_name)
+        cursor.execute(sqlstr)
+
+        self._migrate(cursor)
         conn.commit()
 
-    def query(self, conn, qry: PackageInfo) -> typing.List[PackageInfo]:
+    def _migrate(self, cursor):
         """
-        query package infos
+        add meta columns into table which created by old version, and fill
+        them from meta file in package directory
         """
-        src_info = qry.meta.source_info
+        cursor.execute("PRAGMA table_info({})".format(self.table_name))
+        exist_columns = set([row[1] for row in cursor.fetchall()])
+        added = False
+        for name, decl in self.meta_columns:
+            if name in exist_columns:
+                continue
+            logging.info("add column {}.{}".format(self.table_name, name))
+            cursor.execute("ALTER TABLE {} ADD COLUMN {} {}".format(
+                self.table_name, name, decl))
+            added = True
+        if not added:
+            return
 
-        cond_list = []
-        if len(qry.path) != 0:
-            cond_list.append("dirpath='{}'".format(qry.path))
-        if len(src_info.maintainer) != 0:
-            cond_list.append("maintainer='{}'".format(src_info.maintainer))
-        if len(src_info.name) != 0:
-            cond_list.append("name='{}'".format(src_info.name))
-        if len(src_info.tag) != 0:
-            cond_list.append("tag='{}'".format(src_info.tag))
+        sqlstr = \
+            "UPDATE {} SET {} " \
+            "WHERE dirpath=? AND hash_val=?".format(
+                self.table_name,
+                ", ".join([
+                    "{}=?".format(name) for name, _ in self.meta_columns
+                ]))
+        cursor.execute(
+            "SELECT dirpath, hash_val from {} WHERE meta=''".format(
+                self.table_name))
+        for dirpath, hash_val in cursor.fetchall():
+            pkg_info = PackageInfo()
+            pkg_info.path = dirpath
+            meta_filepath = os.path.join(dirpath, "{}.yml".format(APP_NAME))
+            if not os.path.exists(meta_filepath) or \
+                    pkg_info.meta.load_from_file(meta_filepath) is False:
+                logging.warning("failed load meta file: {}".format(
+                    meta_filepath))
+                continue
+            cursor.execute(
+                sqlstr, self._serialize_meta(pkg_info) + (dirpath, hash_val))
 
-        if len(cond_list) > 0:
-            cond_str = " AND ".join(cond_list)
-            sqlstr = self.qry_sqlstr + " WHERE {}".format(cond_str)
-        else:
-            sqlstr = self.qry_sqlstr
+    def query(self, conn, qry: PackageInfo) -> typing.List[PackageInfo]:
+        """
+        query package infos, empty fields of qry are ignored, package with
+        empty platform or build type field matches any value of it
+        """
+        sqlstr, params = self.gen_query_sqlstr(qry)
 
         infos = []
         cursor = conn.cursor()
-        cursor.execute(sqlstr)
+        cursor.execute(sqlstr, params)
         for row in cursor:
             info = self._deserialize(row)
-            info_dict = info.meta.get_ordered_dict()
-            qry_dict = qry.meta.get_ordered_dict()
-            if Utils.compare_db_cond(info_dict, qry_dict) is False:
-                logging.info("ignore: {}".format(json.dumps(info.path)))
-                continue
             info.repo_type = "local"
             infos.append(info)
 
@@ -83,6 +168,44 @@ class MapperPkg:
 
         return infos
 
+    def gen_query_sqlstr(self, qry: PackageInfo):
+        """
+        generate sql and parameters of query
+        """
+        src_info = qry.meta.source_info
+        platform = qry.meta.platform
+        build_info = qry.meta.build_info
+
+        cond_list = []
+        params = []
+        for column, val in [
+                ("dirpath", qry.path),
+                ("maintainer", src_info.maintainer),
+                ("name", src_info.name),
+                ("tag", src_info.tag)]:
+            if len(val) != 0:
+                cond_list.append("{}=?".format(column))
+                params.append(val)
+        for column, val in [
+                ("sys", platform.system.lower()),
+                ("machine_arch", platform.machine),
+                ("distr_id", platform.distr_id),
+                ("distr_ver", platform.distr_ver)]:
+            if len(val) != 0:
+                cond_list.append("({0}=? OR {0}='')".format(column))
+                params.append(val)
+        if len(build_info.build_type) != 0:
+            cond_list.append(
+                "(build_type=? COLLATE NOCASE OR build_type='')")
+            params.append(build_info.build_type)
+
+        if len(cond_list) > 0:
+            cond_str = " AND ".join(cond_list)
+            sqlstr = self.qry_sqlstr + " WHERE {}".format(cond_str)
+        else:
+            sqlstr = self.qry_sqlstr
+        return sqlstr, tuple(params)
+
     def _compare_tag(self, x, y):
         """
         sort tag key
@@ -105,16 +228,11 @@ class MapperPkg:
         query versions
         """
         src_info = qry.meta.source_info
-        sqlstr = \
-            "SELECT tag from {} " \
-            "WHERE maintainer='{}' AND name='{}' " \
-            "GROUP BY tag".format(
-                self.table_name, src_info.maintainer, src_info.name
-            )
 
         tags = []
         cursor = conn.cursor()
-        cursor.execute(sqlstr)
+        cursor.execute(
+            self.qry_tags_sqlstr, (src_info.maintainer, src_info.name))
         for row in cursor:
             tags.append(row[0])
         tags.sort(key=functools.cmp_to_key(self._compare_tag), reverse=True)
@@ -126,16 +244,11 @@ class MapperPkg:
         query maintainer's repositories
         """
         src_info = qry.meta.source_info
-        sqlstr = \
-            "SELECT name from {} " \
-            "WHERE maintainer='{}' " \
-            "GROUP BY name".format(
-                self.table_name, src_info.maintainer
-            )
 
         repos = []
         cursor = conn.cursor()
-        cursor.execute(sqlstr)
+        cursor.execute(
+            self.qry_maintainer_repos_sqlstr, (src_info.maintainer,))
         for row in cursor:
             repos.append(row[0])
         return repos
@@ -146,16 +259,10 @@ class MapperPkg:
         query maintainer's repositories
         """
         src_info = qry.meta.source_info
-        sqlstr = \
-            "SELECT maintainer from {} " \
-            "WHERE name='{}' " \
-            "GROUP BY maintainer".format(
-                self.table_name, src_info.name
-            )
 
         maintainers = []
         cursor = conn.cursor()
-        cursor.execute(sqlstr)
+        cursor.execute(self.qry_repos_sqlstr, (src_info.name,))
         for row in cursor:
             maintainers.append(row[0])
         return maintainers
@@ -164,16 +271,7 @@ class MapperPkg:
         """
         insert
         """
-        sqlstr = \
-            "INSERT INTO {} (" \
-            "dirpath, maintainer, name, tag, " \
-            "hash_val, update_ts" \
-            ") " \
-            "VALUES (" \
-            "?, ?, ?, ?, " \
-            "?, ?" \
-            ")" \
-            "".format(self.table_name)
+        sqlstr = self.insert_sqlstr
 
         rows = []
         for pkg_info in pkg_infos:
@@ -203,15 +301,11 @@ class MapperPkg:
         """
         remove row by dirpath
         """
-        sqlstr = \
-            "DELETE FROM {} WHERE dirpath='{}'" \
-            "".format(self.table_name, dirpath)
-
         cursor = conn.cursor()
-        cursor.execute(sqlstr)
+        cursor.execute(self.remove_by_dirpath_sqlstr, (dirpath,))
 
         logging.info("exec: {}, affect row count: {}".format(
-            sqlstr, cursor.rowcount))
+            self.remove_by_dirpath_sqlstr, cursor.rowcount))
         conn.commit()
 
     def _deserialize(self, row):
@@ -238,6 +332,11 @@ class MapperPkg:
         idx += 1
         info.ts = row[idx]
 
+        # meta
+        idx += 1
+        if len(row[idx]) > 0:
+            info.meta.load(json.loads(row[idx]))
+
         return info
 
     def _serialize(self, pkg_info: PackageInfo):
@@ -249,4 +348,23 @@ class MapperPkg:
         return (
             pkg_info.path, source.maintainer, source.name, tag,
             pkg_info.hash_val(), int(time.time())
+        ) + self._serialize_meta(pkg_info)
+
+    def _serialize_meta(self, pkg_info: PackageInfo):
+        """
+        serialize values of meta columns
+        """
+        meta = pkg_info.meta
+        platform = meta.platform
+        build_info = meta.build_info
+        compiler_info = build_info.compiler_info
+        link_info = build_info.link_info
+        return (
+            platform.system.lower(), platform.release, platform.version,
+            platform.machine, platform.distr_id, platform.distr_ver,
+            build_info.build_type, 1 if build_info.fat_pkg else 0,
+            compiler_info.compiler_c, compiler_info.compiler_c_ver,
+            compiler_info.compiler_cpp, compiler_info.compiler_cpp_ver,
+            link_info.libc, link_info.libc_ver,
+            json.dumps(meta.get_ordered_dict()),
         )
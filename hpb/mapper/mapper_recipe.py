@@ -0,0 +1,74 @@
+import logging
+import time
+import typing
+
+
+class MapperRecipe:
+    """
+    recipe mapper, record which package was built from recipe hash
+    """
+
+    def __init__(self):
+        self.table_name = "recipe"
+
+    def create_table(self, conn):
+        """
+        create table
+        """
+        cursor = conn.cursor()
+        sqlstr = "CREATE TABLE IF NOT EXISTS {} (" \
+            "recipe_hash TEXT NOT NULL," \
+            "dirpath TEXT NOT NULL," \
+            "update_ts INT NOT NULL, " \
+            "PRIMARY KEY(recipe_hash, dirpath) " \
+            ")".format(self.table_name)
+        cursor.execute(sqlstr)
+
+        sqlstr = "CREATE INDEX IF NOT EXISTS idx_recipe_path " \
+            "ON {} (dirpath)".format(self.table_name)
+        cursor.execute(sqlstr)
+        conn.commit()
+
+    def query(self, conn, recipe_hash) -> typing.List[str]:
+        """
+        query package directories built from recipe hash, newest first
+        """
+        sqlstr = \
+            "SELECT dirpath from {} " \
+            "WHERE recipe_hash=? " \
+            "ORDER BY update_ts DESC".format(self.table_name)
+
+        dirpaths = []
+        cursor = conn.cursor()
+        cursor.execute(sqlstr, (recipe_hash,))
+        for row in cursor:
+            dirpaths.append(row[0])
+        return dirpaths
+
+    def insert(self, conn, recipe_hash, dirpath):
+        """
+        insert or update recipe hash of package directory
+        """
+        sqlstr = \
+            "INSERT OR REPLACE INTO {} (" \
+            "recipe_hash, dirpath, update_ts" \
+            ") " \
+            "VALUES (?, ?, ?)".format(self.table_name)
+
+        cursor = conn.cursor()
+        cursor.execute(sqlstr, (recipe_hash, dirpath, int(time.time())))
+        logging.info("insert recipe: {} -> {}".format(recipe_hash, dirpath))
+        conn.commit()
+
+    def remove_by_dirpath(self, conn, dirpath):
+        """
+        remove row by dirpath
+        """
+        sqlstr = "DELETE FROM {} WHERE dirpath=?".format(self.table_name)
+
+        cursor = conn.cursor()
+        cursor.execute(sqlstr, (dirpath,))
+
+        logging.info("exec: {}, affect row count: {}".format(
+            sqlstr, cursor.rowcount))
+        conn.commit()
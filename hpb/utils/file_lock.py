@@ -0,0 +1,78 @@
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    inter-process lock on file, shared lock only be supported in posix,
+    in other platforms shared lock is the same as exclusive lock
+    """
+
+    def __init__(self, filepath, shared=False):
+        """
+        init file lock
+        :param filepath: lock file path, created if not exists
+        :param shared: acquire shared lock instead of exclusive lock
+        """
+        self.filepath = filepath
+        self.shared = shared
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        """
+        acquire lock
+        :param blocking: wait until lock acquired, otherwise return False
+            immediately when lock is held by others
+        """
+        if self._fd is not None:
+            return True
+        dirpath = os.path.dirname(self.filepath)
+        if len(dirpath) > 0:
+            os.makedirs(dirpath, exist_ok=True)
+        fd = os.open(self.filepath, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                flags = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+                if not blocking:
+                    flags |= fcntl.LOCK_NB
+                fcntl.flock(fd, flags)
+            else:
+                mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+                msvcrt.locking(fd, mode, 1)
+        except OSError as e:
+            os.close(fd)
+            if not blocking:
+                return False
+            logging.error("failed lock {}: {}".format(self.filepath, e))
+            raise
+        self._fd = fd
+        return True
+
+    def release(self):
+        """
+        release lock
+        """
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,502 @@
+import mmap
+import os
+import re
+import struct
+import zlib
+
+
+class GitDirUnsupported(Exception):
+    """
+    git directory layout not supported by GitDirReader, caller should
+    fallback to git command
+    """
+    pass
+
+
+class GitDirReader:
+    """
+    read HEAD, refs and objects from .git directory directly, get the same
+    results as commands below without spawning git processes
+        git describe --tags --exact-match
+        git rev-parse --short HEAD
+        git symbolic-ref -q --short HEAD
+    unusual layouts, e.g. alternates, reftable, multi-pack-index, sha256
+    object format and abbrev config, raise GitDirUnsupported
+    """
+
+    # environment variables change how git find repository or config
+    UNSUPPORTED_ENVS = (
+        "GIT_DIR", "GIT_WORK_TREE", "GIT_COMMON_DIR", "GIT_OBJECT_DIRECTORY",
+        "GIT_ALTERNATE_OBJECT_DIRECTORIES", "GIT_CEILING_DIRECTORIES",
+        "GIT_DISCOVERY_ACROSS_FILESYSTEM", "GIT_NAMESPACE",
+        "GIT_REPLACE_REF_BASE", "GIT_NO_REPLACE_OBJECTS",
+    )
+
+    OBJ_TYPES = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+
+    SHA_RE = re.compile(r'^[0-9a-f]{40}$')
+
+    def __init__(self, dirpath):
+        """
+        init git directory reader
+        :param dirpath: directory in git worktree
+        """
+        self.dirpath = os.path.abspath(dirpath)
+        self.git_dir = ""  # git directory of worktree
+        self.common_dir = ""  # git directory shared by all worktrees
+        self.objects_dir = ""
+
+        self._packed_refs = None
+        self._packs = None
+
+    def read(self):
+        """
+        read (tag, short commit id, branch), all empty if dirpath not in git
+        worktree
+        """
+        for k in os.environ.keys():
+            if k in self.UNSUPPORTED_ENVS or k.startswith("GIT_CONFIG"):
+                raise GitDirUnsupported("environment {}".format(k))
+
+        if self._find_git_dir() is False:
+            return "", "", ""
+        self._check_config()
+        self._check_layout()
+
+        try:
+            head_ref, head_sha = self._read_head()
+            branch = self._short_branch(head_ref) if head_ref else ""
+            if len(head_sha) == 0:
+                return "", "", branch
+            commit_id = head_sha[:self._abbrev_len(head_sha)]
+            tag = self._exact_tag(head_sha)
+        finally:
+            self._close_packs()
+        return tag, commit_id, branch
+
+    def _find_git_dir(self):
+        """
+        find git directory from dirpath up to root
+        """
+        cur_dir = self.dirpath
+        dev = os.stat(cur_dir).st_dev
+        while True:
+            dotgit = os.path.join(cur_dir, ".git")
+            if os.path.isfile(dotgit):
+                with open(dotgit, "r", encoding="utf-8") as f:
+                    content = f.read().strip()
+                if not content.startswith("gitdir:"):
+                    raise GitDirUnsupported("invalid .git file")
+                git_dir = content[len("gitdir:"):].strip()
+                self.git_dir = os.path.normpath(os.path.join(cur_dir, git_dir))
+                break
+            if os.path.isdir(dotgit):
+                self.git_dir = dotgit
+                break
+            if os.path.isfile(os.path.join(cur_dir, "HEAD")) and \
+                    os.path.isdir(os.path.join(cur_dir, "objects")):
+                raise GitDirUnsupported("bare repository")
+
+            parent_dir = os.path.dirname(cur_dir)
+            if parent_dir == cur_dir:
+                return False
+            if os.stat(parent_dir).st_dev != dev:
+                raise GitDirUnsupported("cross filesystem")
+            cur_dir = parent_dir
+
+        # git refuse repository owned by other users unless safe.directory
+        if hasattr(os, "geteuid"):
+            for path in (cur_dir, self.git_dir):
+                if os.stat(path).st_uid != os.geteuid():
+                    raise GitDirUnsupported("owned by other user: {}".format(
+                        path))
+
+        self.common_dir = self.git_dir
+        commondir_path = os.path.join(self.git_dir, "commondir")
+        if os.path.isfile(commondir_path):
+            with open(commondir_path, "r", encoding="utf-8") as f:
+                self.common_dir = os.path.normpath(os.path.join(
+                    self.git_dir, f.read().strip()))
+        self.objects_dir = os.path.join(self.common_dir, "objects")
+        return True
+
+    def _check_config(self):
+        """
+        check config files not change abbrev length, object format or ref
+        storage, and not include other config files
+        """
+        home = os.path.expanduser("~")
+        xdg_config_home = os.environ.get(
+            "XDG_CONFIG_HOME", os.path.join(home, ".config"))
+        filepaths = [
+            "/etc/gitconfig",
+            os.path.join(xdg_config_home, "git", "config"),
+            os.path.join(home, ".gitconfig"),
+            os.path.join(self.common_dir, "config"),
+            os.path.join(self.git_dir, "config.worktree"),
+        ]
+        for filepath in filepaths:
+            if not os.path.isfile(filepath):
+                continue
+            with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
+                content = f.read().lower()
+            for keyword in ("abbrev", "[extensions", "[include"):
+                if keyword in content:
+                    raise GitDirUnsupported("{} in {}".format(
+                        keyword, filepath))
+
+    def _check_layout(self):
+        """
+        check refs and objects stored in supported layout
+        """
+        if os.path.exists(os.path.join(self.common_dir, "reftable")):
+            raise GitDirUnsupported("reftable")
+        if os.path.exists(os.path.join(self.common_dir, "refs", "replace")):
+            raise GitDirUnsupported("replace refs")
+        if os.path.exists(os.path.join(
+                self.objects_dir, "info", "alternates")):
+            raise GitDirUnsupported("alternates")
+        if os.path.exists(os.path.join(
+                self.objects_dir, "pack", "multi-pack-index")):
+            raise GitDirUnsupported("multi-pack-index")
+
+    def _read_head(self):
+        """
+        read HEAD, return (ref name, commit sha), ref name is empty if HEAD
+        detached, commit sha is empty if branch not born yet
+        """
+        with open(os.path.join(self.git_dir, "HEAD"), "r",
+                  encoding="utf-8") as f:
+            content = f.read().strip()
+        if content.startswith("ref:"):
+            ref = content[len("ref:"):].strip()
+            sha = self._resolve_ref(ref)
+            return ref, "" if sha is None else sha
+        if self.SHA_RE.match(content):
+            return "", content
+        raise GitDirUnsupported("invalid HEAD")
+
+    def _resolve_ref(self, ref):
+        """
+        get sha of ref, None if ref not exists
+        :param ref: full ref name
+        """
+        # per worktree refs are stored in git dir, others in common dir
+        for base_dir in (self.git_dir, self.common_dir):
+            filepath = os.path.join(base_dir, *ref.split("/"))
+            if os.path.isfile(filepath):
+                with open(filepath, "r", encoding="utf-8") as f:
+                    content = f.read().strip()
+                if not self.SHA_RE.match(content):
+                    raise GitDirUnsupported("unsupported ref: {}".format(ref))
+                return content
+        entry = self._load_packed_refs().get(ref, None)
+        return None if entry is None else entry[0]
+
+    def _short_branch(self, ref):
+        """
+        shorten ref like `git symbolic-ref --short`
+        :param ref: full ref name
+        """
+        prefix = "refs/heads/"
+        if not ref.startswith(prefix):
+            raise GitDirUnsupported("HEAD point to {}".format(ref))
+        name = ref[len(prefix):]
+
+        # git use longer name if short name is ambiguous
+        for other in (name, "refs/" + name, "refs/tags/" + name):
+            if self._resolve_ref(other) is not None:
+                raise GitDirUnsupported("ambiguous branch {}".format(name))
+        return name
+
+    def _load_packed_refs(self):
+        """
+        load packed-refs, return ref name -> (sha, peeled sha or None), peeled
+        sha be empty if the ref is known not a tag object
+        """
+        if self._packed_refs is not None:
+            return self._packed_refs
+
+        self._packed_refs = {}
+        filepath = os.path.join(self.common_dir, "packed-refs")
+        if not os.path.isfile(filepath):
+            return self._packed_refs
+
+        fully_peeled = False
+        last_ref = None
+        with open(filepath, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line.startswith("#"):
+                    traits = line.split(":", 1)[-1].split()
+                    fully_peeled = "fully-peeled" in traits
+                    continue
+                if line.startswith("^"):
+                    if last_ref is None:
+                        raise GitDirUnsupported("invalid packed-refs")
+                    sha, _ = self._packed_refs[last_ref]
+                    self._packed_refs[last_ref] = (sha, line[1:])
+                    continue
+                kv = line.split(" ", 1)
+                if len(kv) != 2 or not self.SHA_RE.match(kv[0]):
+                    raise GitDirUnsupported("invalid packed-refs")
+                last_ref = kv[1]
+                peeled = "" if fully_peeled else None
+                self._packed_refs[last_ref] = (kv[0], peeled)
+        return self._packed_refs
+
+    def _list_tags(self):
+        """
+        list tags in ref name order, return list of (ref name, sha, peeled
+        sha or None)
+        """
+        tags = {}
+        for ref, (sha, peeled) in self._load_packed_refs().items():
+            if ref.startswith("refs/tags/"):
+                tags[ref] = (sha, peeled)
+
+        tags_dir = os.path.join(self.common_dir, "refs", "tags")
+        for root, _, filenames in os.walk(tags_dir):
+            for filename in filenames:
+                if filename.endswith(".lock"):
+                    continue
+                filepath = os.path.join(root, filename)
+                ref = os.path.relpath(filepath, self.common_dir).replace(
+                    os.sep, "/")
+                with open(filepath, "r", encoding="utf-8") as f:
+                    content = f.read().strip()
+                if not self.SHA_RE.match(content):
+                    raise GitDirUnsupported("unsupported ref: {}".format(ref))
+                tags[ref] = (content, None)
+
+        return [(ref, tags[ref][0], tags[ref][1])
+                for ref in sorted(tags.keys(), key=lambda k: k.encode())]
+
+    def _exact_tag(self, head_sha):
+        """
+        get tag point to HEAD like `git describe --tags --exact-match`,
+        annotated tag is preferred, then the newest one
+        :param head_sha: sha of HEAD commit
+        """
+        best = None  # (ref name, annotated, tag object)
+        for ref, sha, peeled in self._list_tags():
+            if sha == head_sha:
+                if best is None:
+                    best = (ref, False, None)
+                continue
+            if peeled is None:
+                peeled, tag_obj = self._peel(sha)
+            elif len(peeled) == 0 or peeled != head_sha:
+                continue
+            else:
+                tag_obj = None
+            if peeled != head_sha:
+                continue
+
+            if tag_obj is None:
+                tag_obj = self._read_tag(sha)
+            if best is None or best[1] is False or \
+                    best[2]["date"] < tag_obj["date"]:
+                best = (ref, True, tag_obj)
+
+        if best is None:
+            return ""
+        name = best[0][len("refs/tags/"):]
+        if best[1] and best[2]["tag"] != name:
+            # git describe output name in tag object with suffix here
+            raise GitDirUnsupported("tag {} is known as {}".format(
+                name, best[2]["tag"]))
+        return name
+
+    def _peel(self, sha):
+        """
+        peel object to non tag object, return (peeled sha, tag object or
+        None)
+        :param sha: object sha
+        """
+        obj_type, _ = self._read_object(sha, header_only=True)
+        if obj_type != "tag":
+            return sha, None
+        tag_obj = self._read_tag(sha)
+        cur_obj = tag_obj
+        while cur_obj["type"] == "tag":
+            cur_obj = self._read_tag(cur_obj["object"])
+        return cur_obj["object"], tag_obj
+
+    def _read_tag(self, sha):
+        """
+        read and parse tag object
+        :param sha: tag object sha
+        """
+        obj_type, data = self._read_object(sha)
+        if obj_type != "tag":
+            raise GitDirUnsupported("{} is not tag".format(sha))
+        tag_obj = {"object": "", "type": "", "tag": "", "date": 0}
+        for line in data.split(b"\n"):
+            if len(line) == 0:
+                break
+            kv = line.decode("utf-8", errors="replace").split(" ", 1)
+            if len(kv) != 2:
+                continue
+            if kv[0] in ("object", "type", "tag"):
+                tag_obj[kv[0]] = kv[1]
+            elif kv[0] == "tagger":
+                m = re.search(r'> (\d+) [+-]\d+$', kv[1])
+                if m is not None:
+                    tag_obj["date"] = int(m.group(1))
+        return tag_obj
+
+    def _read_object(self, sha, header_only=False):
+        """
+        read object from loose object or pack, return (type, data)
+        :param sha: object sha
+        :param header_only: only type is needed
+        """
+        filepath = os.path.join(self.objects_dir, sha[:2], sha[2:])
+        if os.path.isfile(filepath):
+            with open(filepath, "rb") as f:
+                raw = f.read()
+            d = zlib.decompressobj()
+            data = d.decompress(raw, 64) if header_only else d.decompress(raw)
+            pos = data.find(b"\0")
+            if pos < 0:
+                raise GitDirUnsupported("invalid object {}".format(sha))
+            obj_type = data[:pos].split(b" ")[0].decode("utf-8")
+            return obj_type, data[pos+1:]
+
+        sha_bytes = bytes.fromhex(sha)
+        for pack in self._load_packs():
+            idx, found = self._search_pack(pack, sha_bytes)
+            if found:
+                return self._read_pack_object(pack, idx, header_only)
+        raise GitDirUnsupported("object {} not found".format(sha))
+
+    def _load_packs(self):
+        """
+        load pack indexes, return list of (pack path, idx mmap, count)
+        """
+        if self._packs is not None:
+            return self._packs
+
+        self._packs = []
+        pack_dir = os.path.join(self.objects_dir, "pack")
+        if not os.path.isdir(pack_dir):
+            return self._packs
+        for filename in sorted(os.listdir(pack_dir)):
+            if not filename.endswith(".idx"):
+                continue
+            pack_path = os.path.join(pack_dir, filename[:-4] + ".pack")
+            if not os.path.isfile(pack_path):
+                continue
+            with open(os.path.join(pack_dir, filename), "rb") as f:
+                idx_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if idx_map[:8] != b"\xfftOc\x00\x00\x00\x02":
+                idx_map.close()
+                raise GitDirUnsupported("unsupported pack index")
+            count = struct.unpack(">I", idx_map[8+255*4:8+256*4])[0]
+            self._packs.append((pack_path, idx_map, count))
+        return self._packs
+
+    def _close_packs(self):
+        """
+        close pack indexes
+        """
+        for _, idx_map, _ in self._packs or []:
+            idx_map.close()
+        self._packs = None
+
+    @staticmethod
+    def _pack_sha(pack, i):
+        """
+        get the i-th sha in pack index
+        """
+        offset = 8 + 256 * 4 + 20 * i
+        return pack[1][offset:offset+20]
+
+    def _search_pack(self, pack, sha_bytes):
+        """
+        binary search sha in pack index, return (position, found)
+        """
+        _, idx_map, _ = pack
+        first_byte = sha_bytes[0]
+        lo = 0
+        if first_byte > 0:
+            offset = 8 + (first_byte - 1) * 4
+            lo = struct.unpack(">I", idx_map[offset:offset+4])[0]
+        offset = 8 + first_byte * 4
+        hi = struct.unpack(">I", idx_map[offset:offset+4])[0]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            v = self._pack_sha(pack, mid)
+            if v == sha_bytes:
+                return mid, True
+            if v < sha_bytes:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo, False
+
+    def _read_pack_object(self, pack, i, header_only):
+        """
+        read the i-th object in pack, deltified object is not supported
+        """
+        pack_path, idx_map, count = pack
+        offset_pos = 8 + 256 * 4 + 24 * count + 4 * i
+        offset = struct.unpack(">I", idx_map[offset_pos:offset_pos+4])[0]
+        if offset & 0x80000000:
+            large_pos = 8 + 256 * 4 + 28 * count + 8 * (offset & 0x7fffffff)
+            offset = struct.unpack(">Q", idx_map[large_pos:large_pos+8])[0]
+
+        with open(pack_path, "rb") as f:
+            f.seek(offset)
+            c = f.read(1)[0]
+            type_num = (c >> 4) & 7
+            size = c & 15
+            shift = 4
+            while c & 0x80:
+                c = f.read(1)[0]
+                size |= (c & 0x7f) << shift
+                shift += 7
+            if type_num not in self.OBJ_TYPES:
+                raise GitDirUnsupported("deltified object in pack")
+            if header_only:
+                return self.OBJ_TYPES[type_num], b""
+
+            d = zlib.decompressobj()
+            data = b""
+            while len(data) < size and not d.eof:
+                chunk = f.read(4096)
+                if len(chunk) == 0:
+                    break
+                data += d.decompress(chunk)
+        return self.OBJ_TYPES[type_num], data
+
+    def _abbrev_len(self, sha):
+        """
+        get length of unique abbreviated sha like `git rev-parse --short`
+        :param sha: object sha
+        """
+        # default length scale with approximate number of packed objects
+        count = sum([pack[2] for pack in self._load_packs()])
+        bits = max(count.bit_length() - 1, 0) + 1
+        length = max((bits + 1) // 2, 7)
+
+        def extend(other):
+            i = 0
+            while i < len(sha) and sha[i] == other[i]:
+                i += 1
+            return i + 1 if i < len(sha) else 0
+
+        sha_bytes = bytes.fromhex(sha)
+        for pack in self._packs:
+            pos, found = self._search_pack(pack, sha_bytes)
+            for i in (pos - 1, pos + 1 if found else pos):
+                if 0 <= i < pack[2]:
+                    length = max(length, extend(self._pack_sha(pack, i).hex()))
+
+        loose_dir = os.path.join(self.objects_dir, sha[:2])
+        if os.path.isdir(loose_dir):
+            for filename in os.listdir(loose_dir):
+                if len(filename) == 38:
+                    length = max(length, extend(sha[:2] + filename))
+        return min(length, len(sha))
@@ -0,0 +1,42 @@
+import threading
+
+
+class MemoHandle:
+    """
+    thread safe memo, value of each key only be computed once, used to share
+    probe and search results between builds in the same process
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._values = {}
+
+    def get(self, key, func):
+        """
+        get value of key, compute it by func if not exists, concurrent
+        callers of the same key wait for the first one
+        :param key: hashable key
+        :param func: compute value
+        """
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    return self._values[key]
+            value = func()
+            with self._lock:
+                self._values[key] = value
+            return value
+
+    def pop(self, key):
+        """
+        remove key, next get will compute it again
+        :param key: hashable key
+        """
+        with self._lock:
+            self._values.pop(key, None)
@@ -0,0 +1,111 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # windows
+    resource = None
+
+
+class TraceHandle:
+    """
+    record begin/end of build phases, and dump them as chrome trace
+    (chrome://tracing or https://ui.perfetto.dev)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._tid_dict = {}
+        self._pid = os.getpid()
+        self._begin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name, cat):
+        """
+        record a span, caller can add extra args into yielded dict
+        e.g.
+            with trace.span("prepare_deps", "prepare") as args:
+                args["ok"] = self.prepare_deps()
+        :param name: span name
+        :param cat: span category
+        """
+        args = {}
+        usage = self._get_usage()
+        ts = time.perf_counter()
+        try:
+            yield args
+        finally:
+            dur = time.perf_counter() - ts
+            end_usage = self._get_usage()
+            if usage is not None and end_usage is not None:
+                args["cpu_self"] = round(end_usage[0] - usage[0], 6)
+                args["cpu_children"] = round(end_usage[1] - usage[1], 6)
+            self.add_event(name, cat, ts, dur, args)
+
+    def add_event(self, name, cat, ts, dur, args):
+        """
+        add complete event
+        :param name: event name
+        :param cat: event category
+        :param ts: begin timestamp, value of time.perf_counter()
+        :param dur: duration in seconds
+        :param args: event args
+        """
+        with self._lock:
+            ident = threading.get_ident()
+            if ident not in self._tid_dict:
+                self._tid_dict[ident] = len(self._tid_dict)
+            self._events.append({
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": round((ts - self._begin) * 1000000),
+                "dur": round(dur * 1000000),
+                "pid": self._pid,
+                "tid": self._tid_dict[ident],
+                "args": args,
+            })
+
+    @property
+    def events(self):
+        """
+        get recorded events
+        """
+        with self._lock:
+            return list(self._events)
+
+    def dump(self, filepath):
+        """
+        dump events into file as chrome trace json
+        :param filepath: output file path
+        """
+        dirname = os.path.dirname(filepath)
+        if len(dirname) > 0 and not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        obj = {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+        }
+        with open(filepath, "w") as f:
+            json.dump(obj, f, indent=2)
+
+    def _get_usage(self):
+        """
+        get (cpu time of self, cpu time of children)
+        NOTE: resource usage is process wide, when jobs run concurrently,
+        cpu time of a span contains sibling's usage, usage of single command
+        is recorded by command handle
+        """
+        if resource is None:
+            return None
+        usage_self = resource.getrusage(resource.RUSAGE_SELF)
+        usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return (
+            usage_self.ru_utime + usage_self.ru_stime,
+            usage_children.ru_utime + usage_children.ru_stime,
+        )
@@ -48,31 +48,23 @@ class Utils:
         return False
 
     @classmethod
-    def compare_db_cond(cls, obj1, obj_cond):
+    def parse_size(cls, val):
         """
-        compare db condition
+        parse size with optional unit K/M/G/T into bytes, e.g. 512M, 20G,
+        return None if invalid
         """
-        for k in obj1.keys():
-            if k not in obj_cond:
-                return False
-            v1 = obj1[k]
-            v2 = obj_cond[k]
-            if isinstance(v2, type(v1)) is False:
-                breakpoint()
-                return False
-            if type(v2) is str and len(v2) == 0:
-                continue
-            if type(v2) is int and v2 == 0:
-                continue
-            if type(v2) is bool and v2 is False:
-                continue
-
-            if type(v1) is str or \
-                    type(v1) is int or \
-                    type(v1) is bool:
-                if v1 != v2:
-                    breakpoint()
-                    return False
-            elif type(v1) is dict:
-                return cls.compare_db_cond(v1, v2)
-        return True
+        val = val.strip().upper()
+        if val.endswith("B"):
+            val = val[:-1]
+        units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+        scale = 1
+        if len(val) > 0 and val[-1] in units:
+            scale = units[val[-1]]
+            val = val[:-1]
+        try:
+            size = float(val)
+        except ValueError:
+            return None
+        if size < 0:
+            return None
+        return int(size * scale)
@@ -0,0 +1,65 @@
+import io
+import logging
+import os
+import unittest
+
+from hpb.component.command_handle import CommandHandle
+from hpb.utils.utils import Utils
+
+
+class TestCommandHandle(unittest.TestCase):
+    def test_call(self):
+        outs, errs = CommandHandle().call(
+            "printf 'foo\\nbar\\nbaz'; echo err >&2")
+        self.assertEqual(outs, ["foo", "bar", "baz"])
+        self.assertEqual(errs, ["err"])
+
+    def test_call_large_output(self):
+        outs, errs = CommandHandle().call(
+            "python -c \"print('\\n'.join(str(i) for i in range(100000)))\"")
+        self.assertEqual(len(errs), 0)
+        self.assertEqual(len(outs), 100000)
+        self.assertEqual(outs[-1], "99999")
+
+    @unittest.skipIf(not hasattr(os, "wait4"), "wait4 not supported")
+    def test_usage(self):
+        handle = CommandHandle()
+        self.assertTrue(handle.exec(
+            "python -c \"b = bytearray(64 * 1024 * 1024)\""))
+        self.assertEqual(handle.returncode, 0)
+        self.assertGreaterEqual(handle.usage["max_rss_kb"], 64 * 1024)
+        self.assertGreater(handle.usage["cpu"], 0)
+
+        self.assertFalse(handle.exec("exit 3"))
+        self.assertEqual(handle.returncode, 3)
+        self.assertLess(handle.usage["max_rss_kb"], 64 * 1024)
+
+    def test_cd(self):
+        working_dir = Utils.expand_path(".")
+        handle = CommandHandle(cwd=working_dir)
+        self.assertTrue(handle.exec("cd etc"))
+        self.assertEqual(handle.cwd, os.path.join(working_dir, "etc"))
+        self.assertEqual(os.path.abspath(os.curdir), working_dir)
+        self.assertFalse(handle.exec("cd not_exists_dir"))
+
+    @unittest.skipIf(os.name != "posix", "raw output only support posix")
+    def test_raw_output(self):
+        stream = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        logger = logging.getLogger("command.test_raw_output")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = logging.StreamHandler(stream)
+        logger.addHandler(handler)
+
+        handle = CommandHandle(
+            logger_name="command.test_raw_output", raw_output=True)
+        self.assertTrue(handle.exec("printf 'foo\\nbar'"))
+
+        logger.removeHandler(handler)
+        stream.flush()
+        content = stream.buffer.getvalue().decode("utf-8")
+        self.assertTrue(content.endswith("foo\nbar\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
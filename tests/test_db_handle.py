@@ -0,0 +1,108 @@
+import os
+import shutil
+import sqlite3
+import threading
+import unittest
+
+from hpb.component.db_handle import DBHandle
+from hpb.utils.utils import Utils
+
+
+class TestDBHandle(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_db_handle")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        os.makedirs(self.working_dir, exist_ok=True)
+        self.db_path = os.path.join(self.working_dir, "hpb.db")
+        with DBHandle(self.db_path) as db_handle:
+            db_handle.conn.execute("CREATE TABLE foo (val INT)")
+            db_handle.conn.commit()
+
+    def tearDown(self):
+        DBHandle.close_all()
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def test_wal(self):
+        with DBHandle(self.db_path) as db_handle:
+            row = db_handle.conn.execute("PRAGMA journal_mode").fetchone()
+            self.assertEqual(row[0], "wal")
+
+    def test_reuse(self):
+        with DBHandle(self.db_path) as db_handle:
+            conn = db_handle.conn
+        with DBHandle(self.db_path) as db_handle:
+            self.assertIs(db_handle.conn, conn)
+
+        # connections are not shared between threads
+        conns = []
+
+        def get_conn():
+            with DBHandle(self.db_path) as db_handle:
+                conns.append(db_handle.conn)
+        t = threading.Thread(target=get_conn)
+        t.start()
+        t.join()
+        self.assertIsNot(conns[0], conn)
+
+    def test_readonly(self):
+        with DBHandle(self.db_path, readonly=True) as db_handle:
+            with self.assertRaises(sqlite3.OperationalError):
+                db_handle.conn.execute("INSERT INTO foo VALUES (1)")
+
+    def test_read_while_writing(self):
+        with DBHandle(self.db_path, isolation_level="EXCLUSIVE") as writer:
+            writer.conn.execute("INSERT INTO foo VALUES (1)")
+            self.assertTrue(writer.conn.in_transaction)
+
+            rows = []
+
+            def read():
+                with DBHandle(self.db_path, readonly=True) as reader:
+                    rows.extend(
+                        reader.conn.execute("SELECT val FROM foo").fetchall())
+            t = threading.Thread(target=read)
+            t.start()
+            t.join()
+            self.assertEqual(rows, [])
+            writer.conn.commit()
+
+        with DBHandle(self.db_path, readonly=True) as reader:
+            rows = reader.conn.execute("SELECT val FROM foo").fetchall()
+        self.assertEqual(rows, [(1,)])
+
+    def test_uncommitted_discarded(self):
+        with DBHandle(self.db_path) as db_handle:
+            db_handle.conn.execute("INSERT INTO foo VALUES (1)")
+        with DBHandle(self.db_path) as db_handle:
+            rows = db_handle.conn.execute("SELECT val FROM foo").fetchall()
+        self.assertEqual(rows, [])
+
+    def test_create_tables(self):
+        class FakeMapper:
+            def __init__(self):
+                self.count = 0
+
+            def create_table(self, conn):
+                self.count += 1
+                conn.execute("CREATE TABLE IF NOT EXISTS bar (val INT)")
+                conn.commit()
+
+        mapper = FakeMapper()
+        DBHandle.create_tables(self.db_path, [mapper])
+        DBHandle.create_tables(self.db_path, [mapper])
+        self.assertEqual(mapper.count, 1)
+        with DBHandle(self.db_path, readonly=True) as db_handle:
+            db_handle.conn.execute("SELECT * FROM bar").fetchall()
+
+        # db file removed, create again
+        DBHandle.close_all()
+        os.remove(self.db_path)
+        DBHandle.create_tables(self.db_path, [mapper])
+        self.assertEqual(mapper.count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
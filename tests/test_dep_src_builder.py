@@ -0,0 +1,99 @@
+import os
+import shlex
+import shutil
+import sys
+import unittest
+import unittest.mock
+
+from hpb.component.command_handle import CommandHandle
+from hpb.component.dep_src_builder import DepSrcBuilder
+from hpb.component.repo_deps_handle import DepItem
+from hpb.component.settings_handle import SettingsHandle
+from hpb.utils.utils import Utils
+
+
+class TestDepSrcBuilder(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_dep_src_builder")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        os.makedirs(self.working_dir, exist_ok=True)
+
+        with open(os.path.join(self.working_dir, "zlib.yml"), "w") as f:
+            f.write(
+                "name: zlib\n"
+                "variables:\n"
+                "  - zlib_tag: v1.2.13\n"
+                "source:\n"
+                "  maintainer: madler\n"
+                "  name: zlib\n"
+                "  tag: ${zlib_tag}\n")
+        with open(os.path.join(self.working_dir, "brotli.yml"), "w") as f:
+            f.write(
+                "name: brotli\n"
+                "source:\n"
+                "  maintainer: google\n"
+                "  name: brotli\n"
+                "  tag: v1.0.9\n")
+
+        self._recipe_paths = SettingsHandle().recipe_paths
+        SettingsHandle().recipe_paths = [self.working_dir]
+
+    def tearDown(self):
+        SettingsHandle().recipe_paths = self._recipe_paths
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def new_dep(self, maintainer, name, tag):
+        dep = DepItem()
+        dep.load({"maintainer": maintainer, "name": name, "tag": tag})
+        return dep
+
+    def test_find_recipe_tag_var(self):
+        builder = DepSrcBuilder(self.working_dir, "1")
+        recipe = builder.find_recipe(self.new_dep("madler", "zlib", "v1.3"))
+        self.assertIsNotNone(recipe)
+        self.assertEqual(
+            recipe.filepath, os.path.join(self.working_dir, "zlib.yml"))
+        self.assertEqual(recipe.params, ["zlib_tag=v1.3"])
+
+    def test_find_recipe_tag_literal(self):
+        builder = DepSrcBuilder(self.working_dir, "1")
+        recipe = builder.find_recipe(
+            self.new_dep("google", "brotli", "v1.0.9"))
+        self.assertIsNotNone(recipe)
+        self.assertEqual(recipe.params, [])
+
+        self.assertIsNone(builder.find_recipe(
+            self.new_dep("google", "brotli", "v1.1.0")))
+        self.assertIsNone(builder.find_recipe(
+            self.new_dep("madler", "brotli", "v1.0.9")))
+
+    @unittest.skipIf(os.name != "posix", "command quoted by shlex")
+    def test_build_frozen(self):
+        commands = []
+
+        def fake_exec(handle, command):
+            commands.append(command)
+            return True
+
+        # dependencies build by the same hpb command as workspace
+        builder = DepSrcBuilder(
+            os.path.join(self.working_dir, "deps_src"), "1")
+        hpb_path = "/opt/hpb/hpb"
+        with unittest.mock.patch.object(sys, "frozen", True, create=True), \
+                unittest.mock.patch.object(sys, "executable", hpb_path), \
+                unittest.mock.patch.object(
+                    CommandHandle, "exec", autospec=True,
+                    side_effect=fake_exec):
+            self.assertTrue(builder.build(
+                [self.new_dep("madler", "zlib", "v1.3")], lambda dep: False))
+        self.assertEqual(len(commands), 1)
+        args = shlex.split(commands[0])
+        self.assertEqual(args[:2], [hpb_path, "build"])
+        self.assertIn("zlib_tag=v1.3", args)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tarfile
+import unittest
+
+from hpb.command.downloader import Downloader, DownloaderConfig
+from hpb.utils.utils import Utils
+
+
+class TestDownloader(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_downloader")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+
+        output_dir = os.path.join(self.working_dir, "output")
+        os.makedirs(os.path.join(output_dir, "include"), exist_ok=True)
+        with open(os.path.join(output_dir, "include", "foo.h"), "w") as f:
+            f.write("foo")
+
+        self.pkg_dir = os.path.join(self.working_dir, "packages", "foo")
+        os.makedirs(self.pkg_dir, exist_ok=True)
+        with tarfile.open(
+                os.path.join(self.pkg_dir, "foo.tar.gz"), "w:gz") as tar:
+            tar.add(os.path.join(output_dir, "include"), arcname="include")
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def pull(self, dest, copy):
+        cfg = DownloaderConfig()
+        cfg.repo_type = "local"
+        cfg.path = self.pkg_dir
+        cfg.dest = dest
+        cfg.extract = True
+        cfg.copy = copy
+        self.assertTrue(Downloader().download(cfg))
+        self.assertEqual(os.listdir(dest), ["include"])
+        with open(os.path.join(dest, "include", "foo.h"), "r") as f:
+            self.assertEqual(f.read(), "foo")
+
+    def test_extract(self):
+        self.pull(os.path.join(self.working_dir, "copy"), copy=True)
+        self.pull(os.path.join(self.working_dir, "no_copy"), copy=False)
+
+    def test_no_copy_args(self):
+        downloader = Downloader()
+        cfg = downloader._parse_args(["-p", self.pkg_dir, "-x", "--no-copy"])
+        self.assertTrue(cfg.extract)
+        self.assertFalse(cfg.copy)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import shutil
+import subprocess
+import unittest
+
+from hpb.data_type.git_info import GitInfo
+from hpb.utils.git_dir_reader import GitDirReader
+from hpb.utils.utils import Utils
+
+
+@unittest.skipIf(shutil.which("git") is None, "git not found")
+class TestGitInfo(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_git_info")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        os.makedirs(self.working_dir, exist_ok=True)
+
+        self.git("init", "-q")
+        self.git("checkout", "-q", "-b", "main")
+        with open(os.path.join(self.working_dir, "foo.txt"), "w") as f:
+            f.write("foo")
+        self.git("add", "foo.txt")
+        self.git("commit", "-q", "-m", "init")
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def git(self, *args):
+        result = subprocess.run(
+            ["git", "-c", "user.name=hpb", "-c", "user.email=hpb@localhost"]
+            + list(args),
+            cwd=self.working_dir, check=True, stdout=subprocess.PIPE)
+        return result.stdout.decode("utf-8").strip()
+
+    def test_branch(self):
+        origin_dir = os.getcwd()
+        git_info = GitInfo()
+        git_info.get_git_info(self.working_dir)
+        self.assertEqual(os.getcwd(), origin_dir)
+
+        commit_id = self.git("rev-parse", "--short", "HEAD")
+        self.assertEqual(git_info.tag, "")
+        self.assertEqual(git_info.branch, "main")
+        self.assertEqual(git_info.commit_id, commit_id)
+        self.assertEqual(git_info.ref, "main_{}".format(commit_id))
+
+    def test_tag(self):
+        self.git("tag", "v1.0.0")
+        git_info = GitInfo()
+        git_info.get_git_info(self.working_dir)
+        self.assertEqual(git_info.tag, "v1.0.0")
+        self.assertEqual(git_info.ref, "v1.0.0")
+
+    def assert_same_as_command(self, dirpath):
+        tag, commit_id, branch = GitDirReader(dirpath).read()
+        git_info = GitInfo()
+        git_info._get_git_info_by_command(dirpath)
+        self.assertEqual(tag, git_info.tag)
+        self.assertEqual(commit_id, git_info.commit_id)
+        self.assertEqual(branch, git_info.branch)
+        return tag, commit_id, branch
+
+    def test_annotated_tag(self):
+        self.git("tag", "v1.0.0")
+        self.git("tag", "-a", "v1.0.1", "-m", "v1.0.1")
+        tag, _, _ = self.assert_same_as_command(self.working_dir)
+        self.assertEqual(tag, "v1.0.1")
+
+    def test_packed_refs(self):
+        self.git("tag", "-a", "v1.0.0", "-m", "v1.0.0")
+        self.git("gc", "-q")
+        self.assertFalse(os.path.exists(
+            os.path.join(self.working_dir, ".git", "refs", "tags", "v1.0.0")))
+        tag, _, branch = self.assert_same_as_command(self.working_dir)
+        self.assertEqual(tag, "v1.0.0")
+        self.assertEqual(branch, "main")
+
+        self.git("commit", "-q", "--allow-empty", "-m", "second")
+        tag, _, _ = self.assert_same_as_command(self.working_dir)
+        self.assertEqual(tag, "")
+
+    def test_detached(self):
+        self.git("tag", "v1.0.0")
+        self.git("commit", "-q", "--allow-empty", "-m", "second")
+        self.git("checkout", "-q", "v1.0.0")
+        tag, _, branch = self.assert_same_as_command(self.working_dir)
+        self.assertEqual(tag, "v1.0.0")
+        self.assertEqual(branch, "")
+
+    def test_fallback(self):
+        # branch name is ambiguous with tag, git command is used
+        self.git("tag", "main")
+        self.git("commit", "-q", "--allow-empty", "-m", "second")
+        git_info = GitInfo()
+        git_info.get_git_info(self.working_dir)
+        self.assertEqual(git_info.branch, "heads/main")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import threading
+import time
+import unittest
+
+from hpb.component.job_scheduler import JobScheduler
+
+
+class TestJobScheduler(unittest.TestCase):
+    def test_run_in_needs_order(self):
+        job_needs = {
+            "build": [],
+            "test": ["build"],
+            "docs": [],
+            "package": ["build", "test"],
+        }
+        lock = threading.Lock()
+        finished = []
+
+        def run_job(job_name):
+            with lock:
+                for dep_name in job_needs[job_name]:
+                    self.assertIn(dep_name, finished)
+            time.sleep(0.01)
+            with lock:
+                finished.append(job_name)
+            return True
+
+        scheduler = JobScheduler(max_workers=3)
+        ret = scheduler.run(job_needs, run_job, lambda job_name: None)
+        self.assertTrue(ret)
+        self.assertEqual(len(finished), 4)
+        self.assertEqual(finished[-1], "package")
+
+    def test_run_concurrently(self):
+        job_needs = {
+            "job0": [],
+            "job1": [],
+        }
+        barrier = threading.Barrier(2, timeout=5)
+
+        def run_job(job_name):
+            # both jobs must be in-flight at the same time
+            barrier.wait()
+            return True
+
+        scheduler = JobScheduler(max_workers=2)
+        ret = scheduler.run(job_needs, run_job, lambda job_name: None)
+        self.assertTrue(ret)
+
+    def test_fail_fast(self):
+        job_needs = {
+            "slow": [],
+            "fail": [],
+            "after_fail": ["fail"],
+        }
+        cancel_event = threading.Event()
+        started = []
+        cancelled = []
+
+        def run_job(job_name):
+            started.append(job_name)
+            if job_name == "fail":
+                return False
+            if job_name == "slow":
+                return not cancel_event.wait(timeout=5)
+            return True
+
+        def cancel_job(job_name):
+            cancelled.append(job_name)
+            cancel_event.set()
+
+        scheduler = JobScheduler(max_workers=2)
+        ret = scheduler.run(job_needs, run_job, cancel_job)
+        self.assertFalse(ret)
+        self.assertEqual(cancelled, ["slow"])
+        self.assertNotIn("after_fail", started)
+
+    def test_priority(self):
+        job_needs = {
+            "short": [],
+            "long": [],
+            "after_long": ["long"],
+        }
+        started = []
+
+        def run_job(job_name):
+            started.append(job_name)
+            return True
+
+        durations = {"short": 5, "long": 3, "after_long": 4}
+        priority = JobScheduler.critical_paths(job_needs, durations)
+        self.assertEqual(priority, {"short": 5, "long": 7, "after_long": 4})
+
+        scheduler = JobScheduler(max_workers=1, job_priority=priority)
+        ret = scheduler.run(job_needs, run_job, lambda job_name: None)
+        self.assertTrue(ret)
+        self.assertEqual(started, ["long", "short", "after_long"])
+
+    def test_predict(self):
+        job_needs = {
+            "a": [],
+            "b": [],
+            "c": [],
+            "d": ["a", "b"],
+        }
+        durations = {"a": 2, "b": 3, "c": 4, "d": 1}
+        priority = JobScheduler.critical_paths(job_needs, durations)
+
+        self.assertEqual(JobScheduler(max_workers=1).predict(
+            job_needs, durations), 10)
+        self.assertEqual(JobScheduler(
+            max_workers=2, job_priority=priority).predict(
+            job_needs, durations), 6)
+        self.assertEqual(JobScheduler(max_workers=4).predict(
+            job_needs, durations), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import sqlite3
+import unittest
+
+from hpb.mapper.mapper_build_history import MapperBuildHistory
+
+
+class TestMapperBuildHistory(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.conn = sqlite3.connect(":memory:")
+        self.mapper = MapperBuildHistory()
+        self.mapper.create_table(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        super().tearDown()
+
+    def test_query_durations(self):
+        self.mapper.insert(self.conn, "foo", "/foo.yml", "1", [
+            ("job", "build", 10.0, True),
+            ("job", "test", 4.0, True),
+            ("step", "build.0", 9.0, True),
+        ])
+        self.mapper.insert(self.conn, "foo", "/foo.yml", "2", [
+            ("job", "build", 20.0, True),
+            ("job", "test", 100.0, False),
+        ])
+        self.mapper.insert(self.conn, "foo", "/bar.yml", "3", [
+            ("job", "build", 1000.0, True),
+        ])
+
+        durations = self.mapper.query_durations(
+            self.conn, "foo", "/foo.yml", "job")
+        self.assertEqual(durations, {"build": 15.0, "test": 4.0})
+
+        durations = self.mapper.query_durations(
+            self.conn, "foo", "/foo.yml", "step")
+        self.assertEqual(durations, {"build.0": 9.0})
+
+    def test_query_latest_runs(self):
+        for i in range(10):
+            self.mapper.insert(self.conn, "foo", "/foo.yml", str(i), [
+                ("job", "build", float(i), True),
+            ])
+        durations = self.mapper.query_durations(
+            self.conn, "foo", "/foo.yml", "job", max_runs=2)
+        self.assertEqual(durations, {"build": 8.5})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import shutil
+import sqlite3
+import unittest
+
+from hpb.data_type.package_info import PackageInfo
+from hpb.mapper.mapper_pkg import MapperPkg
+from hpb.utils.utils import Utils
+
+
+class TestMapperPkg(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.conn = sqlite3.connect(":memory:")
+        self.mapper = MapperPkg()
+        self.mapper.create_table(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        super().tearDown()
+
+    def new_pkg_info(self, build_type, system, machine, distr_id=""):
+        pkg_info = PackageInfo()
+        pkg_info.path = "/pkgs/foo/v1.0.0/{}-{}-{}".format(
+            build_type, system, machine)
+        meta = pkg_info.meta
+        meta.source_info.maintainer = "hpb"
+        meta.source_info.name = "foo"
+        meta.source_info.tag = "v1.0.0"
+        meta.build_info.build_type = build_type
+        meta.build_info.compiler_info.compiler_c = "gcc"
+        meta.platform.system = system
+        meta.platform.machine = machine
+        meta.platform.distr_id = distr_id
+        meta.deps = [{"maintainer": "hpb", "name": "bar", "tag": "v1.0.0"}]
+        return pkg_info
+
+    def test_query_meta(self):
+        pkg_info = self.new_pkg_info("release", "linux", "x86_64", "ubuntu")
+        self.mapper.insert(self.conn, [pkg_info])
+
+        qry = PackageInfo()
+        qry.meta.source_info.name = "foo"
+        results = self.mapper.query(self.conn, qry)
+        self.assertEqual(len(results), 1)
+        result = results[0]
+        self.assertEqual(result.path, pkg_info.path)
+        self.assertEqual(result.meta.platform.distr_id, "ubuntu")
+        self.assertEqual(result.meta.build_info.compiler_info.compiler_c, "gcc")
+        self.assertEqual(result.meta.deps, pkg_info.meta.deps)
+        self.assertEqual(result.hash_val(), pkg_info.hash_val())
+
+    def test_query_filter(self):
+        self.mapper.insert(self.conn, [
+            self.new_pkg_info("release", "linux", "x86_64"),
+            self.new_pkg_info("debug", "linux", "x86_64"),
+            self.new_pkg_info("release", "linux", "aarch64"),
+            self.new_pkg_info("release", "windows", "x86_64"),
+            self.new_pkg_info("release", "", ""),
+        ])
+
+        qry = PackageInfo()
+        qry.meta.source_info.name = "foo"
+        qry.meta.build_info.build_type = "Release"
+        qry.meta.platform.system = "linux"
+        qry.meta.platform.machine = "x86_64"
+        results = self.mapper.query(self.conn, qry)
+        self.assertEqual(
+            sorted([result.path for result in results]), [
+                "/pkgs/foo/v1.0.0/release--",
+                "/pkgs/foo/v1.0.0/release-linux-x86_64",
+            ])
+
+    def query_plan(self, sqlstr, params):
+        cursor = self.conn.execute("EXPLAIN QUERY PLAN " + sqlstr, params)
+        return "\n".join([row[3] for row in cursor])
+
+    def test_query_plan(self):
+        qry = PackageInfo()
+        qry.meta.source_info.maintainer = "hpb"
+        qry.meta.source_info.name = "foo"
+        qry.meta.source_info.tag = "v1.0.0"
+        qry.meta.platform.system = "linux"
+        plan = self.query_plan(*self.mapper.gen_query_sqlstr(qry))
+        self.assertIn("(maintainer=? AND name=? AND tag=?)", plan)
+
+        qry = PackageInfo()
+        qry.path = "/pkgs/foo/v1.0.0/release-linux-x86_64"
+        plan = self.query_plan(*self.mapper.gen_query_sqlstr(qry))
+        self.assertIn("USING INDEX idx_path (dirpath=?)", plan)
+
+        plan = self.query_plan(self.mapper.qry_tags_sqlstr, ("hpb", "foo"))
+        self.assertIn("(maintainer=? AND name=?)", plan)
+        plan = self.query_plan(
+            self.mapper.qry_maintainer_repos_sqlstr, ("hpb",))
+        self.assertIn("(maintainer=?)", plan)
+        plan = self.query_plan(self.mapper.qry_repos_sqlstr, ("foo",))
+        self.assertIn("USING COVERING INDEX idx_name (name=?)", plan)
+        plan = self.query_plan(
+            self.mapper.remove_by_dirpath_sqlstr, ("/pkgs",))
+        self.assertIn("USING INDEX idx_path (dirpath=?)", plan)
+
+    def test_quote(self):
+        pkg_info = self.new_pkg_info("release", "linux", "x86_64")
+        pkg_info.path = "/pkgs/it's/foo"
+        pkg_info.meta.source_info.maintainer = "it's"
+        self.mapper.insert(self.conn, [pkg_info])
+
+        qry = PackageInfo()
+        qry.meta.source_info.maintainer = "it's"
+        self.assertEqual(
+            self.mapper.query_maintainer_repos(self.conn, qry), ["foo"])
+        qry.meta.source_info.name = "foo"
+        self.assertEqual(self.mapper.query_tags(self.conn, qry), ["v1.0.0"])
+        self.assertEqual(self.mapper.query_repos(self.conn, qry), ["it's"])
+
+        self.mapper.remove_by_dirpath(self.conn, pkg_info.path)
+        self.assertEqual(len(self.mapper.query(self.conn, qry)), 0)
+
+    def test_migrate(self):
+        working_dir = Utils.expand_path("./hpb/test_mapper_pkg")
+        if os.path.exists(working_dir):
+            shutil.rmtree(working_dir)
+        os.makedirs(working_dir, exist_ok=True)
+        try:
+            pkg_info = self.new_pkg_info("release", "linux", "x86_64")
+            pkg_info.path = working_dir
+            pkg_info.meta.dump(os.path.join(working_dir, "hpb.yml"))
+
+            # table created by old version
+            conn = sqlite3.connect(":memory:")
+            conn.execute(
+                "CREATE TABLE package ("
+                "dirpath TEXT NOT NULL, maintainer TEXT NOT NULL, "
+                "name TEXT NOT NULL, tag TEXT NOT NULL, "
+                "hash_val TEXT NOT NULL, update_ts INT NOT NULL, "
+                "PRIMARY KEY(maintainer, name, tag, hash_val))")
+            conn.execute(
+                "INSERT INTO package VALUES (?, ?, ?, ?, ?, ?)",
+                (working_dir, "hpb", "foo", "v1.0.0", pkg_info.hash_val(), 1))
+            conn.commit()
+
+            self.mapper.create_table(conn)
+            qry = PackageInfo()
+            qry.meta.platform.machine = "x86_64"
+            results = self.mapper.query(conn, qry)
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0].meta.build_info.build_type, "release")
+            self.assertEqual(results[0].hash_val(), pkg_info.hash_val())
+
+            qry.meta.platform.machine = "aarch64"
+            self.assertEqual(len(self.mapper.query(conn, qry)), 0)
+            conn.close()
+        finally:
+            shutil.rmtree(working_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import sqlite3
+import unittest
+
+from hpb.mapper.mapper_recipe import MapperRecipe
+
+
+class TestMapperRecipe(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.conn = sqlite3.connect(":memory:")
+        self.mapper = MapperRecipe()
+        self.mapper.create_table(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        super().tearDown()
+
+    def test_insert_query(self):
+        self.mapper.insert(self.conn, "hash1", "/pkgs/foo/v1.0.0/release")
+        self.mapper.insert(self.conn, "hash2", "/pkgs/foo/v1.0.1/release")
+
+        dirpaths = self.mapper.query(self.conn, "hash1")
+        self.assertEqual(dirpaths, ["/pkgs/foo/v1.0.0/release"])
+
+        dirpaths = self.mapper.query(self.conn, "hash3")
+        self.assertEqual(len(dirpaths), 0)
+
+    def test_insert_repeated(self):
+        self.mapper.insert(self.conn, "hash1", "/pkgs/foo/v1.0.0/release")
+        self.mapper.insert(self.conn, "hash1", "/pkgs/foo/v1.0.0/release")
+        dirpaths = self.mapper.query(self.conn, "hash1")
+        self.assertEqual(len(dirpaths), 1)
+
+    def test_remove_by_dirpath(self):
+        dirpath = "/pkgs/it's/v1.0.0/release"
+        self.mapper.insert(self.conn, "hash1", dirpath)
+        self.mapper.remove_by_dirpath(self.conn, dirpath)
+        dirpaths = self.mapper.query(self.conn, "hash1")
+        self.assertEqual(len(dirpaths), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import logging
+import os
+import shutil
+import unittest
+
+from hpb.component.matrix_handle import MatrixHandle
+from hpb.component.workflow_handle import WorkflowHandle
+from hpb.data_type.builder_config import BuilderConfig
+from hpb.utils.utils import Utils
+
+
+class TestMatrixHandle(unittest.TestCase):
+    def new_workflow(self, matrix):
+        workflow = WorkflowHandle()
+        workflow.yml_obj.load({"name": "foo", "matrix": matrix})
+        return workflow
+
+    def test_load(self):
+        cfg = BuilderConfig()
+        workflow = self.new_workflow({
+            "build_type": ["debug", "release"],
+            "cc": "gcc",
+        })
+        handle = MatrixHandle()
+        self.assertTrue(handle.load(cfg, workflow))
+        self.assertEqual(handle.variants, [
+            {"build_type": "debug", "cc": "gcc"},
+            {"build_type": "release", "cc": "gcc"},
+        ])
+
+    def test_load_override(self):
+        cfg = BuilderConfig()
+        cfg.matrix = ["cc=gcc,clang", "fat_pkg=true"]
+        workflow = self.new_workflow({"cc": ["msvc"]})
+        handle = MatrixHandle()
+        self.assertTrue(handle.load(cfg, workflow))
+        self.assertEqual(handle.variants, [
+            {"cc": "gcc", "fat_pkg": "true"},
+            {"cc": "clang", "fat_pkg": "true"},
+        ])
+
+    def test_load_empty(self):
+        handle = MatrixHandle()
+        self.assertTrue(handle.load(BuilderConfig(), self.new_workflow({})))
+        self.assertEqual(len(handle.variants), 0)
+
+        cfg = BuilderConfig()
+        cfg.matrix = ["invalid"]
+        self.assertFalse(handle.load(cfg, self.new_workflow({})))
+
+    def test_max_workers(self):
+        cfg = BuilderConfig()
+        handle = MatrixHandle()
+        handle.load(cfg, self.new_workflow({}))
+        cfg.matrix_jobs = 2
+        self.assertEqual(handle.get_max_workers(4), 2)
+        self.assertEqual(handle.get_max_workers(1), 1)
+
+        cfg.matrix_jobs = 0
+        cfg.jobs = (os.cpu_count() or 1) * 2
+        self.assertEqual(handle.get_max_workers(4), 1)
+
+    def test_variant_log(self):
+        working_dir = Utils.expand_path("./hpb/test_matrix_handle")
+        if os.path.exists(working_dir):
+            shutil.rmtree(working_dir)
+        os.makedirs(working_dir, exist_ok=True)
+        config_path = os.path.join(working_dir, "hpb.yml")
+        with open(config_path, "w") as f:
+            f.write("name: foo\n")
+        cfg = BuilderConfig()
+        cfg.working_dir = working_dir
+        cfg.config_path = config_path
+        handle = MatrixHandle()
+        handle.load(cfg, self.new_workflow({}))
+        handle._workflow.task_name = "foo"
+
+        variant = handle.new_variant_workflow({"cc": "gcc"})
+        try:
+            self.assertIsNotNone(variant)
+            logger = logging.getLogger(variant.command_logger_name)
+            self.assertFalse(logger.propagate)
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+        finally:
+            shutil.rmtree(working_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import threading
+import time
+import unittest
+
+from hpb.utils.memo_handle import MemoHandle
+
+
+class TestMemoHandle(unittest.TestCase):
+    def test_get(self):
+        memo = MemoHandle()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(memo.get("k", compute), 1)
+        self.assertEqual(memo.get("k", compute), 1)
+        self.assertEqual(len(calls), 1)
+
+        memo.pop("k")
+        self.assertEqual(memo.get("k", compute), 2)
+
+    def test_get_concurrently(self):
+        memo = MemoHandle()
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return "v"
+
+        def worker():
+            results.append(memo.get("k", compute))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["v"] * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tarfile
+import time
+import unittest
+
+from hpb.component.pkg_cache_handle import PkgCacheHandle
+from hpb.data_type.package_info import PackageInfo
+from hpb.utils.utils import Utils
+
+
+class TestPkgCacheHandle(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_pkg_cache_handle")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        os.makedirs(self.working_dir, exist_ok=True)
+        self.cache = PkgCacheHandle(os.path.join(self.working_dir, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def write_pkg(self, content):
+        output_dir = os.path.join(self.working_dir, "output")
+        os.makedirs(os.path.join(output_dir, "include"), exist_ok=True)
+        with open(os.path.join(output_dir, "include", "foo.h"), "w") as f:
+            f.write(content)
+
+        pkg_dir = os.path.join(self.working_dir, "packages", "foo")
+        os.makedirs(pkg_dir, exist_ok=True)
+        with tarfile.open(os.path.join(pkg_dir, "foo.tar.gz"), "w:gz") as tar:
+            tar.add(os.path.join(output_dir, "include"), arcname="include")
+
+        pkg_info = PackageInfo()
+        pkg_info.repo_type = "local"
+        pkg_info.path = pkg_dir
+        return pkg_info
+
+    def test_materialize(self):
+        pkg_info = self.write_pkg("foo")
+        deps_dirs = [
+            os.path.join(self.working_dir, "deps{}".format(i))
+            for i in range(2)
+        ]
+        for deps_dir in deps_dirs:
+            self.assertTrue(self.cache.materialize(pkg_info, deps_dir))
+
+        inodes = []
+        for deps_dir in deps_dirs:
+            filepath = os.path.join(deps_dir, "include", "foo.h")
+            with open(filepath, "r") as f:
+                self.assertEqual(f.read(), "foo")
+            inodes.append(os.stat(filepath).st_ino)
+        self.assertEqual(inodes[0], inodes[1])
+
+    def test_package_changed(self):
+        pkg_info = self.write_pkg("foo")
+        tree_dir = self.cache.get_tree(pkg_info)
+        self.assertEqual(self.cache.get_tree(pkg_info), tree_dir)
+
+        # make sure mtime changed
+        time.sleep(0.01)
+        pkg_info = self.write_pkg("bar")
+        new_tree_dir = self.cache.get_tree(pkg_info)
+        self.assertNotEqual(new_tree_dir, tree_dir)
+        with open(os.path.join(new_tree_dir, "include", "foo.h"), "r") as f:
+            self.assertEqual(f.read(), "bar")
+
+
+if __name__ == "__main__":
+    unittest.main()
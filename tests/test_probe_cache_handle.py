@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import unittest
+
+from hpb.component.probe_cache_handle import ProbeCacheHandle
+from hpb.utils.utils import Utils
+
+
+class TestProbeCacheHandle(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_probe_cache_handle")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        os.makedirs(self.working_dir, exist_ok=True)
+
+        self._handle = ProbeCacheHandle()
+        self._origin_cache_path = self._handle.cache_path
+        self._handle.cache_path = os.path.join(self.working_dir, "cache")
+        self._handle.clear()
+
+        self.compiler_path = os.path.join(self.working_dir, "cc")
+        with open(self.compiler_path, "w") as f:
+            f.write("v1")
+
+    def tearDown(self):
+        self._handle.clear()
+        self._handle.cache_path = self._origin_cache_path
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def test_get(self):
+        calls = []
+
+        def probe():
+            calls.append(1)
+            return {"cc_ver": str(len(calls))}
+
+        key = ProbeCacheHandle().file_key(self.compiler_path)
+        self.assertEqual(
+            self._handle.get("compiler", key, probe), {"cc_ver": "1"})
+        self.assertEqual(
+            self._handle.get("compiler", key, probe), {"cc_ver": "1"})
+        self.assertEqual(len(calls), 1)
+
+        # persisted
+        filepath = os.path.join(self._handle.cache_path, "probe.json")
+        with open(filepath, "r") as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+        # compiler changed
+        with open(self.compiler_path, "w") as f:
+            f.write("version 2")
+        key = ProbeCacheHandle().file_key(self.compiler_path)
+        self.assertEqual(
+            self._handle.get("compiler", key, probe), {"cc_ver": "2"})
+
+        # refresh
+        self._handle.clear()
+        self.assertFalse(os.path.exists(filepath))
+        self.assertEqual(
+            self._handle.get("compiler", key, probe), {"cc_ver": "3"})
+
+    def test_content_key(self):
+        key1 = ProbeCacheHandle().content_key(self.compiler_path)
+        with open(self.compiler_path, "w") as f:
+            f.write("v2")
+        key2 = ProbeCacheHandle().content_key(self.compiler_path)
+        self.assertNotEqual(key1, key2)
+
+        key = ProbeCacheHandle().content_key(
+            os.path.join(self.working_dir, "not_exists"))
+        self.assertNotIn("sha256", key)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,149 @@
+import os
+import shutil
+import tarfile
 import unittest
 
+from hpb.component.repo_deps_handle import RepoDepsHandle
 from hpb.component.settings_handle import SettingsHandle
+from hpb.data_type.build_info import BuildInfo
+from hpb.data_type.package_info import PackageInfo
+from hpb.data_type.platform_info import PlatformInfo
+from hpb.utils.memo_handle import MemoHandle
+from hpb.utils.utils import Utils
 
 
 class TestRepoDepsHandle(unittest.TestCase):
     def setUp(self):
         super().setUp()
         self._handle = SettingsHandle()
+        self.working_dir = Utils.expand_path("./hpb/test_repo_deps_handle")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        os.makedirs(self.working_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def write_pkg(self, name, files):
+        output_dir = os.path.join(self.working_dir, "output", name)
+        for filename, content in files.items():
+            filepath = os.path.join(output_dir, filename)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, "w") as f:
+                f.write(content)
+
+        pkg_dir = os.path.join(self.working_dir, "packages", name)
+        os.makedirs(pkg_dir, exist_ok=True)
+        with tarfile.open(
+                os.path.join(pkg_dir, "{}.tar.gz".format(name)),
+                "w:gz") as tar:
+            for f in os.listdir(output_dir):
+                tar.add(os.path.join(output_dir, f), arcname=f)
+
+        pkg_info = PackageInfo()
+        pkg_info.repo_type = "local"
+        pkg_info.path = pkg_dir
+        return pkg_info
+
+    def test_download_all_deps(self):
+        handle = RepoDepsHandle(PlatformInfo(), BuildInfo(), max_workers=4)
+        pkgs = {
+            "foo": {"include/foo.h": "foo", "lib/libfoo.a": "foo"},
+            "bar": {"include/bar.h": "bar", "lib/libbar.a": "bar"},
+            "baz": {"include/baz.h": "baz", "include/foo.h": "baz"},
+        }
+        for name, files in pkgs.items():
+            handle.search_result_dict["hpb${}$v1.0.0".format(name)] = \
+                self.write_pkg(name, files)
+
+        deps_dir = os.path.join(self.working_dir, "deps")
+        with self.assertLogs(level="WARNING") as cm:
+            self.assertTrue(handle.download_all_deps(deps_dir))
+        self.assertIn("include/foo.h", "\n".join(cm.output))
+
+        self.assertEqual(sorted(os.listdir(deps_dir)), ["include", "lib"])
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(deps_dir, "include"))),
+            ["bar.h", "baz.h", "foo.h"])
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(deps_dir, "lib"))),
+            ["libbar.a", "libfoo.a"])
+
+        # the latter package wins
+        with open(os.path.join(deps_dir, "include", "foo.h"), "r") as f:
+            self.assertEqual(f.read(), "baz")
+
+    def test_download_incremental(self):
+        handle = RepoDepsHandle(PlatformInfo(), BuildInfo(), max_workers=4)
+        pkgs = {
+            "foo": {"include/foo.h": "foo"},
+            "bar": {"include/bar/bar.h": "bar", "lib/libbar.a": "bar"},
+            "baz": {"include/baz.h": "baz"},
+        }
+        pkg_infos = {
+            name: self.write_pkg(name, files) for name, files in pkgs.items()
+        }
+        for name in ["foo", "bar"]:
+            handle.search_result_dict["hpb${}$v1.0.0".format(name)] = \
+                pkg_infos[name]
+
+        deps_dir = os.path.join(self.working_dir, "deps")
+        foo_path = os.path.join(deps_dir, "include", "foo.h")
+        self.assertTrue(handle.download_all_deps(deps_dir, incremental=True))
+        self.assertTrue(os.path.exists(
+            os.path.join(deps_dir, ".hpb-deps.json")))
+        foo_ino = os.stat(foo_path).st_ino
+
+        # unchanged
+        with self.assertLogs(level="INFO") as cm:
+            self.assertTrue(
+                handle.download_all_deps(deps_dir, incremental=True))
+        self.assertIn("dependencies unchanged", "\n".join(cm.output))
+        self.assertEqual(os.stat(foo_path).st_ino, foo_ino)
+
+        # replace bar with baz, foo is kept
+        handle.search_result_dict.pop("hpb$bar$v1.0.0")
+        handle.search_result_dict["hpb$baz$v1.0.0"] = pkg_infos["baz"]
+        self.assertTrue(handle.download_all_deps(deps_dir, incremental=True))
+        self.assertEqual(os.stat(foo_path).st_ino, foo_ino)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(deps_dir, "include"))),
+            ["baz.h", "foo.h"])
+        self.assertFalse(os.path.exists(os.path.join(deps_dir, "lib")))
+
+    def test_search_with_others(self):
+        searched = []
+
+        def search(dep):
+            searched.append(dep.name)
+            pkg_info = PackageInfo()
+            pkg_info.path = dep.name
+            if dep.name == "foo":
+                pkg_info.meta.deps = [
+                    {"maintainer": "hpb", "name": "bar", "tag": "v1.0.0"}]
+            return pkg_info
+
+        memo = MemoHandle()
+        deps_handle = RepoDepsHandle(PlatformInfo(), BuildInfo(), memo=memo)
+        test_deps_handle = RepoDepsHandle(
+            PlatformInfo(), BuildInfo(), memo=memo)
+        deps_handle._search = search
+        test_deps_handle._search = search
+
+        foo = {"maintainer": "hpb", "name": "foo", "tag": "v1.0.0"}
+        gtest = {"maintainer": "google", "name": "gtest", "tag": "v1.0.0"}
+        self.assertTrue(deps_handle.search_all_deps(
+            [foo], [(test_deps_handle, [foo, gtest])]))
+
+        # shared packages only be searched once
+        self.assertEqual(sorted(searched), ["bar", "foo", "gtest"])
+        self.assertEqual(
+            sorted([r.path for r in deps_handle.get_chosen_deps()]),
+            ["bar", "foo"])
+        self.assertEqual(
+            sorted([r.path for r in test_deps_handle.get_chosen_deps()]),
+            ["bar", "foo", "gtest"])
 
 
 if __name__ == "__main__":
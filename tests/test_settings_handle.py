@@ -27,6 +27,23 @@ class TestSettingsHandle(unittest.TestCase):
             self._handle.source_path,
             Utils.expand_path("~/helloworld/sources")
         )
+        self.assertEqual(self._handle.source_max_size, 20 * 1024 ** 3)
+
+    def test_cache(self):
+        self._handle.load("./etc/test_settings_handle/settings_cache.xml")
+        self.assertEqual(
+            self._handle.cache_path,
+            Utils.expand_path("~/helloworld/cache")
+        )
+
+    def test_build_src(self):
+        self.assertFalse(self._handle.build_if_not_exists)
+        self._handle.load("./etc/test_settings_handle/settings_build_src.xml")
+        self.assertTrue(self._handle.build_if_not_exists)
+        self.assertEqual(self._handle.recipe_paths, [
+            Utils.expand_path("~/helloworld/recipes"),
+            "/opt/hpb/share/modules",
+        ])
 
     def test_packages(self):
         self._handle.load("./etc/test_settings_handle/settings_package.xml")
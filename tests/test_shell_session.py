@@ -0,0 +1,109 @@
+import io
+import logging
+import os
+import shutil
+import threading
+import unittest
+
+from hpb.component.shell_session import ShellSession
+from hpb.utils.utils import Utils
+
+
+@unittest.skipIf(os.name != "posix", "shell session only support posix")
+class TestShellSession(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.out_lines = []
+        self.err_lines = []
+        self.working_dir = Utils.expand_path(".")
+        self._session = ShellSession(
+            cb_stdout=self.out_lines.append,
+            cb_stderr=self.err_lines.append,
+            cwd=self.working_dir)
+
+    def tearDown(self):
+        self._session.close()
+        super().tearDown()
+
+    def test_env_persist(self):
+        self.assertTrue(self._session.exec("export HPB_TEST_VAR=hello"))
+        self.assertTrue(self._session.exec("echo ${HPB_TEST_VAR}"))
+        self.assertEqual(self.out_lines, ["hello"])
+
+    def test_cwd_persist(self):
+        self.assertTrue(self._session.exec("cd etc"))
+        self.assertEqual(
+            self._session.cwd, os.path.join(self.working_dir, "etc"))
+        self.assertTrue(self._session.exec("pwd"))
+        self.assertEqual(
+            self.out_lines, [os.path.join(self.working_dir, "etc")])
+
+    def test_exit_status(self):
+        self.assertFalse(self._session.exec("false"))
+        self.assertTrue(self._session.exec("true"))
+        self.assertTrue(self._session.exec("echo err >&2"))
+        self.assertEqual(self.err_lines, ["err"])
+
+    def test_output_without_newline(self):
+        self.assertTrue(self._session.exec("printf foo"))
+        self.assertEqual(self.out_lines, ["foo"])
+
+    def test_shell_exit(self):
+        self.assertFalse(self._session.exec("exit 3"))
+        self.assertEqual(self._session.returncode, 3)
+        self.assertFalse(self._session.exec("exit 0"))
+        self.assertFalse(self._session.exec("set -e; false"))
+
+        # next command runs in new shell, working directory is kept
+        self.assertTrue(self._session.exec("cd etc"))
+        self.assertFalse(self._session.exec("exit 0"))
+        self.assertTrue(self._session.exec("pwd"))
+        self.assertEqual(
+            self.out_lines, [os.path.join(self.working_dir, "etc")])
+
+    def test_raw_output(self):
+        stream = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        logger = logging.getLogger("command.test_shell_raw_output")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = logging.StreamHandler(stream)
+        logger.addHandler(handler)
+
+        session = ShellSession(
+            logger_name="command.test_shell_raw_output", raw_output=True)
+        self.assertTrue(session.exec("printf 'foo\\nbar'"))
+        session.close()
+
+        logger.removeHandler(handler)
+        stream.flush()
+        content = stream.buffer.getvalue().decode("utf-8")
+        self.assertTrue(content.endswith("foo\nbar\n"))
+
+    def test_non_utf8_cwd(self):
+        test_dir = os.path.join(self.working_dir, "hpb", "test_shell_session")
+        dirpath = os.path.join(os.fsencode(test_dir), b"d\xff")
+        os.makedirs(dirpath, exist_ok=True)
+        rets = []
+
+        def run():
+            rets.append(self._session.exec("cd \"{}\"".format(test_dir)))
+            rets.append(self._session.exec("cd \"$(printf 'd\\377')\""))
+            rets.append(self._session.exec("true"))
+            rets.append(self._session.exec(
+                "cd \"{}\"".format(os.fsdecode(dirpath))))
+
+        try:
+            # a broken frame must not block exec forever
+            t = threading.Thread(target=run)
+            t.daemon = True
+            t.start()
+            t.join(10)
+            self.assertFalse(t.is_alive())
+            self.assertEqual(rets, [True, True, True, True])
+            self.assertEqual(os.fsencode(self._session.cwd), dirpath)
+        finally:
+            shutil.rmtree(test_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import shutil
+import subprocess
+import unittest
+
+from hpb.component.source_downloader import SourceDownloader
+from hpb.data_type.git_info import GitInfo
+from hpb.data_type.source_info import SourceInfo
+from hpb.utils.utils import Utils
+
+
+@unittest.skipIf(shutil.which("git") is None, "git not found")
+class TestSourceDownloader(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_source_downloader")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        self.repo_dir = os.path.join(self.working_dir, "repo")
+        self.source_root = os.path.join(self.working_dir, "sources")
+        os.makedirs(self.repo_dir, exist_ok=True)
+
+        self.git("init", "-q")
+        self.git("checkout", "-q", "-b", "main")
+        self.commit("v1")
+        self.git("tag", "v1")
+        self.commit("v2")
+        self.git("tag", "-a", "v2", "-m", "v2")
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def git(self, *args, cwd=None):
+        result = subprocess.run(
+            ["git", "-c", "user.name=hpb", "-c", "user.email=hpb@localhost"]
+            + list(args),
+            cwd=self.repo_dir if cwd is None else cwd,
+            check=True, stdout=subprocess.PIPE)
+        return result.stdout.decode("utf-8").strip()
+
+    def commit(self, content):
+        with open(os.path.join(self.repo_dir, "foo.txt"), "w") as f:
+            f.write(content)
+        self.git("add", "foo.txt")
+        self.git("commit", "-q", "-m", content)
+
+    def download(self, tag, git_depth=1):
+        src_info = SourceInfo()
+        src_info.maintainer = "hpb"
+        src_info.name = "foo"
+        src_info.tag = tag
+        src_info.repo_kind = "git"
+        src_info.repo_url = self.repo_dir
+        src_info.git_depth = git_depth
+
+        downloader = SourceDownloader()
+        self.assertTrue(downloader.download(src_info, self.source_root))
+        self.assertEqual(
+            downloader.mirror_path,
+            SourceDownloader.get_mirror_path(self.source_root, self.repo_dir))
+        return downloader.source_path
+
+    def read(self, source_path):
+        with open(os.path.join(source_path, "foo.txt"), "r") as f:
+            return f.read()
+
+    def test_worktree_per_tag(self):
+        v1_path = self.download("v1", git_depth=0)
+        v2_path = self.download("v2", git_depth=0)
+        self.assertNotEqual(v1_path, v2_path)
+        self.assertEqual(self.read(v1_path), "v1")
+        self.assertEqual(self.read(v2_path), "v2")
+
+        # worktrees share objects of one mirror
+        self.assertTrue(os.path.isfile(os.path.join(v1_path, ".git")))
+        mirror_dirs = os.listdir(os.path.join(self.source_root, "_mirrors"))
+        self.assertEqual(
+            len([d for d in mirror_dirs if d.endswith(".git")]), 1)
+
+        git_info = GitInfo()
+        git_info.get_git_info(v2_path)
+        self.assertEqual(git_info.tag, "v2")
+
+    def test_shallow(self):
+        v1_path = self.download("v1")
+        self.assertEqual(self.read(v1_path), "v1")
+        mirror_path = SourceDownloader.get_mirror_path(
+            self.source_root, self.repo_dir)
+        self.assertTrue(os.path.exists(os.path.join(mirror_path, "shallow")))
+
+        # new tag only fetch the missing one
+        self.commit("v3")
+        self.git("tag", "v3")
+        v3_path = self.download("v3")
+        self.assertEqual(self.read(v3_path), "v3")
+        tags = self.git("tag", "--list", cwd=mirror_path).split()
+        self.assertEqual(sorted(tags), ["v1", "v3"])
+
+    def test_branch(self):
+        path = self.download("main")
+        git_info = GitInfo()
+        git_info.get_git_info(path)
+        self.assertEqual(git_info.branch, "main")
+        self.assertEqual(self.read(path), "v2")
+
+        # already exists
+        self.assertEqual(self.download("main"), path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import time
+import unittest
+
+from hpb.component.source_downloader import SourceDownloader
+from hpb.component.source_gc_handle import SourceGcHandle
+from hpb.utils.file_lock import FileLock
+from hpb.utils.utils import Utils
+
+
+class TestSourceGcHandle(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_source_gc_handle")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        os.makedirs(self.working_dir, exist_ok=True)
+
+        # foo-v1 is the least recently used, foo-v3 the most
+        now = time.time()
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(
+                self.working_dir, "hpb", "foo-v{}".format(i + 1))
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, "foo.txt"), "w") as f:
+                f.write("x" * 1000)
+            usage_path = SourceDownloader.get_usage_path(
+                self.working_dir, path)
+            SourceDownloader.touch(usage_path)
+            os.utime(usage_path, (now - 300 + i, now - 300 + i))
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def test_scan(self):
+        gc_handle = SourceGcHandle(self.working_dir, 0)
+        entries = gc_handle.scan()
+        self.assertEqual([entry.path for entry in entries], self.paths)
+        for entry in entries:
+            self.assertEqual(entry.kind, "checkout")
+            self.assertEqual(entry.size, 1000)
+
+    def test_lru(self):
+        gc_handle = SourceGcHandle(self.working_dir, 2000)
+        self.assertTrue(gc_handle.collect())
+        self.assertFalse(os.path.exists(self.paths[0]))
+        self.assertTrue(os.path.exists(self.paths[1]))
+        self.assertTrue(os.path.exists(self.paths[2]))
+
+    def test_dry_run(self):
+        gc_handle = SourceGcHandle(self.working_dir, 0)
+        self.assertTrue(gc_handle.collect(dry_run=True))
+        for path in self.paths:
+            self.assertTrue(os.path.exists(path))
+
+    def test_locked(self):
+        usage_path = SourceDownloader.get_usage_path(
+            self.working_dir, self.paths[0])
+        with FileLock(usage_path, shared=True):
+            gc_handle = SourceGcHandle(self.working_dir, 2000)
+            self.assertTrue(gc_handle.collect())
+        self.assertTrue(os.path.exists(self.paths[0]))
+        self.assertFalse(os.path.exists(self.paths[1]))
+        self.assertTrue(os.path.exists(self.paths[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
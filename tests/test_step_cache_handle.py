@@ -0,0 +1,87 @@
+import os
+import shutil
+import unittest
+
+from hpb.component.step_cache_handle import StepCacheHandle
+from hpb.utils.utils import Utils
+
+
+class TestStepCacheHandle(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_step_cache_handle")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        self.src_dir = os.path.join(self.working_dir, "src")
+        self.out_dir = os.path.join(self.working_dir, "out")
+        os.makedirs(self.src_dir, exist_ok=True)
+        with open(os.path.join(self.src_dir, "foo.c"), "w") as f:
+            f.write("int foo() { return 0; }")
+
+        self._handle = StepCacheHandle(
+            os.path.join(self.working_dir, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def test_fingerprint(self):
+        commands = ["cc -c src/foo.c -o out/foo.o"]
+        inputs = ["src/**/*.c", "release"]
+        outputs = ["out"]
+        fp1 = self._handle.fingerprint(
+            commands, inputs, outputs, self.working_dir)
+        fp2 = self._handle.fingerprint(
+            commands, inputs, outputs, self.working_dir)
+        self.assertEqual(fp1, fp2)
+
+        fp3 = self._handle.fingerprint(
+            commands, ["src/**/*.c", "debug"], outputs, self.working_dir)
+        self.assertNotEqual(fp1, fp3)
+
+        with open(os.path.join(self.src_dir, "foo.c"), "w") as f:
+            f.write("int foo() { return 1; }")
+        fp4 = self._handle.fingerprint(
+            commands, inputs, outputs, self.working_dir)
+        self.assertNotEqual(fp1, fp4)
+
+    def test_fingerprint_values(self):
+        commands = ["cc -c src/foo.c -o out/foo.o"]
+        fp1 = self._handle.fingerprint(
+            commands, ["src/**/*.c"], ["out"], self.working_dir, ["release"])
+        fp2 = self._handle.fingerprint(
+            commands, ["src/**/*.c"], ["out"], self.working_dir, ["debug"])
+        self.assertIsNotNone(fp1)
+        self.assertNotEqual(fp1, fp2)
+
+    def test_fingerprint_unmatched_glob(self):
+        with self.assertLogs(level="WARNING"):
+            fp = self._handle.fingerprint(
+                ["build"], ["src/**/*.cpp"], ["out"], self.working_dir)
+        self.assertIsNone(fp)
+
+    def test_save_restore(self):
+        outputs = ["out"]
+        fp = self._handle.fingerprint(
+            ["build"], ["src"], outputs, self.working_dir)
+        self.assertFalse(self._handle.restore(fp))
+
+        os.makedirs(os.path.join(self.out_dir, "lib"), exist_ok=True)
+        with open(os.path.join(self.out_dir, "lib", "foo.o"), "w") as f:
+            f.write("obj")
+        self.assertTrue(self._handle.save(fp, outputs, self.working_dir))
+
+        shutil.rmtree(self.out_dir)
+        self.assertTrue(self._handle.restore(fp))
+        with open(os.path.join(self.out_dir, "lib", "foo.o"), "r") as f:
+            self.assertEqual(f.read(), "obj")
+
+    def test_save_missing_output(self):
+        fp = self._handle.fingerprint(
+            ["build"], [], ["out"], self.working_dir)
+        self.assertFalse(self._handle.save(fp, ["out"], self.working_dir))
+        self.assertFalse(self._handle.restore(fp))
+
+
+if __name__ == "__main__":
+    unittest.main()
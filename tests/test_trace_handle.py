@@ -0,0 +1,58 @@
+import json
+import os
+import shutil
+import unittest
+
+from hpb.utils.trace_handle import TraceHandle
+from hpb.utils.utils import Utils
+
+
+class TestTraceHandle(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_trace_handle")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+
+    def tearDown(self):
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def test_span(self):
+        trace = TraceHandle()
+        with trace.span("job", "job") as args:
+            with trace.span("cmd", "command") as cmd_args:
+                cmd_args["exit_code"] = 0
+            args["ok"] = True
+
+        events = trace.events
+        self.assertEqual([e["name"] for e in events], ["cmd", "job"])
+        cmd, job = events
+        self.assertEqual(cmd["ph"], "X")
+        self.assertEqual(cmd["args"]["exit_code"], 0)
+        self.assertTrue(job["args"]["ok"])
+        self.assertLessEqual(job["ts"], cmd["ts"])
+        self.assertGreaterEqual(job["ts"] + job["dur"], cmd["ts"] + cmd["dur"])
+
+    def test_span_exception(self):
+        trace = TraceHandle()
+        with self.assertRaises(RuntimeError):
+            with trace.span("phase", "phase"):
+                raise RuntimeError("failed")
+        self.assertEqual(len(trace.events), 1)
+
+    def test_dump(self):
+        trace = TraceHandle()
+        with trace.span("phase", "phase"):
+            pass
+        filepath = os.path.join(self.working_dir, "log", "trace.json")
+        trace.dump(filepath)
+        with open(filepath, "r") as f:
+            obj = json.load(f)
+        self.assertEqual(len(obj["traceEvents"]), 1)
+        self.assertEqual(obj["traceEvents"][0]["name"], "phase")
+
+
+if __name__ == "__main__":
+    unittest.main()
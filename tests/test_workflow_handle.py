@@ -1,10 +1,23 @@
 import os
 import shutil
+import threading
 import unittest
 
+from hpb.component.command_handle import CommandHandle
+from hpb.component.dep_src_builder import DepSrcBuilder
+from hpb.component.workflow_handle import WorkflowHandle
 from hpb.utils.utils import Utils
 
 
+class FakeDepsHandle:
+    def __init__(self):
+        self.download_dirs = []
+
+    def download_all_deps(self, download_dir, incremental=False):
+        self.download_dirs.append(download_dir)
+        return True
+
+
 class TestWorkflowHandle(unittest.TestCase):
     def setUp(self):
         super().setUp()
@@ -14,9 +27,113 @@ class TestWorkflowHandle(unittest.TestCase):
             shutil.rmtree(self.working_dir)
         os.makedirs(self.working_dir, exist_ok=True)
 
+    def tearDown(self):
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
     def test_set_input_args(self):
         pass
 
+    def test_lazy_test_deps(self):
+        handle = WorkflowHandle()
+        handle.yml_obj.load({
+            "jobs": {
+                "build": {"steps": [{"run": "echo build"}]},
+                "test": {
+                    "test_deps": True,
+                    "steps": [{"run": "echo test", "ignore": True}],
+                },
+            },
+        })
+        handle.deps_dir = os.path.join(self.working_dir, "deps")
+        handle.test_deps_dir = os.path.join(self.working_dir, "test_deps")
+        handle.deps_handle = FakeDepsHandle()
+        handle.test_deps_handle = FakeDepsHandle()
+
+        # deps is not declared by any job, so download eagerly, and
+        # test_deps is declared by job 'test', so download lazily
+        self.assertEqual(handle.get_lazy_deps_kinds(), {"test_deps"})
+        self.assertTrue(handle.download_deps())
+        self.assertEqual(
+            handle.deps_handle.download_dirs, [handle.deps_dir])
+        self.assertEqual(handle.test_deps_handle.download_dirs, [])
+
+        jobs = handle.yml_obj.jobs
+        self.assertTrue(handle.download_job_deps("build", jobs["build"]))
+        self.assertEqual(handle.test_deps_handle.download_dirs, [])
+
+        # only downloaded once
+        for _ in range(2):
+            self.assertTrue(handle.download_job_deps("test", jobs["test"]))
+        self.assertEqual(
+            handle.test_deps_handle.download_dirs, [handle.test_deps_dir])
+
+    def test_lazy_test_deps_all_ignored(self):
+        handle = WorkflowHandle()
+        handle.yml_obj.load({
+            "jobs": {
+                "test": {
+                    "test_deps": True,
+                    "steps": [{"run": "echo test", "ignore": True}],
+                },
+            },
+        })
+        handle.test_deps_dir = os.path.join(self.working_dir, "test_deps")
+        handle.test_deps_handle = FakeDepsHandle()
+
+        # job with all steps ignored never download its dependencies
+        jobs = handle.yml_obj.jobs
+        self.assertTrue(handle._run_workflow_job_steps(
+            "test", jobs["test"], CommandHandle(cwd=self.working_dir)))
+        self.assertEqual(handle.test_deps_handle.download_dirs, [])
+
+    def new_prepare_handle(self):
+        handle = WorkflowHandle()
+        handle.yml_obj.load({})
+        handle.load_yaml_file = lambda: True
+        handle.prepare_vars = lambda: True
+        return handle
+
+    def test_prepare_src_failed(self):
+        handle = self.new_prepare_handle()
+        deps_called = []
+
+        def prepare_build_info():
+            # finish after source failed
+            handle.wait_prepare_src()
+            return True
+
+        handle.prepare_src = lambda: False
+        handle.prepare_build_info = prepare_build_info
+        handle.prepare_deps = lambda: deps_called.append(True)
+        self.assertFalse(handle.prepare())
+        self.assertEqual(deps_called, [])
+
+    def test_prepare_src_failed_cancel_dep_build(self):
+        handle = self.new_prepare_handle()
+        deps_started = threading.Event()
+        build_ret = []
+
+        def prepare_src():
+            deps_started.wait()
+            return False
+
+        def prepare_deps():
+            deps_started.set()
+            builder = DepSrcBuilder(
+                os.path.join(self.working_dir, "deps_src"), "1",
+                wait_ready=handle.wait_prepare_src)
+            build_ret.append(builder.build([], lambda dep: True))
+            return build_ret[-1]
+
+        handle.prepare_src = prepare_src
+        handle.prepare_build_info = lambda: True
+        handle.prepare_deps = prepare_deps
+        self.assertFalse(handle.prepare())
+        self.assertEqual(build_ret, [False])
+        self.assertFalse(
+            os.path.exists(os.path.join(self.working_dir, "deps_src")))
+
 
 if __name__ == "__main__":
     unittest.main()
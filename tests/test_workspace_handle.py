@@ -0,0 +1,129 @@
+import os
+import shlex
+import shutil
+import sys
+import unittest
+import unittest.mock
+
+from hpb.component.workspace_handle import WorkspaceHandle
+from hpb.data_type.builder_config import BuilderConfig
+from hpb.utils.utils import Utils
+
+
+class FakeCommandHandle:
+    def __init__(self):
+        self.commands = []
+
+    def exec(self, command):
+        self.commands.append(command)
+        return True
+
+
+class TestWorkspaceHandle(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.working_dir = Utils.expand_path("./hpb/test_workspace_handle")
+        if os.path.exists(self.working_dir):
+            shutil.rmtree(self.working_dir)
+        os.makedirs(self.working_dir, exist_ok=True)
+
+        self.write_recipe("foo", [])
+        self.write_recipe("bar", ["foo"])
+        self.write_recipe("baz", ["foo", "bar", "external"])
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir)
+        super().tearDown()
+
+    def write_recipe(self, name, deps):
+        recipe_dir = os.path.join(self.working_dir, name)
+        os.makedirs(recipe_dir, exist_ok=True)
+        lines = [
+            "name: {}".format(name),
+            "variables:",
+            "  - maintainer: mugglewei",
+            "source:",
+            "  maintainer: ${maintainer}",
+            "  name: {}".format(name),
+            "deps:",
+        ]
+        for dep in deps:
+            lines.append("  - maintainer: mugglewei")
+            lines.append("    name: {}".format(dep))
+            lines.append("    tag: v1.0.0")
+        with open(os.path.join(recipe_dir, "{}.yml".format(name)), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def new_handle(self, workspace):
+        cfg = BuilderConfig()
+        cfg.working_dir = self.working_dir
+        cfg.workspace = workspace
+        handle = WorkspaceHandle()
+        self.assertTrue(handle.set_input_args(cfg))
+        return handle
+
+    def load_needs(self, handle):
+        paths = handle.get_recipe_paths()
+        self.assertIsNotNone(paths)
+        for filepath in paths:
+            recipe = handle.load_recipe(filepath)
+            self.assertIsNotNone(recipe)
+            handle.recipes[recipe.name] = recipe
+        return handle.get_recipe_needs()
+
+    def test_workspace_dir(self):
+        # generated yml files in build outputs are not recipes
+        output_dir = os.path.join(self.working_dir, "foo", "build", "_hpb")
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, "pkg.yml"), "w") as f:
+            f.write("name: foo\n")
+
+        handle = self.new_handle(self.working_dir)
+        needs = self.load_needs(handle)
+        self.assertEqual(needs, {
+            "bar": ["foo"],
+            "baz": ["foo", "bar"],
+            "foo": [],
+        })
+
+    def test_manifest(self):
+        manifest_path = os.path.join(self.working_dir, "manifest.yaml")
+        with open(manifest_path, "w") as f:
+            f.write("recipes:\n  - foo/foo.yml\n  - bar/bar.yml\n")
+        handle = self.new_handle(manifest_path)
+        needs = self.load_needs(handle)
+        self.assertEqual(needs, {"foo": [], "bar": ["foo"]})
+
+    def test_cycle(self):
+        self.write_recipe("foo", ["baz"])
+        handle = self.new_handle(self.working_dir)
+        self.assertIsNone(self.load_needs(handle))
+
+    def build_recipe_args(self):
+        handle = self.new_handle(self.working_dir)
+        recipe = handle.load_recipe(
+            os.path.join(self.working_dir, "foo", "foo.yml"))
+        self.assertIsNotNone(recipe)
+        command_handle = FakeCommandHandle()
+        self.assertTrue(handle.build_recipe(recipe, command_handle))
+        self.assertEqual(len(command_handle.commands), 1)
+        return shlex.split(command_handle.commands[0])
+
+    @unittest.skipIf(os.name != "posix", "command quoted by shlex")
+    def test_build_recipe_command(self):
+        args = self.build_recipe_args()
+        self.assertEqual(
+            args[:4], [sys.executable, "-m", "hpb.main", "build"])
+
+    @unittest.skipIf(os.name != "posix", "command quoted by shlex")
+    def test_build_recipe_command_frozen(self):
+        # single file binary, sys.executable is hpb itself
+        with unittest.mock.patch.object(sys, "frozen", True, create=True), \
+                unittest.mock.patch.object(sys, "executable", "/opt/hpb/hpb"):
+            args = self.build_recipe_args()
+        self.assertEqual(args[:2], ["/opt/hpb/hpb", "build"])
+        self.assertIn("-c", args)
+
+
+if __name__ == "__main__":
+    unittest.main()